@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.utils.cancellation import CancellationToken, CancelledError
+
+
+def test_cancelled_error_passes_broad_handlers():
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(CancelledError):
+        try:
+            token.raise_if_cancelled()
+        except Exception:
+            pass
+
+
+def test_parent_cancels_children_only_downwards():
+    batch = CancellationToken()
+    first, second = CancellationToken(batch), CancellationToken(batch)
+    first.cancel()
+    assert first.is_cancelled and not second.is_cancelled and not batch.is_cancelled
+    batch.cancel()
+    assert second.is_cancelled
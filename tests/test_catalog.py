@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.download.catalog import CatalogIndex
+
+
+URL = 'https://www.praisecharts.com/songs/details/1/way-maker-sheet-music'
+
+
+def test_records_keys_parts_and_page_counts(tmp_path):
+    catalog = CatalogIndex(str(tmp_path / 'catalog.sqlite3'))
+    catalog.record_song(URL + '?tab=orchestration', 'Way Maker', 'Leeland')
+    catalog.record_keys(URL, ['E', 'D', 'C'])
+    catalog.record_parts(URL, 'E', ['Trumpet 1,2', 'Alto Sax'])
+    catalog.record_page_count(URL, 'E', 'Alto Sax', 3)
+
+    song = catalog.get_song(URL)
+    assert song['title'] == 'Way Maker'
+    assert song['has_orchestration'] is True
+    assert song['keys'] == ['E', 'D', 'C']
+    assert song['parts'] == {'E': {'Alto Sax': 3, 'Trumpet 1,2': None}}
+    assert [s['product_url'] for s in catalog.find_by_title('way maker')] == [URL]
+
+
+def test_refreshed_parts_keep_page_counts_and_drop_missing(tmp_path):
+    catalog = CatalogIndex(str(tmp_path / 'catalog.sqlite3'))
+    catalog.record_keys(URL, ['E'])
+    catalog.record_parts(URL, 'E', ['Trumpet 1,2', 'Alto Sax'])
+    catalog.record_page_count(URL, 'E', 'Alto Sax', 3)
+    catalog.record_parts(URL, 'E', ['Alto Sax'])
+    assert catalog.get_song(URL)['parts'] == {'E': {'Alto Sax': 3}}
+
+
+def test_staleness(tmp_path):
+    now = [1000.0]
+    catalog = CatalogIndex(str(tmp_path / 'catalog.sqlite3'), max_age=100, clock=lambda: now[0])
+    catalog.record_keys(URL, [])
+    assert catalog.get_song(URL)['has_orchestration'] is False
+    assert not catalog.is_stale(URL)
+    now[0] = 1200.0
+    assert catalog.is_stale(URL)
+    assert catalog.stale_songs() == [URL]
+
+
+def test_missing_orchestration_goes_stale_sooner(tmp_path):
+    now = [1000.0]
+    catalog = CatalogIndex(str(tmp_path / 'catalog.sqlite3'), max_age=100, negative_max_age=10,
+                           clock=lambda: now[0])
+    catalog.record_keys(URL, [])
+    catalog.record_keys(URL + '-2', ['E'])
+    now[0] = 1050.0
+    assert catalog.is_stale(URL)
+    assert not catalog.is_stale(URL + '-2')
+    assert catalog.stale_songs() == [URL]
+
+
+def test_most_requested_parts_are_limited_to_available(tmp_path):
+    catalog = CatalogIndex(str(tmp_path / 'catalog.sqlite3'))
+    for part in ['Alto Sax', 'Cello', 'Cello', 'Viola', 'Cello', 'Viola']:
+        catalog.record_part_request(part)
+    assert catalog.most_requested_parts(['Viola', 'Cello', 'Alto Sax', 'Timpani'], 2) == ['Cello', 'Viola']
+    assert catalog.most_requested_parts(['Timpani'], 2) == []
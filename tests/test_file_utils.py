@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.utils import file_utils
+from watermark_remover.utils.file_utils import atomic_path, atomic_write_bytes, path_lock
+
+
+def test_atomic_write_replaces_and_leaves_no_temp_files(tmp_path):
+    target = tmp_path / 'page_001.png'
+    target.write_bytes(b'old')
+    atomic_write_bytes(str(target), b'new')
+    assert target.read_bytes() == b'new'
+    assert os.listdir(tmp_path) == ['page_001.png']
+
+
+def test_failed_write_keeps_the_original(tmp_path):
+    target = tmp_path / 'part.pdf'
+    target.write_bytes(b'complete')
+    with pytest.raises(RuntimeError):
+        with atomic_path(str(target)) as tmp:
+            assert tmp.endswith('.pdf')
+            with open(tmp, 'wb') as f:
+                f.write(b'partial')
+            raise RuntimeError('encoder failed')
+    assert target.read_bytes() == b'complete'
+    assert os.listdir(tmp_path) == ['part.pdf']
+
+
+def test_path_lock_only_serializes_the_same_path(tmp_path):
+    a, b = str(tmp_path / 'a'), str(tmp_path / 'b')
+    entered = threading.Event()
+
+    def hold_b():
+        with path_lock(b):
+            entered.set()
+
+    with path_lock(a):
+        worker = threading.Thread(target=hold_b)
+        worker.start()
+        assert entered.wait(1)
+        worker.join()
+
+    events = []
+
+    def hold_a():
+        with path_lock(a):
+            events.append('worker')
+
+    with path_lock(a):
+        worker = threading.Thread(target=hold_a)
+        worker.start()
+        time.sleep(0.05)
+        events.append('main')
+    worker.join()
+    assert events == ['main', 'worker']
+    assert file_utils._path_locks == {}
+
+
+def test_atomic_path_keeps_or_follows_the_umask_mode(tmp_path):
+    new = tmp_path / 'new.pdf'
+    atomic_write_bytes(str(new), b'pdf')
+    plain = tmp_path / 'plain.pdf'
+    plain.write_bytes(b'pdf')
+    assert new.stat().st_mode & 0o777 == plain.stat().st_mode & 0o777
+
+    existing = tmp_path / 'existing.pdf'
+    existing.write_bytes(b'old')
+    os.chmod(existing, 0o640)
+    atomic_write_bytes(str(existing), b'new')
+    assert existing.stat().st_mode & 0o777 == 0o640
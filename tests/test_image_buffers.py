@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.inference.image_buffers import PageConverter
+from watermark_remover.inference.model_functions import tensor_to_PIL
+
+
+def test_matches_tensor_to_pil_on_clamped_pages():
+    page = torch.rand(1, 1, 64, 48) * 1.2 - 0.1
+    converter = PageConverter()
+    expected = np.asarray(tensor_to_PIL(page.clamp(0, 1)))
+    assert np.array_equal(converter.to_uint8(page), expected)
+    assert np.array_equal(np.asarray(converter.to_pil(page)), expected)
+
+
+def test_reuses_its_buffer_per_page_size():
+    converter = PageConverter()
+    first = converter.to_uint8(torch.zeros(1, 32, 32))
+    second = converter.to_uint8(torch.ones(1, 32, 32))
+    assert first is second
+    assert int(second.max()) == 255
+    assert converter.to_uint8(torch.ones(16, 16)) is not second
+
+
+def test_writes_into_out_and_passes_uint8_through():
+    converter = PageConverter()
+    page = torch.full((1, 1, 8, 8), 0.5)
+    out = np.zeros((8, 8), dtype=np.uint8)
+    assert converter.to_uint8(page, out=out) is out
+    assert np.all(out == 127)
+    pixels = np.arange(64, dtype=np.uint8).reshape(1, 8, 8)
+    assert np.array_equal(converter.to_uint8(pixels), pixels[0])
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.download.job_journal import JobJournal, batch_id, file_sha256
+
+
+def test_batch_id_is_stable_for_the_same_list():
+    entries = [('Way Maker', 'Alto Sax', 'E'), ('Holy', 'Cello', 'C')]
+    assert batch_id(entries) == batch_id(list(entries))
+    assert batch_id(entries) != batch_id(entries[::-1])
+
+
+def test_journal_survives_reload_and_ignores_truncated_lines(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = JobJournal(path)
+    journal.record('0:song', 'searched', options=['A', 'B'])
+    journal.record('0:song', 'key_chosen', option=1, key='D', instrument='Cello')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"song": "0:song", "step": "do')
+
+    reloaded = JobJournal(path)
+    assert reloaded.song_state('0:song')['searched']['options'] == ['A', 'B']
+    assert reloaded.option_state('0:song', 1)['key_chosen']['key'] == 'D'
+    assert reloaded.is_done('0:song') is None
+
+
+def test_verified_pages_reject_modified_files(tmp_path):
+    page = tmp_path / 'part_001.png'
+    page.write_bytes(b'page one')
+    journal = JobJournal(str(tmp_path / 'journal.jsonl'))
+    journal.record('0:song', 'pages_fetched', option=0,
+                   pages={'Cello': [{'path': str(page), 'sha256': file_sha256(str(page))}]})
+    assert journal.verified_pages('0:song', 0) == {'Cello': [str(page)]}
+
+    page.write_bytes(b'changed')
+    assert journal.verified_pages('0:song', 0) == {}
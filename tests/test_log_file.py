@@ -0,0 +1,41 @@
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.utils.log_file import AsyncFileLog, message_level
+
+
+def test_writes_all_messages_on_close(tmp_path):
+    path = tmp_path / 'logs' / 'app.log'
+    log = AsyncFileLog(str(path))
+    log.write("Downloading page 1")
+    log.write("[DEBUG] Waiting for element")
+    log.close()
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 2
+    assert lines[0].endswith("INFO MainThread: Downloading page 1")
+    assert lines[1].endswith("DEBUG MainThread: [DEBUG] Waiting for element")
+    # Writes after close are dropped instead of raising
+    log.write("late")
+
+
+def test_debug_filtered_by_level(tmp_path):
+    path = tmp_path / 'app.log'
+    log = AsyncFileLog(str(path), level=logging.INFO)
+    log.write("[DEBUG] probe")
+    log.write("Done")
+    log.close()
+    assert path.read_text(encoding='utf-8').count('\n') == 1
+    assert message_level("[DEBUG] x") == logging.DEBUG
+
+
+def test_rotates_files(tmp_path):
+    path = tmp_path / 'app.log'
+    log = AsyncFileLog(str(path), max_bytes=200, backup_count=2)
+    for i in range(50):
+        log.write(f"message {i:03d}")
+    log.close()
+    assert sorted(os.listdir(tmp_path)) == ['app.log', 'app.log.1', 'app.log.2']
+    assert 'message 049' in path.read_text(encoding='utf-8')
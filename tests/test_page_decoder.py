@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.inference.model_functions import PageDecoder, PIL_to_tensor
+
+
+def write_pages(directory, count, size=(300, 400)):
+    rng = np.random.default_rng(0)
+    paths = []
+    for number in range(count):
+        path = os.path.join(directory, f"page_{number:03d}.png")
+        Image.fromarray(rng.integers(0, 256, size, dtype=np.uint8), 'L').save(path)
+        paths.append(path)
+    return paths
+
+
+def test_batches_come_in_page_order_and_match_pil_to_tensor(tmp_path):
+    paths = write_pages(str(tmp_path), 7)
+    decoder = PageDecoder(paths, batch_size=2, workers=3, ahead=2)
+    seen = []
+    for indices, batch in decoder:
+        assert batch.shape[0] == len(indices)
+        for offset, index in enumerate(indices):
+            assert torch.equal(batch[offset], PIL_to_tensor(paths[index]))
+        seen.extend(indices)
+    assert seen == list(range(7))
+    assert decoder.failed == []
+
+
+def test_undecodable_pages_are_reported_and_left_out(tmp_path):
+    paths = write_pages(str(tmp_path), 4)
+    broken = os.path.join(str(tmp_path), 'broken.png')
+    with open(broken, 'wb') as f:
+        f.write(b'not an image')
+    paths.insert(1, broken)
+    decoder = PageDecoder(paths, batch_size=2)
+    seen = []
+    for indices, batch in decoder:
+        for offset, index in enumerate(indices):
+            assert torch.equal(batch[offset], PIL_to_tensor(paths[index]))
+        seen.extend(indices)
+    assert seen == [0, 2, 3, 4]
+    assert decoder.failed == [1]
+
+
+def test_decodes_when_iterated_in_inference_mode(tmp_path):
+    paths = write_pages(str(tmp_path), 3)
+    decoder = PageDecoder(paths)
+    with torch.inference_mode():
+        seen = [index for indices, _ in decoder for index in indices]
+    assert seen == [0, 1, 2]
+    assert decoder.failed == []
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.inference.model_functions import PAGE_SIZE
+from watermark_remover.inference.page_dedup import PageIndex, SignatureTable, page_signature
+
+
+def music_page(seed=0):
+    """A white page with staves and note heads, values in [0, 1]."""
+    rng = np.random.default_rng(seed)
+    page = np.ones(PAGE_SIZE, dtype=np.float32)
+    height, width = PAGE_SIZE
+    for top in range(60, height - 80, 90):
+        for line in range(5):
+            page[top + line * 8, 40:width - 40] = 0.1
+        for x in rng.integers(60, width - 60, size=20):
+            y = top + int(rng.integers(-8, 40))
+            page[y:y + 6, x:x + 8] = 0.05
+    return page
+
+
+def test_same_page_matches_after_small_noise():
+    page = music_page()
+    noisy = np.clip(page + np.random.default_rng(1).normal(0, 0.002, page.shape), 0, 1)
+    table = SignatureTable()
+    table.add(page_signature(page), 'first')
+    assert page_signature(noisy).key == page_signature(page).key
+    assert table.find(page_signature(noisy)) == 'first'
+
+
+def test_page_differing_by_one_note_head_does_not_match():
+    page = music_page()
+    other = page.copy()
+    other[400:406, 300:308] = 0.05
+    table = SignatureTable()
+    table.add(page_signature(page), 'first')
+    assert table.find(page_signature(other)) is None
+    assert table.find(page_signature(music_page(seed=2))) is None
+
+
+def test_page_index_persists_outputs_per_variant(tmp_path):
+    signature = page_signature(music_page())
+    output = np.arange(64, dtype=np.uint8).reshape(8, 8)
+    index = PageIndex(str(tmp_path), persist=True)
+    index.store(signature, output, 'standard')
+    assert np.array_equal(index.lookup(signature, 'standard'), output)
+
+    reloaded = PageIndex(str(tmp_path), persist=True)
+    assert np.array_equal(reloaded.lookup(signature, 'standard'), output)
+    assert reloaded.lookup(signature, 'max') is None
+    assert (reloaded.hits, reloaded.misses) == (1, 1)
+    assert PageIndex(str(tmp_path)).lookup(signature, 'standard') is None
+
+
+def test_page_index_keeps_memory_within_budget():
+    index = PageIndex(memory_budget=3 * 64)
+    signatures = [page_signature(music_page(seed)) for seed in range(5)]
+    for signature in signatures:
+        index.store(signature, np.zeros((8, 8), dtype=np.uint8))
+    assert index.memory_bytes <= 3 * 64
+    assert index.lookup(signatures[0]) is None
+    assert index.lookup(signatures[-1]) is not None
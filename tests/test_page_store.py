@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.inference.page_store import PageStore
+
+
+def page(value, shape=(1, 1, 20, 10)):
+    return torch.full(shape, value)
+
+
+def test_pages_beyond_the_budget_spill_to_disk(tmp_path):
+    store = PageStore(spill_root=str(tmp_path), ram_budget=2 * 200)
+    ids = [store.add(page(i / 10)) for i in range(4)]
+    report = store.memory_report()
+    assert report['pages'] == 4
+    assert report['ram_bytes'] == 2 * 200
+    assert report['spilled_bytes'] == 2 * 200
+    assert len(os.listdir(store.spill_dir)) == 2
+    for i, page_id in enumerate(ids):
+        assert np.all(store.get(page_id) == int(i / 10 * 255))
+
+
+def test_iter_pages_follows_links_and_shares_pages(tmp_path):
+    store = PageStore(spill_root=str(tmp_path), ram_budget=200)
+    shared = store.put('Trumpet 1,2', page(0.2))
+    store.put('Trumpet 1,2', page(0.4))
+    store.link('Trumpet 3', shared)
+    assert store.instruments() == ['Trumpet 1,2', 'Trumpet 3']
+    assert [int(p[0, 0]) for p in store.iter_pages('Trumpet 1,2')] == [51, 102]
+    assert [int(p[0, 0]) for p in store.iter_pages('Trumpet 3')] == [51]
+    assert store.page_count() == 3
+    assert store.memory_report()['pages'] == 2
+
+
+def test_close_removes_spill_files(tmp_path):
+    store = PageStore(spill_root=str(tmp_path), ram_budget=0)
+    store.put('Alto Sax', page(0.5))
+    spill_dir = store.spill_dir
+    assert os.path.isdir(spill_dir)
+    store.close()
+    assert not os.path.exists(spill_dir)
+    assert os.listdir(str(tmp_path)) == []
+    assert store.page_count() == 0
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.download.prefetch import PrefetchCache
+
+
+URL = 'https://www.praisecharts.com/songs/details/1/way-maker-sheet-music'
+
+
+def test_take_counts_hits_and_misses(tmp_path):
+    page = tmp_path / 'cello_001.png'
+    page.write_bytes(b'page')
+    cache = PrefetchCache()
+    cache.put(URL + '?tab=orchestration', 'E', 'Cello', [str(page)])
+
+    assert cache.take(URL, 'D', 'Cello') is None
+    assert cache.take(URL, 'E', 'Cello') == [str(page)]
+    assert cache.take(URL, 'E', 'Cello') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate() == 1 / 3
+
+
+def test_discard_deletes_unused_pages(tmp_path):
+    pages = [tmp_path / 'viola_001.png', tmp_path / 'viola_002.png']
+    for page in pages:
+        page.write_bytes(b'page')
+    cache = PrefetchCache()
+    cache.put(URL, 'E', 'Viola', [str(page) for page in pages])
+
+    cache.discard()
+    assert not any(page.exists() for page in pages)
+    assert (cache.wasted_parts, cache.wasted_pages) == (1, 2)
+    assert not cache.contains(URL, 'E', 'Viola')
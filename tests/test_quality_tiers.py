@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.inference.quality_tiers import (
+    TILE_SIZE,
+    UPSCALED_SIZE,
+    blend_ramp,
+    tile_origins,
+    uses_vdsr,
+)
+
+
+def test_standard_layout_matches_original_tiles():
+    assert tile_origins(UPSCALED_SIZE[0], TILE_SIZE[0]) == [0, 550, 1100, 1650]
+    assert tile_origins(UPSCALED_SIZE[1], TILE_SIZE[1]) == [0, 850]
+    assert tile_origins(1000, 300) == [0, 300, 600, 900]
+
+
+def test_overlapping_tiles_cover_with_full_tiles():
+    origins = tile_origins(2200, 550, overlap=64)
+    assert origins[0] == 0 and origins[-1] == 2200 - 550
+    assert all(b - a <= 550 - 64 for a, b in zip(origins, origins[1:]))
+    assert tile_origins(400, 550, overlap=64) == [0]
+    with pytest.raises(ValueError):
+        tile_origins(2200, 64, overlap=64)
+
+
+def test_blend_ramp():
+    assert blend_ramp(6, 2) == pytest.approx([1 / 3, 2 / 3, 1, 1, 2 / 3, 1 / 3])
+    assert min(blend_ramp(850, 64)) > 0
+    assert not uses_vdsr('draft') and uses_vdsr('max')
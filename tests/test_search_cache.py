@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.download.search_cache import SearchCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalized_queries_share_entries():
+    cache = SearchCache()
+    results = [{'text': 'Way Maker\nLeeland', 'image_url': '', 'product_url': 'https://example.com/way-maker', 'is_song': True}]
+    cache.put('  Way  Maker ', results)
+    assert normalize_query('WAY maker') == 'way maker'
+    assert cache.get('way maker') == results
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = SearchCache(ttl=60, clock=clock)
+    cache.put('holy', [{'text': 'Holy'}])
+    clock.now = 59
+    assert cache.get('holy') is not None
+    clock.now = 61
+    assert cache.get('holy') is None
+
+
+def test_songs_without_product_url_are_not_cached():
+    cache = SearchCache()
+    cache.put('holy', [{'text': 'Holy', 'product_url': 'https://example.com/holy', 'is_song': True}])
+    cache.put('holy', [
+        {'text': 'Songs', 'product_url': '', 'is_song': False},
+        {'text': 'Holy\nArtist', 'product_url': '', 'is_song': True},
+    ])
+    assert cache.get('holy') is None
@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from watermark_remover.utils.throttle import AdaptiveInterval, Throttle
+
+
+def test_limits_rate():
+    now = [0.0]
+    throttle = Throttle(max_rate=2, max_share=1.0, clock=lambda: now[0])
+    assert throttle.ready()
+    now[0] = 0.2
+    assert not throttle.ready()
+    assert throttle.ready(force=True)
+    now[0] = 0.8
+    assert throttle.ready()
+    assert (throttle.allowed, throttle.refused) == (3, 1)
+
+
+def test_limits_share_of_wall_time():
+    now = [0.0]
+    throttle = Throttle(max_rate=100, max_share=0.05, clock=lambda: now[0])
+    now[0] = 1.0
+    assert throttle.ready()
+    throttle.spent(0.1)
+    now[0] = 1.5
+    assert not throttle.ready()
+    now[0] = 2.5
+    assert throttle.ready()
+
+
+def test_zero_rate_disables():
+    throttle = Throttle(max_rate=0)
+    assert not throttle.ready(force=True)
+
+
+def test_adaptive_interval_backs_off_until_change():
+    interval = AdaptiveInterval(fast=0.25, idle=2.0)
+    assert [interval.next() for _ in range(4)] == [0.5, 1.0, 2.0, 2.0]
+    assert interval.next(changed=True) == 0.25
+    assert interval.next() == 0.5
+    assert interval.next(active=True) == 0.25
@@ -6,6 +6,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from watermark_remover.utils.transposition_utils import (
     get_transposition_suggestions,
+    plan_downloads,
 )
 
 
@@ -27,3 +28,33 @@ def test_wraparound_distance():
     assert match['key'] == 'B'
     assert match['difference'] == 2
     assert match['interval'] == 'Major Second'
+
+
+def test_plan_uses_requested_parts_when_nothing_is_shared():
+    songs = {'Song': {'keys': ['C', 'D'], 'parts': ['Clarinet 1/2', 'Trumpet 1,2']}}
+    plan = plan_downloads([('Song', 'Clarinet 1/2', 'C'), ('Song', 'Trumpet 1,2', 'C')], songs)
+    assert len(plan['downloads']) == 2
+    assert all(a['direct'] for a in plan['assignments'])
+
+
+def test_plan_prefers_direct_parts_over_a_shared_download():
+    songs = {'Song': {'keys': ['C', 'D'], 'parts': ['Clarinet 1/2', 'Trumpet 1,2', 'Flute 1/2']}}
+    plan = plan_downloads([('Song', 'Clarinet 1/2', 'C'), ('Song', 'Trumpet 1,2', 'C')], songs)
+    assert [d['part'] for d in plan['downloads']] == ['Clarinet 1/2', 'Trumpet 1,2']
+    assert all(a['direct'] for a in plan['assignments'])
+    assert not plan['unsatisfied']
+
+
+def test_plan_serves_missing_parts_from_a_planned_download():
+    songs = {'Song': {'keys': ['C', 'D'], 'parts': ['Trumpet 1,2', 'Flute 1/2']}}
+    plan = plan_downloads([('Song', 'Clarinet 1/2', 'C'), ('Song', 'Trumpet 1,2', 'D')], songs)
+    assert plan['downloads'] == [{'title': 'Song', 'key': 'D', 'part': 'Trumpet 1,2', 'requests': [0, 1]}]
+    assert not plan['assignments'][0]['direct']
+    assert plan['assignments'][1]['direct']
+
+
+def test_plan_reports_unsatisfied_requests():
+    songs = {'Song': {'keys': ['Eb'], 'parts': {'Eb': ['Alto Sax']}}}
+    plan = plan_downloads([('Song', 'Alto Sax', 'Eb'), ('Missing', 'Alto Sax', 'C')], songs)
+    assert plan['assignments'][0] == {'title': 'Song', 'key': 'Eb', 'part': 'Alto Sax', 'direct': True}
+    assert plan['unsatisfied'] == [1]
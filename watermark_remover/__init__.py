@@ -6,4 +6,6 @@ __all__ = [
     "threads",
     "inference",
     "utils",
+    "benchmarks",
+    "training",
 ]
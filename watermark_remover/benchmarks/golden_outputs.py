@@ -0,0 +1,237 @@
+"""Check faster pipeline configurations against stored golden outputs.
+
+``--record`` runs the reference pipeline (``PIL_to_tensor`` -> UNet ->
+nearest upscale -> VDSR in non-overlapping tiles -> ``tensor_to_PIL``, i.e.
+the standard tier) on every page in ``--fixtures`` and stores the outputs
+as PNGs in ``--golden`` with a manifest of the fixture and model files.
+Comparisons refuse to run if either has changed since.
+
+Without ``--record`` each configuration in ``--configs`` is run on the same
+pages and compared with the stored outputs: PSNR and SSIM, the mean and
+maximum absolute pixel difference (0-255) and the fraction of pixels that
+differ by more than ``--pixel-tolerance``.  A table of seconds per page and
+these scores is printed, and the exit status is 1 if any configuration
+misses a gate (``--min-psnr``, ``--min-ssim``, ``--max-changed``).  Other
+models, e.g. distilled or pruned ones, are checked with
+``--candidate NAME=WM_DIR[,US_DIR]``::
+
+    python -m watermark_remover.benchmarks.golden_outputs --fixtures pages/ --record
+    python -m watermark_remover.benchmarks.golden_outputs --fixtures pages/ \\
+        --candidate student=models/Watermark_Removal_student
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import torch
+from PIL import Image
+
+from watermark_remover.inference.image_buffers import PageConverter
+from watermark_remover.inference.model_functions import (
+    UNet,
+    VDSR,
+    PIL_to_tensor,
+    best_checkpoint,
+    build_best_model,
+    tensor_to_PIL,
+)
+from watermark_remover.inference.pipeline import collect_pages, process_pages, upscale_page
+from watermark_remover.inference.quality_tiers import TIER_DRAFT, TIER_MAX, TIER_STANDARD
+from watermark_remover.training.metrics import psnr, ssim
+
+MANIFEST_NAME = 'manifest.json'
+# Built-in alternatives to the reference pipeline; 'reference' re-runs it
+# unchanged and so also checks that it is deterministic
+CONFIGS = ('reference', 'batched', 'bf16', TIER_MAX, TIER_DRAFT)
+DEFAULT_CONFIGS = ('reference', 'batched', 'bf16')
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def golden_name(path):
+    return os.path.splitext(os.path.basename(path))[0] + '.png'
+
+
+def model_record(directory):
+    best = best_checkpoint(directory)
+    if best is None:
+        return {'directory': directory}
+    path, epoch, _ = best
+    return {'directory': directory, 'epoch': epoch, 'sha256': file_digest(path)}
+
+
+def run_pages(paths, wm_model, us_model, device, tier=TIER_STANDARD, autocast=False):
+    """Run the page-at-a-time pipeline and return the outputs as uint8 arrays."""
+    converter = PageConverter()
+    outputs = []
+    context = torch.autocast(device.type, dtype=torch.bfloat16) if autocast else nullcontext()
+    with torch.inference_mode(), context:
+        for path in paths:
+            wm_output = wm_model(PIL_to_tensor(path).unsqueeze(0).to(device)).float()
+            page = converter.to_uint8(wm_output)
+            upscaled = upscale_page(page, tier, us_model, device).float()
+            outputs.append(np.array(tensor_to_PIL(upscaled)))
+    return outputs
+
+
+def run_config(config, paths, wm_model, us_model, device):
+    if config == 'batched':
+        converter = PageConverter()
+        outputs = {
+            path: converter.to_uint8(page).copy()
+            for path, page in process_pages(paths, wm_model, us_model, TIER_STANDARD, device)
+        }
+        return [outputs.get(path) for path in paths]
+    if config == 'bf16':
+        return run_pages(paths, wm_model, us_model, device, autocast=True)
+    tier = config if config in (TIER_MAX, TIER_DRAFT) else TIER_STANDARD
+    return run_pages(paths, wm_model, us_model, device, tier)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def score(outputs, references, pixel_tolerance):
+    """Average PSNR, SSIM, mean/max absolute difference and changed-pixel fraction."""
+    rows = []
+    for output, reference in zip(outputs, references):
+        if output is None:
+            rows.append((0.0, 0.0, 255.0, 255, 1.0))
+            continue
+        diff = np.abs(output.astype(np.int16) - reference.astype(np.int16))
+        out_tensor = torch.from_numpy(output).float().div_(255).view(1, 1, *output.shape)
+        ref_tensor = torch.from_numpy(reference).float().div_(255).view(1, 1, *reference.shape)
+        rows.append((
+            psnr(out_tensor, ref_tensor),
+            ssim(out_tensor, ref_tensor),
+            float(diff.mean()),
+            int(diff.max()),
+            float((diff > pixel_tolerance).mean()),
+        ))
+    columns = list(zip(*rows))
+    return (
+        min(columns[0]),
+        sum(columns[1]) / len(rows),
+        sum(columns[2]) / len(rows),
+        max(columns[3]),
+        max(columns[4]),
+    )
+
+
+def parse_candidate(text):
+    name, _, dirs = text.partition('=')
+    if not name or not dirs:
+        raise argparse.ArgumentTypeError("expected NAME=WM_DIR[,US_DIR]")
+    wm_dir, _, us_dir = dirs.partition(',')
+    return name, wm_dir, us_dir or None
+
+
+def record(paths, golden_dir, wm_model, us_model, device, model_dirs):
+    outputs, seconds = timed(run_pages, paths, wm_model, us_model, device)
+    os.makedirs(golden_dir, exist_ok=True)
+    for path, output in zip(paths, outputs):
+        Image.fromarray(output, 'L').save(os.path.join(golden_dir, golden_name(path)))
+    manifest = {
+        'fixtures': {os.path.basename(path): file_digest(path) for path in paths},
+        'wm_model': model_record(model_dirs[0]),
+        'us_model': model_record(model_dirs[1]),
+        'seconds_per_page': seconds / len(paths),
+    }
+    with open(os.path.join(golden_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Recorded {len(paths)} golden pages in {golden_dir} ({seconds / len(paths):.2f} s/page)")
+
+
+def load_references(paths, golden_dir, model_dirs):
+    """Return the stored outputs, or None with a message if they do not match
+    the fixtures or the models in ``model_dirs`` (wm, us)."""
+    manifest_path = os.path.join(golden_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        print(f"No golden outputs in {golden_dir}; run with --record first")
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    fixtures = {os.path.basename(path): file_digest(path) for path in paths}
+    if fixtures != manifest['fixtures']:
+        print("Fixture pages differ from the recorded ones; run with --record again")
+        return None
+    for name, directory in zip(('wm_model', 'us_model'), model_dirs):
+        recorded, current = manifest[name], model_record(directory)
+        if recorded.get('sha256') != current.get('sha256'):
+            print(f"{name} in {directory} differs from the one the golden outputs were recorded with "
+                  f"({recorded['directory']}, epoch {recorded.get('epoch')}); run with --record again")
+            return None
+    return [np.array(Image.open(os.path.join(golden_dir, golden_name(path))).convert('L')) for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', required=True, help='directory of fixture page images')
+    parser.add_argument('--golden', default=os.path.join('.cache', 'golden'), help='golden output directory')
+    parser.add_argument('--record', action='store_true', help='store reference outputs and exit')
+    parser.add_argument('--configs', nargs='*', choices=CONFIGS, default=list(DEFAULT_CONFIGS))
+    parser.add_argument('--candidate', action='append', type=parse_candidate, default=[],
+                        metavar='NAME=WM_DIR[,US_DIR]', help='other models to run the reference pipeline with')
+    parser.add_argument('--wm-model', default='models/Watermark_Removal')
+    parser.add_argument('--us-model', default='models/VDSR')
+    parser.add_argument('--min-psnr', type=float, default=40.0, help='worst page PSNR in dB')
+    parser.add_argument('--min-ssim', type=float, default=0.98, help='mean SSIM')
+    parser.add_argument('--max-changed', type=float, default=0.01,
+                        help='largest fraction of pixels beyond --pixel-tolerance on any page')
+    parser.add_argument('--pixel-tolerance', type=int, default=8, help='pixel difference (0-255) that counts as changed')
+    args = parser.parse_args(argv)
+
+    paths = collect_pages([args.fixtures])
+    if not paths:
+        parser.error("no fixture pages found")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    wm_model = build_best_model(UNet, args.wm_model).to(device).eval()
+    us_model = build_best_model(VDSR, args.us_model).to(device).eval()
+    if args.record:
+        record(paths, args.golden, wm_model, us_model, device, (args.wm_model, args.us_model))
+        return 0
+
+    references = load_references(paths, args.golden, (args.wm_model, args.us_model))
+    if references is None:
+        return 1
+    runs = [(config, wm_model, us_model, config) for config in args.configs]
+    for name, wm_dir, us_dir in args.candidate:
+        candidate_wm = build_best_model(UNet, wm_dir).to(device).eval()
+        candidate_us = build_best_model(VDSR, us_dir).to(device).eval() if us_dir else us_model
+        runs.append((name, candidate_wm, candidate_us, 'reference'))
+
+    print(f"{len(paths)} fixture pages on {device.type}; gates: PSNR >= {args.min_psnr} dB, "
+          f"SSIM >= {args.min_ssim}, changed <= {args.max_changed:.2%}")
+    print(f"{'config':<14} {'s/page':>7} {'PSNR dB':>8} {'SSIM':>7} {'mean diff':>9} {'max':>4} {'changed':>8}  gate")
+    failed = []
+    for name, run_wm, run_us, config in runs:
+        outputs, seconds = timed(run_config, config, paths, run_wm, run_us, device)
+        quality, similarity, mean_diff, max_diff, changed = score(outputs, references, args.pixel_tolerance)
+        passed = quality >= args.min_psnr and similarity >= args.min_ssim and changed <= args.max_changed
+        if not passed:
+            failed.append(name)
+        print(f"{name:<14} {seconds / len(paths):7.2f} {quality:8.2f} {similarity:7.4f} "
+              f"{mean_diff:9.3f} {max_diff:4d} {changed:8.2%}  {'pass' if passed else 'FAIL'}")
+    if failed:
+        print(f"Failed gates: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Measure how a process-wide file lock serializes concurrent page work.
+
+Each worker thread stands in for a song being processed and runs the real
+page path that used to be locked: ``PIL_to_tensor`` decodes each page (under
+``model_lock`` before), ``atomic_save_image`` encodes and writes the result
+(under ``file_lock``) and the step is appended to a shared ``JobJournal``.
+
+``global`` holds one shared lock around every decode and every
+encode+write, as the old locks did.  ``per-path`` runs the same calls as the
+app does now, where only the journal append takes a (per-path) lock.
+Besides the wall time, the share of the work done while holding a lock is
+reported: that share cannot overlap between threads however many cores
+there are, so it shows the serialization even on a single-core machine,
+where the wall times of the two are the same.
+
+Run with ``python -m watermark_remover.benchmarks.lock_contention``.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from watermark_remover.download.job_journal import JobJournal
+from watermark_remover.inference.model_functions import PAGE_SIZE, PIL_to_tensor, tensor_to_PIL
+from watermark_remover.utils.file_utils import atomic_save_image
+
+
+class TimedLock:
+    """A lock that adds the time spent waiting for it to ``waited`` and the
+    time it is held to ``held``."""
+
+    def __init__(self, lock, waited, held):
+        self.lock = lock
+        self.waited = waited
+        self.held = held
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self.lock.acquire()
+        self.start = time.perf_counter()
+        self.waited.append(self.start - start)
+
+    def __exit__(self, *exc):
+        self.held.append(time.perf_counter() - self.start)
+        self.lock.release()
+
+
+def make_pages(directory, workers, pages):
+    """Write grayscale input pages; returns one list of paths per worker."""
+    rng = np.random.default_rng(0)
+    jobs = []
+    for worker in range(workers):
+        paths = []
+        for page in range(pages):
+            path = os.path.join(directory, f"song{worker}_{page:03d}.png")
+            Image.fromarray(rng.integers(0, 256, PAGE_SIZE, dtype=np.uint8), 'L').save(path)
+            paths.append(path)
+        jobs.append(paths)
+    return jobs
+
+
+def _process_global(paths, journal, lock, held):
+    for path in paths:
+        with lock:
+            page = PIL_to_tensor(path)
+        image = tensor_to_PIL(page)
+        with lock:
+            atomic_save_image(image, path[:-4] + '_out.png')
+        start = time.perf_counter()
+        journal.record(os.path.basename(path), 'processed')
+        held.append(time.perf_counter() - start)
+
+
+def _process_per_path(paths, journal, _lock, held):
+    for path in paths:
+        page = PIL_to_tensor(path)
+        image = tensor_to_PIL(page)
+        atomic_save_image(image, path[:-4] + '_out.png')
+        # record() holds the journal's path lock for about this long
+        start = time.perf_counter()
+        journal.record(os.path.basename(path), 'processed')
+        held.append(time.perf_counter() - start)
+
+
+def run_variant(process, jobs, directory):
+    """Return (wall seconds, thread seconds of work, seconds of it holding a lock).
+
+    Work excludes the time spent waiting for the global lock.
+    """
+    waited = []
+    held = []
+    lock = TimedLock(threading.Lock(), waited, held)
+    journal_path = os.path.join(directory, 'journal.jsonl')
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    journal = JobJournal(journal_path)
+    busy = []
+
+    def work(paths):
+        start = time.perf_counter()
+        process(paths, journal, lock, held)
+        busy.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=work, args=(paths,)) for paths in jobs]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sum(busy) - sum(waited), sum(held)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='concurrent songs')
+    parser.add_argument('--pages', type=int, default=6, help='pages per song')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix='wm_lock_bench_')
+    try:
+        jobs = make_pages(directory, args.workers, args.pages)
+        total_pages = args.workers * args.pages
+        results = {}
+        for name, process in (('global', _process_global), ('per-path', _process_per_path)):
+            runs = [run_variant(process, jobs, directory) for _ in range(args.repeat)]
+            results[name] = min(runs)
+        print(f"{args.workers} workers x {args.pages} pages of {PAGE_SIZE[1]}x{PAGE_SIZE[0]} "
+              f"on {os.cpu_count()} CPUs")
+        print(f"{'locking':<10} {'seconds':>8} {'pages/s':>8} {'locked share':>13}")
+        for name, (seconds, work, held) in results.items():
+            print(f"{name:<10} {seconds:8.3f} {total_pages / seconds:8.1f} {held / work:12.1%}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
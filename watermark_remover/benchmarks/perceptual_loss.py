@@ -0,0 +1,81 @@
+"""Compare training step rates with the full and the truncated perceptual loss.
+
+Trains a small VDSR on the same fixed set of random grayscale crops for a
+few epochs with three versions of ``CombinedLoss``: the original (full VGG19
+on three repeated channels), ``TruncatedPerceptualLoss`` without caching,
+and with target features cached per sample.  Reports training steps per
+second for each.  ``--no-pretrained`` skips downloading the VGG weights,
+which does not change the timing.  The model here is tiny, so the loss
+dominates each step; in ``training.train`` the UNet's own forward and
+backward passes do, and the cache (which the trainer uses, see
+``--random-crops``) adds about 10% there rather than the gain shown here.
+
+Run with ``python -m watermark_remover.benchmarks.perceptual_loss``.
+"""
+
+import argparse
+import time
+
+import torch
+
+from watermark_remover.inference.model_functions import (
+    VDSR,
+    CombinedLoss,
+    PerceptualLoss,
+    TruncatedPerceptualLoss,
+)
+
+
+def steps_per_second(loss_fn, samples, batch_size, epochs, use_keys):
+    torch.manual_seed(0)
+    model = VDSR(channels=16, blocks=2)
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+    batches = [
+        (samples[start:start + batch_size], list(range(start, start + batch_size)))
+        for start in range(0, len(samples), batch_size)
+    ]
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(epochs):
+        for batch, keys in batches:
+            outputs = model(batch * 0.9)
+            loss = loss_fn(outputs, batch, keys if use_keys else None)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            steps += 1
+    return steps / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=16)
+    parser.add_argument('--size', type=int, default=128)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--layer', default='relu3_3')
+    parser.add_argument('--no-pretrained', action='store_true')
+    args = parser.parse_args(argv)
+
+    pretrained = not args.no_pretrained
+    full = PerceptualLoss(pretrained=pretrained)
+    truncated = TruncatedPerceptualLoss(args.layer, cache_size=0, pretrained=pretrained)
+    cached = TruncatedPerceptualLoss(args.layer, cache_size=args.samples, pretrained=pretrained)
+    configs = {
+        'full VGG19': (CombinedLoss(perceptual_loss=full), False),
+        f'{args.layer}': (CombinedLoss(perceptual_loss=truncated), False),
+        f'{args.layer} cached': (CombinedLoss(perceptual_loss=cached), True),
+    }
+
+    samples = torch.rand(args.samples, 1, args.size, args.size)
+    print(f"{args.samples} samples of {args.size}x{args.size}, batch {args.batch_size}, {args.epochs} epochs")
+    print(f"{'loss':<18} {'steps/s':>8} {'speed-up':>9}")
+    baseline = None
+    for name, (loss_fn, use_keys) in configs.items():
+        rate = steps_per_second(loss_fn, samples, args.batch_size, args.epochs, use_keys)
+        baseline = baseline or rate
+        print(f"{name:<18} {rate:8.2f} {rate / baseline:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
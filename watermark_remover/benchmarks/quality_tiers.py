@@ -0,0 +1,91 @@
+"""Measure page throughput of each quality tier.
+
+Runs the full page path of ``pipeline.process_pages`` (decode, UNet
+watermark removal, then the tier's upscaling) on synthetic 792x612 pages
+written to a temporary folder, and reports for every tier the seconds per
+page for the whole path and for upscaling alone, and pages per minute.
+The UNet stage is the same for every tier.  Weights are loaded from
+``--wm-model`` and ``--us-model`` when they can be; speed does not depend
+on them, so untrained weights are used otherwise.
+
+Run with ``python -m watermark_remover.benchmarks.quality_tiers``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+from watermark_remover.inference.model_functions import PAGE_SIZE, UNet, VDSR, build_best_model
+from watermark_remover.inference.pipeline import process_pages, upscale_page
+from watermark_remover.inference.quality_tiers import QUALITY_TIERS, uses_vdsr
+
+
+def load_or_untrained(model_class, directory):
+    try:
+        return build_best_model(model_class, directory)
+    except Exception as e:
+        print(f"Using untrained {model_class.__name__} weights ({directory}: {e})")
+        return model_class()
+
+
+def measure_pages(tier, page_paths, wm_model, us_model, device):
+    """Return seconds per page of the full path after one warm-up page."""
+    for _ in process_pages(page_paths[:1], wm_model, us_model, tier, device):
+        pass
+    start = time.perf_counter()
+    for _ in process_pages(page_paths, wm_model, us_model, tier, device):
+        pass
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / len(page_paths)
+
+
+def measure_upscaling(tier, pages, us_model, device):
+    """Return seconds per page of upscaling alone after one warm-up page."""
+    with torch.inference_mode():
+        upscale_page(pages[0], tier, us_model, device)
+        start = time.perf_counter()
+        for page in pages:
+            upscale_page(page, tier, us_model, device)
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+    return (time.perf_counter() - start) / len(pages)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--tiers', nargs='+', choices=list(QUALITY_TIERS), default=list(QUALITY_TIERS))
+    parser.add_argument('--wm-model', default='models/Watermark_Removal')
+    parser.add_argument('--us-model', default='models/VDSR')
+    args = parser.parse_args(argv)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    wm_model = load_or_untrained(UNet, args.wm_model).to(device).eval()
+    us_model = None
+    if any(uses_vdsr(tier) for tier in args.tiers):
+        us_model = load_or_untrained(VDSR, args.us_model).to(device).eval()
+    rng = np.random.default_rng(0)
+    pages = [rng.integers(0, 256, PAGE_SIZE, dtype=np.uint8) for _ in range(args.pages)]
+
+    print(f"{args.pages} pages on {device.type} ({torch.get_num_threads()} threads)")
+    print(f"{'tier':<10} {'s/page':>8} {'upscale':>8} {'pages/min':>10}")
+    with tempfile.TemporaryDirectory() as folder:
+        page_paths = []
+        for number, page in enumerate(pages):
+            path = os.path.join(folder, f"page_{number:03d}.png")
+            Image.fromarray(page, 'L').save(path)
+            page_paths.append(path)
+        for tier in args.tiers:
+            seconds = measure_pages(tier, page_paths, wm_model, us_model, device)
+            upscaling = measure_upscaling(tier, pages, us_model, device)
+            print(f"{tier:<10} {seconds:8.3f} {upscaling:8.3f} {60 / seconds:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
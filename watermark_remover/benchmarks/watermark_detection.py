@@ -0,0 +1,121 @@
+"""Check the watermark detector's routing on a labeled sample set.
+
+Samples are read from ``--samples DIR``, which holds page images in
+``watermarked/`` and ``clean/`` subdirectories.  Without it, synthetic pages
+(staff lines and note heads) are generated and half of them get the mask
+blended in at a random strength.  The report gives the score range of each
+class, the confusion counts and precision/recall at ``--threshold``, the
+threshold with the best accuracy on the set, the highest threshold that
+still sends every watermarked page to the model, and the time per page.
+
+To check ``DEFAULT_THRESHOLD`` on real pages, put preview pages as served
+(with the watermark) in ``watermarked/`` and pages that carry none, e.g.
+title or lyric pages, in ``clean/``, then pick a threshold a margin below
+the "keeps every watermarked page" value: a bypassed watermarked page
+keeps its watermark, while a clean page sent to the model only costs time.
+
+Run with ``python -m watermark_remover.benchmarks.watermark_detection``.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from watermark_remover.inference.model_functions import PAGE_SIZE
+from watermark_remover.inference.watermark_detector import (
+    DEFAULT_THRESHOLD,
+    WatermarkDetector,
+    load_grayscale,
+    watermark_weights,
+)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+
+def load_samples(root):
+    """Return [(page, is_watermarked)] from root/watermarked and root/clean."""
+    samples = []
+    for label, watermarked in (('watermarked', True), ('clean', False)):
+        folder = os.path.join(root, label)
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((load_grayscale(os.path.join(folder, name)), watermarked))
+    return samples
+
+
+def synthetic_page(rng, shape=PAGE_SIZE):
+    page = np.ones(shape, dtype=np.float32)
+    height, width = shape
+    for top in range(60, height - 80, 90):
+        for line in range(5):
+            page[top + line * 8, 40:width - 40] = 0.1
+        for x in rng.integers(60, width - 60, size=rng.integers(10, 40)):
+            y = top + int(rng.integers(-8, 40))
+            page[max(y, 0):y + 6, x:x + 8] = 0.05
+    return page
+
+
+def synthetic_samples(mask, count, rng):
+    weights = watermark_weights(mask)
+    samples = []
+    for i in range(count):
+        page = synthetic_page(rng, mask.shape)
+        watermarked = i % 2 == 0
+        if watermarked:
+            strength = rng.uniform(0.15, 0.5)
+            page = page * (1 - strength * weights)
+        samples.append((page, watermarked))
+    return samples
+
+
+def confusion(scores, labels, threshold):
+    predicted = scores >= threshold
+    tp = int(np.sum(predicted & labels))
+    fp = int(np.sum(predicted & ~labels))
+    fn = int(np.sum(~predicted & labels))
+    tn = int(np.sum(~predicted & ~labels))
+    return tp, fp, fn, tn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mask', default='data/Church_Music_Watermark/mask.png')
+    parser.add_argument('--samples', help='directory with watermarked/ and clean/ page images')
+    parser.add_argument('--synthetic', type=int, default=40,
+                        help='number of synthetic pages when --samples is not given')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    mask = load_grayscale(args.mask)
+    detector = WatermarkDetector(mask, args.threshold)
+    if args.samples:
+        samples = load_samples(args.samples)
+    else:
+        samples = synthetic_samples(mask, args.synthetic, np.random.default_rng(0))
+
+    start = time.perf_counter()
+    scores = np.array([detector.score(page) for page, _ in samples])
+    seconds = (time.perf_counter() - start) / len(samples)
+    labels = np.array([watermarked for _, watermarked in samples])
+
+    for name, selected in (('watermarked', labels), ('clean', ~labels)):
+        if selected.any():
+            print(f"{name:<12} {int(selected.sum()):4d} pages, scores "
+                  f"{scores[selected].min():.3f} to {scores[selected].max():.3f}")
+    tp, fp, fn, tn = confusion(scores, labels, args.threshold)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    print(f"threshold {args.threshold:.3f}: {tp} watermarked and {tn} clean pages routed correctly, "
+          f"{fn} watermarked pages bypassed, {fp} clean pages sent to the model")
+    print(f"precision {precision:.3f}, recall {recall:.3f}, accuracy {(tp + tn) / len(samples):.3f}")
+    best = max(np.unique(scores), key=lambda t: sum(confusion(scores, labels, t)[i] for i in (0, 3)))
+    print(f"best threshold on this set: {best:.3f}")
+    if labels.any():
+        print(f"highest threshold keeping every watermarked page: {scores[labels].min():.3f}")
+    print(f"{seconds * 1000:.2f} ms per page")
+
+
+if __name__ == '__main__':
+    main()
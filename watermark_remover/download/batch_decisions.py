@@ -0,0 +1,82 @@
+# Policies for choices the batch processor would otherwise ask about
+import difflib
+
+from watermark_remover.utils.transposition_utils import KEY_TO_SEMITONE, normalize_key
+
+# Keep working and present every pending choice in one review at the end
+POLICY_REVIEW = 'review'
+# Resolve every choice immediately with the best ranked option
+POLICY_AUTO = 'auto'
+# Stop and show a modal dialog for each choice (previous behaviour)
+POLICY_ASK = 'ask'
+
+DECISION_POLICIES = {
+    POLICY_REVIEW: 'Review choices at the end',
+    POLICY_AUTO: 'Decide automatically',
+    POLICY_ASK: 'Ask for each choice',
+}
+
+# Alternatives downloaded per option when the requested key is missing and
+# the choice is deferred to the review
+MAX_REVIEW_ALTERNATIVES = 3
+
+
+def _available_label(key_label, available_keys):
+    """Map a suggestion label such as 'C#/Db' to the song's own key label."""
+    semitone = KEY_TO_SEMITONE.get(normalize_key(key_label.split('/')[0]))
+    for key in available_keys:
+        if KEY_TO_SEMITONE.get(normalize_key(key)) == semitone:
+            return key
+    return None
+
+
+def rank_alternatives(instrument, available_keys, suggestions):
+    """Ordered ``(instrument, key)`` alternatives for a missing key.
+
+    The requested instrument in each available key comes last; direct
+    transpositions are preferred over the closest matches.
+    """
+    ranked = []
+    for s in suggestions.get('direct', []) + suggestions.get('closest', []):
+        key = _available_label(s['key'], available_keys)
+        if key and (s['instrument'], key) not in ranked:
+            ranked.append((s['instrument'], key))
+    for key in available_keys:
+        if (instrument, key) not in ranked:
+            ranked.append((instrument, key))
+    return ranked
+
+
+def best_part_match(instrument, parts):
+    """Return the available part closest to ``instrument`` or ``None``."""
+    if instrument in parts:
+        return instrument
+    matches = difflib.get_close_matches(instrument, parts, n=1, cutoff=0.5)
+    return matches[0] if matches else None
+
+
+class PendingReview:
+    """PDF versions of one song waiting for the user to pick one."""
+
+    def __init__(self, song, title, pdf_paths, labels):
+        self.song = song
+        self.title = title
+        self.pdf_paths = pdf_paths
+        self.labels = labels
+
+
+class DecisionQueue:
+    """Collect deferred choices while the batch keeps running."""
+
+    def __init__(self):
+        self.pending = []
+
+    def defer(self, song, title, pdf_paths, labels):
+        self.pending.append(PendingReview(song, title, list(pdf_paths), list(labels)))
+
+    def drain(self):
+        pending, self.pending = self.pending, []
+        return pending
+
+    def __len__(self):
+        return len(self.pending)
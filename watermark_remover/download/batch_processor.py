@@ -1,8 +1,7 @@
+import hashlib
 import os
 import re
 import shutil
-import threading
-from datetime import datetime
 
 from PyQt5.QtCore import QEventLoop, QObject
 from PyQt5.QtWidgets import QInputDialog, QMessageBox, QDialog
@@ -10,13 +9,24 @@ from PyQt5.QtWidgets import QInputDialog, QMessageBox, QDialog
 from watermark_remover.gui.dialogs.suggestion_dialog import SuggestionDialog
 from watermark_remover.utils.transposition_utils import (
     get_transposition_suggestions,
+    plan_downloads,
 )
 from watermark_remover.gui.dialogs.pdf_selection_dialog import (
     PdfSelectionDialog,
 )
-
-# Lock to synchronize file system operations
-fs_lock = threading.Lock()
+from watermark_remover.gui.dialogs.batch_review_dialog import BatchReviewDialog
+from watermark_remover.download.job_journal import JobJournal, batch_id, song_id
+from watermark_remover.utils.cancellation import CancellationToken
+from watermark_remover.inference.quality_tiers import DEFAULT_TIER
+from watermark_remover.download.batch_decisions import (
+    POLICY_ASK,
+    POLICY_AUTO,
+    POLICY_REVIEW,
+    MAX_REVIEW_ALTERNATIVES,
+    DecisionQueue,
+    best_part_match,
+    rank_alternatives,
+)
 
 
 class BatchProcessor(QObject):
@@ -25,17 +35,127 @@ class BatchProcessor(QObject):
     def __init__(self, app):
         super().__init__()
         self.app = app
+        self.journal = None
+        # How choices are made during a batch; see batch_decisions
+        self.policy = POLICY_REVIEW
+        self.decisions = DecisionQueue()
+        # Quality tier every job of the batch is processed with
+        self.quality_tier = DEFAULT_TIER
+        # Parent of every job's token; cancelling it stops the whole batch
+        self.cancel_token = CancellationToken()
+        self.running = False
+
+    def cancel(self):
+        self.cancel_token.cancel()
 
     def _run_thread_and_wait(self, thread):
-        print(f"[DEBUG] Starting thread {thread.__class__.__name__}")
+        # The app starts the thread itself, possibly only once a prefetch
+        # has freed the browser; queued threads are never dropped, so the
+        # wait ends (see start_when_driver_free)
+        print(f"[DEBUG] Waiting for thread {thread.__class__.__name__}")
         loop = QEventLoop()
         thread.finished.connect(loop.quit)
-        thread.start()
-        loop.exec_()
+        if not thread.isFinished():
+            loop.exec_()
         print(f"[DEBUG] Thread {thread.__class__.__name__} finished")
 
-    def _process_song(self, title, instrument, key, dest_root):
+    def _catalog_entry(self, item):
+        """Return the catalog record for a search result, if it was indexed."""
+        for song in self.app.song_info:
+            if song['text'] == item and song.get('product_url'):
+                return self.app.catalog.get_song(song['product_url'])
+        return None
+
+    def _plan_batch(self, entries):
+        """Plan the fewest downloads for ``entries`` from the catalog index.
+
+        Only songs already indexed (and not stale) can be planned; the rest
+        are handled one at a time as before.
+        """
+        songs = {}
+        for title, _, _ in entries:
+            if title in songs:
+                continue
+            for song in self.app.catalog.find_by_title(title):
+                if song['stale'] or not song['keys']:
+                    continue
+                songs[title] = {'keys': song['keys'], 'parts': song['parts']}
+                break
+        plan = plan_downloads(entries, songs)
+        planned = len(entries) - len(plan['unsatisfied'])
+        print(f"[DEBUG] Planned {len(plan['downloads'])} downloads for {planned} of {len(entries)} requests")
+        return plan
+
+    def _choose_key(self, instrument, key, available_keys, planned, previous_choices):
+        """Return the ``(instrument, key)`` pairs to download for one option.
+
+        An empty list skips the option.  Under the review policy several
+        alternatives are downloaded so the user can compare them at the end.
+        """
+        if previous_choices and all(k in available_keys for _, k in previous_choices):
+            # Do not ask again for a decision made before the interruption
+            return [tuple(choice) for choice in previous_choices]
+        if planned and planned['key'] in available_keys:
+            # The batch plan may serve this request with a shared part
+            print(f"[DEBUG] Using planned download {planned['part']} in {planned['key']}")
+            return [(planned['part'], planned['key'])]
+        if key in available_keys:
+            return [(instrument, key)]
+
+        print(f"[DEBUG] Requested key '{key}' not in available keys {available_keys}")
+        suggestions = get_transposition_suggestions(available_keys, instrument, key)
+        if self.policy == POLICY_ASK:
+            dialog = SuggestionDialog(instrument, available_keys, suggestions, self.app)
+            if dialog.exec_() != QDialog.Accepted:
+                return []
+            result = dialog.selected()
+            return [tuple(result)] if result is not None else []
+        ranked = rank_alternatives(instrument, available_keys, suggestions)
+        if self.policy == POLICY_AUTO:
+            return ranked[:1]
+        return ranked[:MAX_REVIEW_ALTERNATIVES]
+
+    def _choose_part(self, instrument):
+        """Map a requested instrument onto one of the song's parts."""
+        parts = self.app.instrument_parts
+        if instrument in parts:
+            return instrument
+        print(f"[DEBUG] Instrument '{instrument}' not found in parts {parts}")
+        if self.policy == POLICY_ASK:
+            instr, ok = QInputDialog.getItem(
+                self.app,
+                "Select Instrument",
+                f"Instrument '{instrument}' not found. Choose one:",
+                parts,
+                0,
+                False,
+            )
+            return instr if ok else None
+        match = best_part_match(instrument, parts)
+        if match:
+            self.app.append_log(f"Using part '{match}' for '{instrument}'")
+        return match
+
+    def _written_pdfs(self, song, idx, count):
+        """PDFs of every choice made for an option in a previous run, or ``None``."""
+        written = []
+        for n in range(count):
+            state = self.journal.option_state(song, f"{idx}.{n}")
+            pdfs = state.get('pdf_written', {}).get('pdfs', [])
+            labels = state.get('pdf_written', {}).get('labels', [])
+            if not pdfs or not all(os.path.isfile(path) for path in pdfs):
+                return None
+            written.extend(zip(pdfs, labels))
+        return written
+
+    def _process_song(self, title, instrument, key, dest_root, planned=None, song=None):
         app = self.app
+        journal = self.journal
+        done = journal.is_done(song) if journal else None
+        if done and os.path.isfile(done.get('chosen') or ''):
+            print(f"[DEBUG] '{title}' already finished in a previous run")
+            app.append_log(f"Skipping '{title}' - already finished")
+            return True
         print(f"[DEBUG] Processing song '{title}' instrument '{instrument}' key '{key}'")
         app.append_log(f"Processing '{title}' - {instrument} in {key}")
 
@@ -51,18 +171,35 @@ class BatchProcessor(QObject):
         if not options:
             app.append_log(f"No results for {title}")
             return True
+        if journal:
+            journal.record(song, 'searched', options=options)
 
         title_dir = re.sub(r'[<>:"\\|?* ]', "_", title.replace("/", "-"))
         dest_dir = os.path.join(dest_root, title_dir)
-        with fs_lock:
-            os.makedirs(dest_dir, exist_ok=True)
+        os.makedirs(dest_dir, exist_ok=True)
 
         pdf_paths = []
         labels = []
+        skipped = False
         for idx in range(num_options):
-            # Re-run the search before processing each option except the first
+            if skipped or self.cancel_token.is_cancelled:
+                break
+            state = journal.option_state(song, idx) if journal else {}
+            previous_choices = state.get('key_chosen', {}).get('choices')
+            if previous_choices:
+                written = self._written_pdfs(song, idx, len(previous_choices))
+                if written is not None:
+                    print(f"[DEBUG] Reusing PDFs of option {idx} from the previous run")
+                    for path, label in written:
+                        pdf_paths.append(path)
+                        labels.append(label)
+                    continue
+            # Re-run the search before processing each option except the first.
+            # The results come from the app's search cache, so this only
+            # restores the result list; the selected option's product page is
+            # then opened directly rather than through the search page.
             if idx > 0:
-                print("[DEBUG] Re-running search for next option")
+                print("[DEBUG] Restoring search results for next option")
                 app.song_search_box.setText(title)
                 app.find_songs()
                 self._run_thread_and_wait(app.find_songs_thread)
@@ -72,6 +209,10 @@ class BatchProcessor(QObject):
                     break
             item = options[idx]
             print(f"[DEBUG] Option {idx}: {item}")
+            known = self._catalog_entry(item)
+            if known and not known['stale'] and known['has_orchestration'] is False:
+                print(f"[DEBUG] Catalog shows no orchestration for option {idx}. Skipping.")
+                continue
             app.song_choice_box.setCurrentIndex(idx)
             app.select_song()
             self._run_thread_and_wait(app.select_song_thread)
@@ -85,98 +226,219 @@ class BatchProcessor(QObject):
                     f"[DEBUG] No orchestration found for option {idx}. Skipping."
                 )
                 continue
-            chosen_key = key
-            chosen_instrument = instrument
-            if key not in available_keys:
-                print(f"[DEBUG] Requested key '{key}' not in available keys {available_keys}")
-                suggestions = get_transposition_suggestions(
-                    available_keys, instrument, key
-                )
-                dialog = SuggestionDialog(instrument, available_keys, suggestions, app)
-                if dialog.exec_() != QDialog.Accepted:
-                    continue
-                result = dialog.selected()
-                if result is None:
-                    continue
-                chosen_instrument, chosen_key = result
-            app.key_choice_box.setCurrentText(chosen_key)
-            app.select_key()
-            self._run_thread_and_wait(app.select_key_thread)
-            print(f"[DEBUG] Using key '{chosen_key}' and instrument '{chosen_instrument}'")
-
-            if chosen_instrument not in app.instrument_parts:
-                print(f"[DEBUG] Instrument '{chosen_instrument}' not found in parts {app.instrument_parts}")
-                instr, ok = QInputDialog.getItem(
-                    app,
-                    "Select Instrument",
-                    f"Instrument '{chosen_instrument}' not found. Choose one:",
-                    app.instrument_parts,
-                    0,
-                    False,
-                )
-                if not ok:
-                    continue
-                chosen_instrument = instr
-            app.selected_instruments = [chosen_instrument]
-
-            app.download_and_process_images(open_after_download=False)
-            self._run_thread_and_wait(app.download_and_process_images_thread)
-
-            key_dir = chosen_key
-            selected_song_text = app.song_choice_box.currentText()
-            parts = selected_song_text.split("\n")
-            selected_song_artist = parts[1] if len(parts) > 1 else "Unknown Artist"
-            artist_dir = re.sub(r'[<>:"\\|?* ]', "_", selected_song_artist.replace("/", "-"))
-            song_dir = os.path.join(
-                app.paths["download_dir"], title_dir, artist_dir, key_dir
-            )
-            with fs_lock:
-                if os.path.isdir(song_dir):
-                    for fname in os.listdir(song_dir):
-                        if fname.endswith(".pdf"):
-                            dest_pdf = os.path.join(dest_dir, f"{idx}_{fname}")
-                            print(f"[DEBUG] Moving {fname} to {dest_pdf}")
-                            shutil.move(os.path.join(song_dir, fname), dest_pdf)
-                            pdf_paths.append(dest_pdf)
-                            labels.append(item)
-
-            with fs_lock:
-                shutil.rmtree(
-                    os.path.join(app.paths["download_dir"], title_dir), ignore_errors=True
+            choices = self._choose_key(instrument, key, available_keys, planned, previous_choices)
+            if not choices:
+                continue
+            if journal:
+                journal.record(song, 'key_chosen', option=idx, choices=choices)
+
+            for n, (chosen_instrument, chosen_key) in enumerate(choices):
+                label = item
+                if (chosen_instrument, chosen_key) != (instrument, key):
+                    label = f"{item}\n{chosen_instrument} in {chosen_key}"
+                option_pdfs = self._download_choice(
+                    title_dir, dest_dir, dest_root, song, f"{idx}.{n}", chosen_instrument, chosen_key
                 )
+                if option_pdfs is None:
+                    # The job was cancelled; keep what is done and move on
+                    app.append_log(f"Skipping the remaining versions of '{title}'")
+                    skipped = True
+                    break
+                pdf_paths.extend(option_pdfs)
+                labels.extend([label] * len(option_pdfs))
+                if journal and option_pdfs:
+                    journal.record(song, 'pdf_written', option=f"{idx}.{n}",
+                                   pdfs=option_pdfs, labels=[label] * len(option_pdfs))
 
-        if pdf_paths:
+        if not pdf_paths:
+            return True
+        if self.policy == POLICY_REVIEW and len(pdf_paths) > 1:
+            # Keep going; the user picks a version for every song at the end
+            self.decisions.defer(song, title, pdf_paths, labels)
+            return True
+        if self.policy == POLICY_ASK:
             dialog = PdfSelectionDialog(pdf_paths, labels, app)
             if dialog.exec_() == QDialog.Accepted:
                 chosen = dialog.selected_path()
             else:
                 chosen = None
-            with fs_lock:
-                for path in pdf_paths:
-                    if path != chosen:
-                        os.remove(path)
-            return chosen is not None
+        else:
+            chosen = pdf_paths[0]
+        self._keep_version(song, pdf_paths, chosen)
+        return chosen is not None
+
+    def _download_choice(self, title_dir, dest_dir, dest_root, song, job, chosen_instrument, chosen_key):
+        """Download and process one (instrument, key) choice; return its PDFs.
+
+        ``None`` means the job was cancelled before it finished.
+        """
+        app = self.app
+        app.key_choice_box.setCurrentText(chosen_key)
+        app.select_key()
+        self._run_thread_and_wait(app.select_key_thread)
+        print(f"[DEBUG] Using key '{chosen_key}' and instrument '{chosen_instrument}'")
+
+        part = self._choose_part(chosen_instrument)
+        if part is None:
+            return []
+        app.selected_instruments = [part]
+
+        job_options = {
+            'cancel_token': CancellationToken(self.cancel_token),
+            'quality_tier': self.quality_tier,
+        }
+        if self.journal:
+            # Keep pages inside the batch directory so an interrupted run
+            # can verify and reuse them instead of downloading again.
+            song_hash = hashlib.sha1(song.encode('utf-8')).hexdigest()[:10]
+            job_options.update({
+                'temp_dir': os.path.join(dest_root, '.pages', song_hash, job),
+                'journal': self.journal,
+                'journal_key': (song, job),
+            })
+        app.download_and_process_images(open_after_download=False, job_options=job_options)
+        self._run_thread_and_wait(app.download_and_process_images_thread)
+        cancelled = job_options['cancel_token'].is_cancelled
+
+        key_dir = chosen_key
+        selected_song_text = app.song_choice_box.currentText()
+        parts = selected_song_text.split("\n")
+        selected_song_artist = parts[1] if len(parts) > 1 else "Unknown Artist"
+        artist_dir = re.sub(r'[<>:"\\|?* ]', "_", selected_song_artist.replace("/", "-"))
+        song_dir = os.path.join(
+            app.paths["download_dir"], title_dir, artist_dir, key_dir
+        )
+        option_pdfs = []
+        # The job has finished, so nothing writes here any more; PDFs are
+        # only ever complete files or dot-prefixed temporaries (atomic_path)
+        if not cancelled and os.path.isdir(song_dir):
+            for fname in os.listdir(song_dir):
+                if fname.endswith(".pdf") and not fname.startswith("."):
+                    dest_pdf = os.path.join(dest_dir, f"{job}_{fname}")
+                    print(f"[DEBUG] Moving {fname} to {dest_pdf}")
+                    shutil.move(os.path.join(song_dir, fname), dest_pdf)
+                    option_pdfs.append(dest_pdf)
+
+        title_root = os.path.join(app.paths["download_dir"], title_dir)
+        shutil.rmtree(title_root, ignore_errors=True)
+        return None if cancelled else option_pdfs
+
+    def _keep_version(self, song, pdf_paths, chosen):
+        """Delete every version except ``chosen`` and mark the song finished."""
+        if chosen is None:
+            return
+        for path in pdf_paths:
+            if path != chosen:
+                os.remove(path)
+        if self.journal:
+            self.journal.record(song, 'done', chosen=chosen)
 
-        return True
+    def _review_deferred(self):
+        pending = self.decisions.drain()
+        if not pending:
+            return
+        dialog = BatchReviewDialog(pending, self.app)
+        if dialog.exec_() != QDialog.Accepted:
+            self.app.append_log("Review cancelled; all versions were kept.")
+            return
+        for review, chosen in zip(pending, dialog.selected_paths()):
+            self._keep_version(review.song, review.pdf_paths, chosen)
 
-    def process_batch(self, entries):
-        """Process a sequence of songs."""
+    def process_batch(self, entries, policy=POLICY_REVIEW, tier=DEFAULT_TIER):
+        """Process a sequence of songs.
+
+        The batch directory is named after the song list, so running the same
+        list again resumes it: the job journal inside records every finished
+        step and completed songs, options and verified pages are reused.
+
+        ``policy`` controls what happens when a choice is needed (see
+        ``batch_decisions``); by default the batch never blocks and all
+        choices are reviewed once every song has been processed.  Every
+        job uses the quality ``tier`` (see ``quality_tiers``).
+        """
         batch_dir = os.path.join(
             self.app.paths["download_dir"],
-            "Batch_" + datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "Batch_" + batch_id(entries),
         )
-        with fs_lock:
-            os.makedirs(batch_dir, exist_ok=True)
+        os.makedirs(batch_dir, exist_ok=True)
         print(f"[DEBUG] Batch directory: {batch_dir}")
+        self.policy = policy
+        self.quality_tier = tier
+        self.decisions = DecisionQueue()
+        self.cancel_token = CancellationToken()
+        journal_path = os.path.join(batch_dir, "journal.jsonl")
+        if os.path.isfile(journal_path):
+            self.app.append_log(f"Resuming batch from {journal_path}")
+        self.journal = JobJournal(journal_path)
+
+        plan = self._plan_batch(entries)
+        # Planned download -> the request that made it, and the requests it
+        # also serves
+        served = {}
+        covered = []
+        self.running = True
+        try:
+            self._process_entries(entries, plan, served, covered, batch_dir)
+        finally:
+            self.running = False
+
+        self._review_deferred()
+        shared = self._copy_covered(covered)
+        for line in shared:
+            self.app.append_log(f"Shared part: {line}")
+        if self.cancel_token.is_cancelled:
+            QMessageBox.information(
+                self.app, "Batch Stopped", "Batch stopped; run the same list again to resume it."
+            )
+            print("[DEBUG] Batch processing cancelled")
+            return
+        message = "Finished processing song list."
+        if shared:
+            message += "\n\nRequests served by a shared part:\n" + "\n".join(shared)
+        QMessageBox.information(self.app, "Batch Complete", message)
+        print("[DEBUG] Batch processing complete")
 
-        for title, instrument, key in entries:
+    def _process_entries(self, entries, plan, served, covered, batch_dir):
+        for index, (title, instrument, key) in enumerate(entries):
+            if self.cancel_token.is_cancelled:
+                self.app.append_log("Batch cancelled")
+                break
+            song = song_id(index, title, instrument, key)
+            planned = plan['assignments'][index]
+            if planned:
+                download = (planned['title'], planned['key'], planned['part'])
+                if download in served:
+                    print(f"[DEBUG] '{title}' ({instrument} in {key}) is covered by {planned['part']} in {planned['key']}")
+                    self.app.append_log(
+                        f"Skipping {title} - {instrument} in {key}: use {planned['part']} in {planned['key']}"
+                    )
+                    covered.append((song, instrument, key, planned, served[download]))
+                    continue
+                served[download] = song
             print(f"[DEBUG] Starting song '{title}'")
-            keep = self._process_song(title, instrument, key, batch_dir)
+            keep = self._process_song(title, instrument, key, batch_dir, planned=planned, song=song)
             print(f"[DEBUG] Finished song '{title}'")
             if not keep:
                 break
 
-        QMessageBox.information(
-            self.app, "Batch Complete", "Finished processing song list."
-        )
-        print("[DEBUG] Batch processing complete")
+    def _copy_covered(self, covered):
+        """Give every request served by a shared download its own copy of the PDF.
+
+        Returns summary lines mapping each covered request to its file.
+        """
+        lines = []
+        for song, instrument, key, planned, source_song in covered:
+            done = self.journal.is_done(source_song)
+            source = done.get('chosen') if done else None
+            request = f"{planned['title']} - {instrument} in {key}"
+            if not source or not os.path.isfile(source):
+                lines.append(f"{request}: no {planned['part']} in {planned['key']} was kept")
+                continue
+            name = re.sub(r'[<>:"\\|?* ]', "_", f"{instrument}_{key}") + "_" + os.path.basename(source)
+            dest = os.path.join(os.path.dirname(source), name)
+            if not os.path.isfile(dest):
+                print(f"[DEBUG] Copying {source} to {dest} for {request}")
+                shutil.copyfile(source, dest)
+            self.journal.record(song, 'done', chosen=dest)
+            lines.append(f"{request}: {planned['part']} in {planned['key']} ({name})")
+        return lines
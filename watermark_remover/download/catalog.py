@@ -0,0 +1,219 @@
+# Persistent local index of songs, keys and instrument parts
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Scraped entries older than this are considered stale
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+# A song recorded without an orchestration may just not have loaded in
+# time, so that finding is checked again much sooner
+NEGATIVE_MAX_AGE = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    product_url TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL DEFAULT '',
+    has_orchestration INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS song_keys (
+    product_url TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (product_url, key)
+);
+CREATE TABLE IF NOT EXISTS parts (
+    product_url TEXT NOT NULL,
+    key TEXT NOT NULL,
+    part TEXT NOT NULL,
+    page_count INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (product_url, key, part)
+);
+CREATE TABLE IF NOT EXISTS part_requests (
+    part TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS songs_title ON songs (title COLLATE NOCASE);
+"""
+
+
+def normalize_product_url(url: str) -> str:
+    """Strip query string, fragment and trailing slash from a product URL."""
+    return url.split('#')[0].split('?')[0].rstrip('/')
+
+
+class CatalogIndex:
+    """SQLite backed record of what has been scraped from PraiseCharts.
+
+    Every time a song page, key menu or part list is read through the browser
+    the result is stored here, keyed by the song's product URL.  Later lookups
+    and batch planning can be answered from the index; entries older than
+    ``max_age`` seconds are reported as stale so they are scraped again.
+    Songs recorded without an orchestration go stale after
+    ``negative_max_age`` seconds instead, if that is shorter.
+    """
+
+    def __init__(self, path: str, max_age: float = DEFAULT_MAX_AGE, clock=time.time,
+                 negative_max_age: float = NEGATIVE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.negative_max_age = min(negative_max_age, max_age)
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation keeps the index usable from
+        # any worker thread; the lock serializes writers within the process.
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    def record_song(self, product_url: str, title: str, artist: str = '') -> None:
+        url = normalize_product_url(product_url)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO songs (product_url, title, artist, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(product_url) DO UPDATE SET title = excluded.title, "
+                "artist = excluded.artist, updated_at = excluded.updated_at",
+                (url, title, artist, self._clock()),
+            )
+
+    def record_keys(self, product_url: str, keys: List[str]) -> None:
+        """Replace the available keys of a song.  No keys means no orchestration."""
+        url = normalize_product_url(product_url)
+        now = self._clock()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO songs (product_url, title, has_orchestration, updated_at) VALUES (?, '', ?, ?) "
+                "ON CONFLICT(product_url) DO UPDATE SET has_orchestration = excluded.has_orchestration, "
+                "updated_at = excluded.updated_at",
+                (url, int(bool(keys)), now),
+            )
+            conn.execute("DELETE FROM song_keys WHERE product_url = ?", (url,))
+            conn.executemany(
+                "INSERT INTO song_keys (product_url, key, position) VALUES (?, ?, ?)",
+                [(url, key, position) for position, key in enumerate(keys)],
+            )
+            conn.execute(
+                "DELETE FROM parts WHERE product_url = ? AND key NOT IN (%s)" % ','.join('?' * len(keys)),
+                (url, *keys),
+            )
+
+    def record_parts(self, product_url: str, key: str, parts: List[str]) -> None:
+        """Replace the parts available in ``key``, keeping known page counts."""
+        url = normalize_product_url(product_url)
+        now = self._clock()
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM parts WHERE product_url = ? AND key = ? AND part NOT IN (%s)"
+                % ','.join('?' * len(parts)),
+                (url, key, *parts),
+            )
+            conn.executemany(
+                "INSERT INTO parts (product_url, key, part, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(product_url, key, part) DO UPDATE SET updated_at = excluded.updated_at",
+                [(url, key, part, now) for part in parts],
+            )
+
+    def record_page_count(self, product_url: str, key: str, part: str, page_count: int) -> None:
+        url = normalize_product_url(product_url)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO parts (product_url, key, part, page_count, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(product_url, key, part) DO UPDATE SET page_count = excluded.page_count, "
+                "updated_at = excluded.updated_at",
+                (url, key, part, page_count, self._clock()),
+            )
+
+    def get_song(self, product_url: str) -> Optional[dict]:
+        """Return everything known about a song or ``None``.
+
+        The result has ``title``, ``artist``, ``has_orchestration`` (``None``
+        if never checked), ``keys`` (in menu order), ``parts`` mapping each key
+        to ``{part: page_count}`` and ``stale``.
+        """
+        url = normalize_product_url(product_url)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT title, artist, has_orchestration, updated_at FROM songs WHERE product_url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            keys = [k for (k,) in conn.execute(
+                "SELECT key FROM song_keys WHERE product_url = ? ORDER BY position", (url,)
+            )]
+            parts: Dict[str, Dict[str, Optional[int]]] = {}
+            for key, part, page_count in conn.execute(
+                "SELECT key, part, page_count FROM parts WHERE product_url = ? ORDER BY key, part", (url,)
+            ):
+                parts.setdefault(key, {})[part] = page_count
+        title, artist, has_orchestration, updated_at = row
+        max_age = self.negative_max_age if has_orchestration == 0 else self.max_age
+        return {
+            'product_url': url,
+            'title': title,
+            'artist': artist,
+            'has_orchestration': None if has_orchestration is None else bool(has_orchestration),
+            'keys': keys,
+            'parts': parts,
+            'updated_at': updated_at,
+            'stale': self._clock() - updated_at > max_age,
+        }
+
+    def find_by_title(self, title: str) -> List[dict]:
+        """Return all indexed songs with the given title (case-insensitive)."""
+        with self._connect() as conn:
+            urls = [u for (u,) in conn.execute(
+                "SELECT product_url FROM songs WHERE title = ? COLLATE NOCASE ORDER BY updated_at DESC",
+                (title.strip(),),
+            )]
+        return [self.get_song(url) for url in urls]
+
+    def is_stale(self, product_url: str) -> bool:
+        song = self.get_song(product_url)
+        return song is None or song['stale']
+
+    def stale_songs(self) -> List[str]:
+        """Return product URLs whose entries should be refreshed."""
+        now = self._clock()
+        with self._connect() as conn:
+            return [u for (u,) in conn.execute(
+                "SELECT product_url FROM songs WHERE updated_at < ? "
+                "OR (has_orchestration = 0 AND updated_at < ?) ORDER BY updated_at",
+                (now - self.max_age, now - self.negative_max_age),
+            )]
+
+    def record_part_request(self, part: str) -> None:
+        """Count a download request for ``part`` (used to rank prefetching)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO part_requests (part, count) VALUES (?, 1) "
+                "ON CONFLICT(part) DO UPDATE SET count = count + 1",
+                (part,),
+            )
+
+    def most_requested_parts(self, available: List[str], limit: int) -> List[str]:
+        """Return up to ``limit`` of the ``available`` parts, most requested first."""
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT part, count FROM part_requests"))
+        ranked = sorted(
+            (part for part in available if counts.get(part)),
+            key=lambda part: -counts[part],
+        )
+        return ranked[:limit]
@@ -0,0 +1,143 @@
+# Chrome WebDriver provisioning with a cached chromedriver lookup
+import json
+import os
+import re
+import subprocess
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from watermark_remover.download.selenium_utils import enable_performance_logging
+from watermark_remover.utils.file_utils import atomic_path
+
+HOMEPAGE_URL = "https://www.praisecharts.com/"
+
+# Re-resolve the chromedriver through webdriver-manager after this many seconds
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+
+def build_chrome_options():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--start-maximized")
+    options.add_argument("--headless")  # Uncomment if you want to run Chrome in headless mode
+    # Explicitly set a large window size so headless Chrome loads full menus
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--log-level=3")  # Suppress logging
+    # Record network events so page images can be harvested from the log;
+    # jobs that do not harvest discard them (see discard_performance_log)
+    enable_performance_logging(options)
+    return options
+
+
+def get_chromedriver_version(driver_path):
+    try:
+        result = subprocess.run(
+            [driver_path, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=10,
+        )
+    except Exception:
+        return ""
+    match = re.search(r"(\d+(?:\.\d+)+)", result.stdout.decode(errors="ignore"))
+    return match.group(1) if match else ""
+
+
+def load_driver_cache(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_driver_cache(cache_path, driver_path, version):
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    with atomic_path(cache_path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"path": driver_path, "version": version, "resolved_at": time.time()},
+                f,
+            )
+
+
+def resolve_chromedriver(cache_path, force=False, log_func=None):
+    """Return the chromedriver path, preferring the cached lookup.
+
+    ``ChromeDriverManager().install()`` performs a network request, so it is
+    only used when the cache is missing, stale or ``force`` is set.  When the
+    lookup fails (e.g. offline) a stale cached path is still used.  ``None``
+    means no driver is known and Selenium Manager should locate one.
+    """
+    cached = load_driver_cache(cache_path)
+    cached_path = cached.get("path")
+    cached_valid = bool(cached_path) and os.path.isfile(cached_path)
+    fresh = cached_valid and time.time() - cached.get("resolved_at", 0) < DRIVER_CACHE_MAX_AGE
+    if fresh and not force:
+        if log_func:
+            log_func(f"[DEBUG] Using cached chromedriver {cached.get('version')} at {cached_path}")
+        return cached_path
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        driver_path = ChromeDriverManager().install()
+    except Exception as e:
+        if log_func:
+            log_func(f"[DEBUG] chromedriver lookup failed: {str(e)}")
+        return cached_path if cached_valid else None
+
+    version = get_chromedriver_version(driver_path)
+    try:
+        save_driver_cache(cache_path, driver_path, version)
+    except OSError as e:
+        if log_func:
+            log_func(f"[DEBUG] Failed to write chromedriver cache: {str(e)}")
+    if log_func:
+        log_func(f"[DEBUG] Resolved chromedriver {version} at {driver_path}")
+    return driver_path
+
+
+def _launch(driver_path, options):
+    if driver_path:
+        service = Service(driver_path, log_path=os.devnull)
+    else:
+        service = Service(log_path=os.devnull)
+    return webdriver.Chrome(service=service, options=options)
+
+
+def create_driver(cache_path, log_func=None, url=HOMEPAGE_URL):
+    """Start Chrome and load ``url``.
+
+    Returns ``(driver, timings)`` where ``timings`` maps each startup phase
+    to its duration in seconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+    driver_path = resolve_chromedriver(cache_path, log_func=log_func)
+    timings["resolve"] = time.perf_counter() - start
+
+    options = build_chrome_options()
+    start = time.perf_counter()
+    try:
+        driver = _launch(driver_path, options)
+    except Exception as e:
+        # A cached driver may no longer match an updated Chrome; look it up again
+        if log_func:
+            log_func(f"[DEBUG] Chrome failed to start with cached driver: {str(e)}")
+        driver_path = resolve_chromedriver(cache_path, force=True, log_func=log_func)
+        driver = _launch(driver_path, options)
+    timings["launch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        driver.get(url)
+    except Exception:
+        driver.quit()
+        raise
+    timings["load"] = time.perf_counter() - start
+    return driver, timings
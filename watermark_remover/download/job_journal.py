@@ -0,0 +1,103 @@
+# Durable record of batch progress so interrupted runs can resume
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from watermark_remover.utils.file_utils import path_lock
+
+
+def batch_id(entries) -> str:
+    """Stable identifier for a song list; reruns of the same list share it."""
+    payload = json.dumps([list(entry) for entry in entries], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def song_id(index: int, title: str, instrument: str, key: str) -> str:
+    return f"{index}:{title}|{instrument}|{key}"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JobJournal:
+    """Append-only JSONL journal of the steps completed for each song.
+
+    Every line is one event: ``{"song": ..., "step": ..., "time": ...}`` plus
+    step specific data (``option`` for per-option steps).  Lines are flushed
+    and fsynced as they are written, so after a crash the journal reflects
+    every finished step; a truncated final line is ignored on load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._events: List[dict] = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._events.append(json.loads(line))
+                    except ValueError:
+                        continue
+
+    def record(self, song: str, step: str, **data) -> None:
+        event = {'song': song, 'step': step, 'time': time.time(), **data}
+        line = json.dumps(event, ensure_ascii=False)
+        # Appends are serialized per journal file, even across instances
+        with path_lock(self.path):
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        with self._lock:
+            self._events.append(event)
+
+    def song_state(self, song: str) -> Dict[str, dict]:
+        """Latest event of every song-level step (events without ``option``)."""
+        with self._lock:
+            return {
+                e['step']: e for e in self._events
+                if e.get('song') == song and 'option' not in e
+            }
+
+    def option_state(self, song: str, option: int) -> Dict[str, dict]:
+        """Latest event of every step recorded for one search option."""
+        with self._lock:
+            return {
+                e['step']: e for e in self._events
+                if e.get('song') == song and e.get('option') == option
+            }
+
+    def verified_pages(self, song: str, option: int) -> Dict[str, List[str]]:
+        """Return downloaded pages per instrument whose files still match their hash."""
+        fetched = self.option_state(song, option).get('pages_fetched')
+        if not fetched:
+            return {}
+        verified = {}
+        for instrument, pages in fetched.get('pages', {}).items():
+            paths = []
+            for page in pages:
+                try:
+                    if file_sha256(page['path']) != page['sha256']:
+                        break
+                except OSError:
+                    break
+                paths.append(page['path'])
+            else:
+                if paths:
+                    verified[instrument] = paths
+        return verified
+
+    def is_done(self, song: str) -> Optional[dict]:
+        return self.song_state(song).get('done')
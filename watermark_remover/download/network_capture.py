@@ -0,0 +1,143 @@
+# Harvest sheet page image URLs from Chrome's DevTools network log
+import base64
+import json
+import re
+
+from watermark_remover.download.selenium_utils import selenium_lock
+
+# Page images in the preview carousel are named ``<part>_<NNN>.png``
+page_image_pattern = re.compile(r'_(\d{3})\.png(?:\?.*)?$')
+
+
+def page_prefix(url):
+    """Return the part specific portion of a page URL (without ``_NNN.png``)."""
+    return page_image_pattern.sub('', url)
+
+
+def discard_performance_log(driver):
+    """Drop the network events buffered since the log was last read.
+
+    Performance logging is always on (the harvester can be turned on for any
+    download), so chromedriver buffers every request until the log is read;
+    browser jobs that do not harvest call this to keep the buffer small.
+    """
+    try:
+        with selenium_lock:
+            driver.get_log('performance')
+    except Exception:
+        # Logging disabled or the browser is gone; nothing is buffered
+        pass
+
+
+class NetworkImageHarvester:
+    """Collect page image requests observed by the browser.
+
+    The driver must have been created with performance logging enabled (see
+    :func:`selenium_utils.enable_performance_logging`).  Instead of reading the
+    ``src`` attribute of the preview image after every carousel click, the
+    harvester reads the DevTools ``Network.*`` events Chrome records for each
+    request and keeps the request id so the response body can be fetched
+    without downloading the image a second time.
+    """
+
+    def __init__(self, driver, log_func=None):
+        self.driver = driver
+        self.log_func = log_func
+        self.enabled = False
+        # url -> {'page': 'NNN', 'request_id': str, 'finished': bool}
+        self.pages = {}
+        self._url_by_request = {}
+
+    def _log(self, message):
+        if self.log_func:
+            self.log_func(message)
+
+    def enable(self):
+        """Turn on CDP network tracking.  Returns ``False`` if unsupported."""
+        try:
+            with selenium_lock:
+                self.driver.execute_cdp_cmd('Network.enable', {})
+                # Reading the log once verifies performance logging is enabled
+                self.driver.get_log('performance')
+            self.enabled = True
+        except Exception as e:
+            self._log(f"[DEBUG] Network log capture unavailable: {str(e)}")
+            self.enabled = False
+        return self.enabled
+
+    def _read_entries(self):
+        try:
+            with selenium_lock:
+                return self.driver.get_log('performance')
+        except Exception as e:
+            self._log(f"[DEBUG] Failed to read performance log: {str(e)}")
+            return []
+
+    def reset(self):
+        """Drop everything logged so far, e.g. pages of the previous part."""
+        self._read_entries()
+        self.pages = {}
+        self._url_by_request = {}
+
+    def poll(self):
+        """Process new log entries and return the number of new page URLs."""
+        new_pages = 0
+        for entry in self._read_entries():
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                url = response.get('url', '')
+                match = page_image_pattern.search(url)
+                if not match or response.get('status') != 200:
+                    continue
+                if url not in self.pages:
+                    new_pages += 1
+                self.pages[url] = {
+                    'page': match.group(1),
+                    'request_id': params.get('requestId'),
+                    'finished': False,
+                }
+                self._url_by_request[params.get('requestId')] = url
+            elif method == 'Network.loadingFinished':
+                url = self._url_by_request.get(params.get('requestId'))
+                if url in self.pages:
+                    self.pages[url]['finished'] = True
+        return new_pages
+
+    def page_urls(self, prefix=None):
+        """Return harvested page URLs ordered by page number.
+
+        If ``prefix`` is given only pages belonging to that part are returned.
+        """
+        urls = [
+            url for url in self.pages
+            if prefix is None or page_prefix(url) == prefix
+        ]
+        return sorted(urls, key=lambda u: self.pages[u]['page'])
+
+    def fetch_body(self, url):
+        """Return the response body for ``url`` from the browser, or ``None``.
+
+        Bodies are only available while Chrome still holds them in its network
+        buffer, so callers should fall back to a plain HTTP request.
+        """
+        info = self.pages.get(url)
+        if not info or not info['finished']:
+            return None
+        try:
+            with selenium_lock:
+                result = self.driver.execute_cdp_cmd(
+                    'Network.getResponseBody', {'requestId': info['request_id']}
+                )
+        except Exception as e:
+            self._log(f"[DEBUG] Response body unavailable for {url}: {str(e)}")
+            return None
+        body = result.get('body', '')
+        if result.get('base64Encoded'):
+            return base64.b64decode(body)
+        return body.encode('latin-1')
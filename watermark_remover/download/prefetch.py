@@ -0,0 +1,72 @@
+# Pages downloaded speculatively while the user is still choosing
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from watermark_remover.download.catalog import normalize_product_url
+
+# Number of parts fetched ahead of time for a selected song
+PREFETCH_PART_COUNT = 2
+
+
+class PrefetchCache:
+    """Page files fetched ahead of a download, keyed by (song, key, part).
+
+    ``take`` hands the pages over to the download that asked for them and
+    counts a hit or a miss; entries never taken are deleted by ``discard``
+    and counted as wasted.  The counters are kept for the whole session so
+    the hit rate can be used to tune how much is prefetched.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], List[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.wasted_parts = 0
+        self.wasted_pages = 0
+
+    @staticmethod
+    def _entry_key(product_url: str, key: str, part: str) -> Tuple[str, str, str]:
+        return normalize_product_url(product_url), key, part
+
+    def put(self, product_url: str, key: str, part: str, paths: List[str]) -> None:
+        with self._lock:
+            self._entries[self._entry_key(product_url, key, part)] = list(paths)
+
+    def contains(self, product_url: str, key: str, part: str) -> bool:
+        with self._lock:
+            return self._entry_key(product_url, key, part) in self._entries
+
+    def take(self, product_url: str, key: str, part: str) -> Optional[List[str]]:
+        """Remove and return the prefetched pages of a part, or ``None``."""
+        with self._lock:
+            paths = self._entries.pop(self._entry_key(product_url, key, part), None)
+            if paths and all(os.path.exists(path) for path in paths):
+                self.hits += 1
+                return paths
+            self.misses += 1
+            return None
+
+    def discard(self) -> None:
+        """Delete every page nobody asked for."""
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        for paths in entries.values():
+            self.wasted_parts += 1
+            self.wasted_pages += len(paths)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def hit_rate(self) -> Optional[float]:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else None
+
+    def summary(self) -> str:
+        rate = self.hit_rate()
+        rate_text = f"{rate:.0%}" if rate is not None else "n/a"
+        return (f"Prefetch: {self.hits} hits, {self.misses} misses, "
+                f"{self.wasted_parts} wasted parts ({self.wasted_pages} pages), hit rate {rate_text}")
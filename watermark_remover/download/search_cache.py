@@ -0,0 +1,55 @@
+# Time-limited cache of PraiseCharts search results
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query (e.g. '  Way  Maker ' -> 'way maker')."""
+    return ' '.join(query.lower().split())
+
+
+class SearchCache:
+    """Cache search results keyed by normalized query.
+
+    Each result is a dict with ``text``, ``image_url``, ``product_url`` and
+    ``is_song`` keys.  Storing the product URL lets later selections navigate
+    straight to a song's page instead of repeating the search.  Results with
+    a song that has no product URL are not cached: selecting that song means
+    clicking it on the search page, which a cache hit never opens.  Entries
+    expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float = 15 * 60, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[List[dict]]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if self._clock() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return [dict(r) for r in results]
+
+    def put(self, query: str, results: List[dict]) -> None:
+        key = normalize_query(query)
+        cacheable = all(r.get('product_url') or not r.get('is_song') for r in results)
+        with self._lock:
+            if cacheable:
+                self._entries[key] = (self._clock(), [dict(r) for r in results])
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate(self, query: Optional[str] = None) -> None:
+        with self._lock:
+            if query is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_query(query), None)
@@ -18,6 +18,7 @@ selenium_lock = threading.Lock()
 xpaths = {
     'search_bar': '//*[@id="search-input-wrap"]/input',
     'songs_parent': '//*[@id="page-wrapper"]/ion-router-outlet/app-page-search/ion-content/div/div/div/app-search/div',
+    'song_link': './div/a',
     'song_title': './div/a/div/h5',
     'song_text3': './div/a/div/span/span',
     'song_text2': './div/a/div/span',
@@ -35,6 +36,15 @@ xpaths = {
 }
 
 
+def enable_performance_logging(options):
+    """Ask Chrome to record DevTools network events in the performance log.
+
+    This is required for :class:`network_capture.NetworkImageHarvester`.
+    """
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
 class SeleniumHelper:
     """Utility methods for common Selenium operations."""
 
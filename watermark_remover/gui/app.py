@@ -7,13 +7,12 @@ import os
 import sys
 import time
 from collections import defaultdict
-from datetime import datetime
 import subprocess
 import platform
 
 # Third-party library imports
-from PyQt5.QtGui import QIcon, QTextCursor, QFont, QPixmap
-from PyQt5.QtCore import Qt, pyqtSlot, QThread, pyqtSignal, QByteArray, QSize, QTimer
+from PyQt5.QtGui import QIcon, QFont, QPixmap, QImage
+from PyQt5.QtCore import Qt, pyqtSlot, QThread, pyqtSignal, QByteArray, QSize
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -26,6 +25,7 @@ from PyQt5.QtWidgets import (
     QWidget,
     QLabel,
     QComboBox,
+    QDoubleSpinBox,
     QTextEdit,
     QGroupBox,
     QDialog,
@@ -44,26 +44,34 @@ from watermark_remover.utils.transposition_utils import (
     VALID_KEYS,
     INSTRUMENT_TRANSPOSITIONS,
 )
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import requests
 
 # Imports moved to dedicated modules
 from watermark_remover.download.selenium_utils import SeleniumHelper, xpaths
 from watermark_remover.threads.sheet_music_threads import (
+    DriverInitThread,
     FindSongsThread,
     SelectSongThread,
     SelectKeyThread,
     DownloadAndProcessThread,
+    PrefetchThread,
 )
 from watermark_remover.download.batch_processor import BatchProcessor
+from watermark_remover.download.search_cache import SearchCache
+from watermark_remover.download.catalog import CatalogIndex
+from watermark_remover.download.prefetch import PrefetchCache, PREFETCH_PART_COUNT
+from watermark_remover.inference.page_dedup import PageIndex
+from watermark_remover.inference.quality_tiers import DEFAULT_TIER, QUALITY_TIERS
+from watermark_remover.inference.watermark_detector import DEFAULT_THRESHOLD, WatermarkDetector, load_grayscale
 from watermark_remover.gui.dialogs.batch_grid_dialog import BatchGridDialog
+from watermark_remover.gui.thumbnail_loader import ThumbnailLoader
+from watermark_remover.gui.live_view import LiveViewThread, LiveViewLabel
+from watermark_remover.gui.log_sink import LogSink
 
 # Main application window
 class App(QMainWindow):
     def __init__(self, *args, **kwargs):
         super(App, self).__init__(*args, **kwargs)
+        self.startup_time = time.perf_counter()
 
         self.paths = {
             'window_icon_path': 'data/Church_Music_Watermark/praisecharts-logo-icon-only.png',
@@ -71,33 +79,15 @@ class App(QMainWindow):
             'us_model_path': 'models/VDSR',
             'download_dir': 'Praise_Charts',
             'temp_sub_dir': 'temp',
-            'tensor_path': 'data/Church_Music_Watermark/mask.png'
+            'tensor_path': 'data/Church_Music_Watermark/mask.png',
+            'cache_dir': '.cache',
         }
 
         self.setWindowIcon(QIcon(self.paths['window_icon_path']))
 
-        options = webdriver.ChromeOptions()
-        options.add_argument("--start-maximized")
-        options.add_argument("--headless")  # Uncomment if you want to run Chrome in headless mode
-        # Explicitly set a large window size so headless Chrome loads full menus
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--log-level=3")  # Suppress logging
-
-        # **Suppress WebDriver Manager logs by setting log_level**
-        driver_manager = ChromeDriverManager()  # 0 for INFO, 1 for WARNING, etc.
-
-        # **Suppress ChromeDriver logs by redirecting stdout and stderr**
-        service = Service(driver_manager.install(), log_path=os.devnull)
-
-        # driver_path = '/usr/bin/google-chrome-stable'
-        # service = Service(driver_path, log_path=os.devnull)
-
-        self.driver = webdriver.Chrome(service=service, options=options)
-        url = "https://www.praisecharts.com/"
-        self.driver.get(url)
+        # The browser is started in the background (see start_driver) so the
+        # window appears immediately.  Until it is ready self.driver is None.
+        self.driver = None
         self.song_info = []  # Changed to list of dicts
         self.button_elements = []
         self.full_paths = []
@@ -105,6 +95,30 @@ class App(QMainWindow):
         self.selected_instruments = []  # To store selected instruments
         self.is_song_selected = False  # Flag to track if a song has been selected
         self.batch_processor = BatchProcessor(self)
+        # Shared by interactive and batch searches so repeated queries (and
+        # the batch processor's per-option re-search) skip the browser.
+        self.search_cache = SearchCache()
+        # Local index of scraped songs, keys, parts and page counts
+        self.catalog = CatalogIndex(os.path.join(self.paths['cache_dir'], 'catalog.sqlite3'))
+        # Search result thumbnails are fetched off the GUI thread and cached
+        self.thumbnail_loader = ThumbnailLoader(
+            os.path.join(self.paths['cache_dir'], 'thumbnails'), parent=self
+        )
+        self.thumbnail_loader.pixmap_ready.connect(self.update_song_choice_icon)
+        # Parts downloaded speculatively after a song is selected
+        self.prefetch_cache = PrefetchCache()
+        self.prefetch_thread = None
+        # Worker threads waiting, in order, for the browser to be freed by a
+        # prefetch, a cancelled job or an earlier queued thread, and the
+        # jobs using it
+        self.deferred_threads = []
+        self.driver_jobs = set()
+        self.download_and_process_images_thread = None
+        # Processed pages by perceptual hash, so repeated pages in later
+        # parts and songs skip inference; optionally kept across runs
+        self.page_index = PageIndex(os.path.join(self.paths['cache_dir'], 'processed_pages'))
+        # Watermark mask, loaded when clean-page detection is first used
+        self.watermark_mask = None
 
 
         self.setWindowTitle("Praise Charts Music Downloader")
@@ -180,15 +194,42 @@ class App(QMainWindow):
         # GUI elements
         self.create_widgets()
         self.create_layout()
-        # Start a timer to periodically update the Selenium live view.  A lower
-        # interval results in smoother updates at the cost of increased CPU
-        # usage.  If selenium is not initialised yet the update function
-        # handles the exception gracefully.
-        self.live_timer = QTimer(self)
-        self.live_timer.timeout.connect(self.update_live_view)
-        # Update every 2 seconds; adjust as necessary for responsiveness
-        self.live_timer.start(2000)
+        # Screenshots for the live view are captured on a background thread,
+        # which idles until the driver exists and backs off while the page is
+        # unchanged.
+        self.live_view_dialog = None
+        self.live_view_thread = LiveViewThread(lambda: self.driver)
+        self.live_view_thread.frame_ready.connect(self.update_live_view)
+        self.live_view_thread.set_target('main', self.live_view_label.size())
+        self.live_view_thread.start()
         self.show()
+        self.append_log(f"[DEBUG] Window shown after {time.perf_counter() - self.startup_time:.2f}s")
+        self.start_driver()
+
+    def start_driver(self):
+        """Launch Chrome on a worker thread; search is enabled once it is ready."""
+        self.disable_search_section()
+        self.batch_process_button.setEnabled(False)
+        self.updateStatusLabel("Starting browser...")
+        cache_path = os.path.join(self.paths['cache_dir'], 'chromedriver.json')
+        self.driver_init_thread = DriverInitThread(cache_path)
+        self.driver_init_thread.log_updated.connect(self.update_log)
+        self.driver_init_thread.driver_ready.connect(self.on_driver_ready)
+        self.driver_init_thread.driver_failed.connect(self.on_driver_failed)
+        self.driver_init_thread.start()
+
+    @pyqtSlot(object)
+    def on_driver_ready(self, driver):
+        self.driver = driver
+        self.updateStatusLabel("")
+        self.enable_search_section()
+        self.batch_process_button.setEnabled(True)
+        self.append_log(f"[DEBUG] Browser available {time.perf_counter() - self.startup_time:.2f}s after launch")
+
+    @pyqtSlot(str)
+    def on_driver_failed(self, message):
+        self.updateStatusLabel("Browser unavailable")
+        QMessageBox.warning(self, "Browser Error", f"Could not start the browser: {message}")
 
     def create_widgets(self):
         # Search Section
@@ -251,6 +292,49 @@ class App(QMainWindow):
         self.horn_checkbox = QCheckBox("Download horn image only", self)
         self.horn_checkbox.setToolTip("Check this box to download only horn images")
 
+        self.network_log_checkbox = QCheckBox("Capture pages from network log", self)
+        self.network_log_checkbox.setToolTip(
+            "Collect page images from the browser's network requests instead of reading each page from the preview"
+        )
+
+        self.prefetch_checkbox = QCheckBox("Prefetch likely parts", self)
+        self.prefetch_checkbox.setToolTip(
+            "Download your most requested parts in the default key while you are still choosing"
+        )
+
+        self.reuse_pages_checkbox = QCheckBox("Reuse processed pages across runs", self)
+        self.reuse_pages_checkbox.setToolTip(
+            "Keep processed pages on disk so identical pages in later runs skip watermark removal and upscaling"
+        )
+        self.reuse_pages_checkbox.toggled.connect(self.set_page_reuse)
+
+        self.detect_watermark_checkbox = QCheckBox("Skip watermark removal on clean pages (experimental)", self)
+        self.detect_watermark_checkbox.setToolTip(
+            "Experimental: compare each page with the watermark mask and send only watermarked pages through "
+            "the watermark model. The threshold has only been checked on synthetic pages, so a real "
+            "watermarked page may be skipped and keep its watermark."
+        )
+        self.watermark_threshold_spin = QDoubleSpinBox(self)
+        self.watermark_threshold_spin.setRange(0.0, 1.0)
+        self.watermark_threshold_spin.setSingleStep(0.01)
+        self.watermark_threshold_spin.setDecimals(2)
+        self.watermark_threshold_spin.setValue(DEFAULT_THRESHOLD)
+        self.watermark_threshold_spin.setToolTip(
+            "Lowest match with the watermark mask for a page to go through the watermark model; "
+            "lower values skip fewer pages. Check it on your own pages with "
+            "python -m watermark_remover.benchmarks.watermark_detection --samples DIR"
+        )
+        self.watermark_threshold_spin.setEnabled(False)
+        self.detect_watermark_checkbox.toggled.connect(self.watermark_threshold_spin.setEnabled)
+
+        self.quality_combo = QComboBox(self)
+        for tier, description in QUALITY_TIERS.items():
+            self.quality_combo.addItem(description, tier)
+        self.quality_combo.setCurrentIndex(self.quality_combo.findData(DEFAULT_TIER))
+        self.quality_combo.setToolTip(
+            "Draft skips the VDSR upscaler for quick copies; Maximum blends overlapping tiles"
+        )
+
         self.select_instruments_button = QPushButton("Select Instruments", self)
         self.select_instruments_button.setEnabled(False)
         self.select_instruments_button.clicked.connect(self.open_instrument_selection_dialog)
@@ -259,11 +343,21 @@ class App(QMainWindow):
         self.download_and_process_button.setToolTip("Download and process images for the selected song")
         self.download_and_process_button.clicked.connect(self.download_and_process_images)
 
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.setToolTip("Stop the running download; the next job can start right away")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_download)
+
         # Batch processing button
         self.batch_process_button = QPushButton("Batch Process List", self)
         self.batch_process_button.setToolTip("Enter a list of songs for batch processing")
         self.batch_process_button.clicked.connect(self.batch_process_songs)
 
+        self.stop_batch_button = QPushButton("Stop Batch", self)
+        self.stop_batch_button.setToolTip("Cancel the current song and skip the rest of the list")
+        self.stop_batch_button.setEnabled(False)
+        self.stop_batch_button.clicked.connect(self.stop_batch)
+
         # Log and Progress Bar
         self.debug_checkbox = QCheckBox("Enable Debug Logging", self)
         self.debug_checkbox.setToolTip("Show debug messages in the log")
@@ -272,6 +366,9 @@ class App(QMainWindow):
         self.log_area = QTextEdit(self)
         self.log_area.setReadOnly(True)
         self.log_area.setToolTip("Log area displaying process updates")
+        # Messages are appended in batches and also written to a log file
+        self.log_sink = LogSink(self.log_area, os.path.join(self.paths['cache_dir'], 'logs'), parent=self)
+        self.debug_checkbox.toggled.connect(self.log_sink.set_show_debug)
 
         self.progress_label = QLabel("", self)
         self.progress_label.setAlignment(Qt.AlignCenter)
@@ -380,6 +477,13 @@ class App(QMainWindow):
         download_group = QGroupBox("Download Options")
         download_layout = QHBoxLayout()
         download_layout.addWidget(self.horn_checkbox)
+        download_layout.addWidget(self.network_log_checkbox)
+        download_layout.addWidget(self.prefetch_checkbox)
+        download_layout.addWidget(self.reuse_pages_checkbox)
+        download_layout.addWidget(self.detect_watermark_checkbox)
+        download_layout.addWidget(self.watermark_threshold_spin)
+        download_layout.addWidget(QLabel("Quality:", self))
+        download_layout.addWidget(self.quality_combo)
         download_layout.addWidget(self.select_instruments_button)
         download_group.setLayout(download_layout)
 
@@ -390,8 +494,14 @@ class App(QMainWindow):
         main_layout.addWidget(key_group)
         main_layout.addWidget(transposition_group)  # Add the transposition group
         main_layout.addWidget(download_group)
-        main_layout.addWidget(self.download_and_process_button)
-        main_layout.addWidget(self.batch_process_button)
+        download_button_layout = QHBoxLayout()
+        download_button_layout.addWidget(self.download_and_process_button)
+        download_button_layout.addWidget(self.cancel_button)
+        main_layout.addLayout(download_button_layout)
+        batch_button_layout = QHBoxLayout()
+        batch_button_layout.addWidget(self.batch_process_button)
+        batch_button_layout.addWidget(self.stop_batch_button)
+        main_layout.addLayout(batch_button_layout)
 
         log_header_layout = QHBoxLayout()
         log_header_layout.addWidget(QLabel("Log:"))
@@ -429,6 +539,9 @@ class App(QMainWindow):
 
 
     def enable_search_section(self):
+        # A batch drives the browser itself; keep the controls locked
+        if self.batch_processor.running:
+            return
         self.song_search_box.setEnabled(True)
         self.search_button.setEnabled(True)
 
@@ -437,6 +550,8 @@ class App(QMainWindow):
         self.search_button.setEnabled(False)
 
     def enable_song_selection(self):
+        if self.batch_processor.running:
+            return
         self.song_choice_box.setEnabled(True)
         self.song_select_button.setEnabled(True)
 
@@ -445,6 +560,8 @@ class App(QMainWindow):
         self.song_select_button.setEnabled(False)
 
     def enable_key_selection(self):
+        if self.batch_processor.running:
+            return
         self.key_choice_box.setEnabled(True)
 
     def disable_key_selection(self):
@@ -459,6 +576,8 @@ class App(QMainWindow):
         self.horn_checkbox.setEnabled(False)
 
     def enable_after_download(self):
+        if self.batch_processor.running:
+            return
         self.enable_search_section()
         self.enable_key_selection()
         # Do not enable song selection
@@ -471,14 +590,22 @@ class App(QMainWindow):
     def batch_process_songs(self):
         instruments = sorted(INSTRUMENT_TRANSPOSITIONS.keys())
         keys = sorted(VALID_KEYS)
-        dialog = BatchGridDialog(instruments, keys, self)
+        dialog = BatchGridDialog(instruments, keys, self, tier=self.quality_combo.currentData())
         if dialog.exec_() != QDialog.Accepted:
             return
         entries = dialog.get_entries()
         if not entries:
             QMessageBox.information(self, "No Songs", "No valid songs entered.")
             return
-        self.batch_processor.process_batch(entries)
+        self.release_driver()
+        self.prefetch_cache.discard()
+        self.disable_all_sections()
+        self.stop_batch_button.setEnabled(True)
+        try:
+            self.batch_processor.process_batch(entries, policy=dialog.get_policy(), tier=dialog.get_tier())
+        finally:
+            self.stop_batch_button.setEnabled(False)
+            self.enable_all_sections()
 
     def open_instrument_selection_dialog(self):
         if not self.instrument_parts:
@@ -523,14 +650,7 @@ class App(QMainWindow):
 
 
     def append_log(self, message):
-        if message.startswith("[DEBUG]") and not self.debug_checkbox.isChecked():
-            return
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        formatted_message = f"{timestamp}: {message}"
-        self.log_area.append(formatted_message)
-        cursor = self.log_area.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_area.setTextCursor(cursor)
+        self.log_sink.write(message)
 
     def updateProgressBar(self, val):
         self.progressBar.setValue(val)
@@ -538,119 +658,48 @@ class App(QMainWindow):
     def updateStatusLabel(self, message):
         self.progress_label.setText(message)
 
-    def update_live_view(self):
-        """
-        Capture a screenshot from the Selenium driver and display it in the
-        live view label.  If the driver is not available or an error
-        occurs, the function simply returns.  The screenshot is scaled
-        proportionally to fit within the live view area while preserving
-        the aspect ratio.
-        """
-        try:
-            # Take a PNG screenshot from the Selenium controlled browser
-            png_data = self.driver.get_screenshot_as_png()
-            pixmap = QPixmap()
-            pixmap.loadFromData(QByteArray(png_data))
-            # Scale the pixmap to the size of the live view label
-            scaled = pixmap.scaled(
-                self.live_view_label.width(),
-                self.live_view_label.height(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
-            )
-            self.live_view_label.setPixmap(scaled)
-        except Exception:
-            # If the driver hasn't loaded a page yet or another exception occurs,
-            # we do not update the view.  A more robust implementation could
-            # display an error message or placeholder image here.
-            pass
-
-    @pyqtSlot(str)
-    def show_download_preview(self, path: str) -> None:
-        """
-        Display the downloaded image specified by `path` in the download
-        preview label.  The image is scaled to fit while maintaining its
-        aspect ratio.
-        """
-        try:
-            pixmap = QPixmap(path)
-            if pixmap.isNull():
-                return
-            scaled = pixmap.scaled(
-                self.download_preview_label.width(),
-                self.download_preview_label.height(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
-            )
-            self.download_preview_label.setPixmap(scaled)
-        except Exception:
-            pass
-
-    @pyqtSlot(str)
-    def show_watermark_preview(self, path: str) -> None:
-        """
-        Display the watermark‑removed image specified by `path` in the
-        watermark preview label.
-        """
-        try:
-            pixmap = QPixmap(path)
-            if pixmap.isNull():
-                return
-            scaled = pixmap.scaled(
-                self.watermark_preview_label.width(),
-                self.watermark_preview_label.height(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
-            )
-            self.watermark_preview_label.setPixmap(scaled)
-            # Once the pixmap is loaded into the label the underlying file can be
-            # safely deleted; the GUI keeps its own copy in memory.  This avoids
-            # leftover preview files on disk while still preserving the preview
-            # visually in the application.  We only remove files that are
-            # previews (contain "_preview" in the filename) to avoid deleting
-            # downloaded source images.
-            try:
-                base_name = os.path.basename(path)
-                if "_preview" in base_name and os.path.exists(path):
-                    os.remove(path)
-            except Exception:
-                pass
-        except Exception:
-            pass
-
-    @pyqtSlot(str)
-    def show_upscale_preview(self, path: str) -> None:
-        """
-        Display the upscaled image specified by `path` in the upscaled
-        preview label.
-        """
-        try:
-            pixmap = QPixmap(path)
-            if pixmap.isNull():
-                return
-            scaled = pixmap.scaled(
-                self.upscale_preview_label.width(),
-                self.upscale_preview_label.height(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
-            )
-            self.upscale_preview_label.setPixmap(scaled)
-            # Remove the preview file after loading to free disk space.
-            try:
-                base_name = os.path.basename(path)
-                if "_preview" in base_name and os.path.exists(path):
-                    os.remove(path)
-            except Exception:
-                pass
-        except Exception:
-            pass
+    @pyqtSlot(str, QImage)
+    def update_live_view(self, target, image):
+        """Show a live view frame, already scaled to fit, in its label."""
+        if target == 'main':
+            self.live_view_label.setPixmap(QPixmap.fromImage(image))
+        elif target == 'popup' and self.live_view_dialog is not None:
+            self.live_view_dialog.view_label.setPixmap(QPixmap.fromImage(image))
+
+    @pyqtSlot(QImage)
+    def show_download_preview(self, image: QImage) -> None:
+        """Display a thumbnail of the page that was just downloaded."""
+        self.show_preview(self.download_preview_label, image)
+
+    @pyqtSlot(QImage)
+    def show_watermark_preview(self, image: QImage) -> None:
+        """Display a thumbnail of a page after watermark removal."""
+        self.show_preview(self.watermark_preview_label, image)
+
+    @pyqtSlot(QImage)
+    def show_upscale_preview(self, image: QImage) -> None:
+        """Display a thumbnail of a page after upscaling."""
+        self.show_preview(self.upscale_preview_label, image)
+
+    def show_preview(self, label, image):
+        # Worker threads send thumbnails already sized for the labels, so
+        # this is a cheap conversion rather than a full-page decode and scale.
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        if pixmap.width() > label.width() or pixmap.height() > label.height():
+            pixmap = pixmap.scaled(label.width(), label.height(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        label.setPixmap(pixmap)
 
     def open_live_view_popup(self) -> None:
         """
         Open a pop‑up window containing a larger, resizable view of the
-        Selenium browser.  The pop‑up periodically refreshes the image and
+        Selenium browser.  The pop‑up shows frames from the live view thread and
         provides a button to save the current screenshot to disk.
         """
+        if self.live_view_dialog is not None:
+            self.live_view_dialog.raise_()
+            return
         dialog = QDialog(self)
         dialog.setWindowTitle("Selenium Live View")
         # Make the dialog non‑modal so the user can continue interacting
@@ -662,7 +711,7 @@ class App(QMainWindow):
 
         # Label to display the live view.  Using a separate label ensures
         # resizing of the pop‑up does not affect the main window's live view.
-        view_label = QLabel(dialog)
+        view_label = LiveViewLabel(dialog)
         view_label.setAlignment(Qt.AlignCenter)
         view_label.setStyleSheet("border: 1px solid #555;")
         view_label.setMinimumSize(400, 300)
@@ -672,31 +721,16 @@ class App(QMainWindow):
         save_button = QPushButton("Save Screenshot", dialog)
         layout.addWidget(save_button, 0)
 
-        # Timer to refresh the view every two seconds
-        timer = QTimer(dialog)
-        def update_view():
-            try:
-                png_data = self.driver.get_screenshot_as_png()
-                pixmap = QPixmap()
-                pixmap.loadFromData(QByteArray(png_data))
-                # Store the unscaled pixmap so we can save it later
-                dialog.current_pixmap = pixmap
-                scaled = pixmap.scaled(
-                    view_label.size(),
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation,
-                )
-                view_label.setPixmap(scaled)
-            except Exception:
-                pass
-        # Connect timer
-        timer.timeout.connect(update_view)
-        timer.start(2000)
-        # Initial update
-        update_view()
+        # Frames arrive from the live view thread, decoded at the label's size
+        dialog.view_label = view_label
+        view_label.resized.connect(lambda size: self.live_view_thread.set_target('popup', size))
+        dialog.finished.connect(self.close_live_view_popup)
+        self.live_view_thread.set_target('popup', view_label.size())
 
         def save_screenshot():
-            if hasattr(dialog, 'current_pixmap'):
+            # The latest full-resolution capture, not the scaled frame shown
+            png_data = self.live_view_thread.last_png
+            if png_data is not None:
                 file_path, _ = QFileDialog.getSaveFileName(
                     dialog,
                     "Save Screenshot",
@@ -704,7 +738,7 @@ class App(QMainWindow):
                     "PNG Files (*.png);;All Files (*)",
                 )
                 if file_path:
-                    dialog.current_pixmap.save(file_path)
+                    QImage.fromData(QByteArray(png_data)).save(file_path)
         save_button.clicked.connect(save_screenshot)
 
         dialog.resize(800, 600)
@@ -714,6 +748,10 @@ class App(QMainWindow):
         dialog.setModal(False)
         dialog.show()
 
+    def close_live_view_popup(self) -> None:
+        self.live_view_thread.remove_target('popup')
+        self.live_view_dialog = None
+
     def open_image_preview_popup(self) -> None:
         """
         Open a pop‑up window containing larger versions of the download,
@@ -787,7 +825,23 @@ class App(QMainWindow):
         dialog.show()
 
     def closeEvent(self, event):
-        self.driver.quit()
+        # Let a pending startup finish so its browser is not left running
+        self.driver_init_thread.wait()
+        self.batch_processor.cancel()
+        if self.download_and_process_images_thread is not None:
+            self.download_and_process_images_thread.cancel()
+        for job in self.release_driver():
+            job.wait()
+        self.prefetch_cache.discard()
+        self.thumbnail_loader.shutdown()
+        self.live_view_thread.stop()
+        self.live_view_thread.wait()
+        # driver_ready is queued, so after wait() the driver may only be
+        # known to the startup thread
+        driver = self.driver or self.driver_init_thread.driver
+        if driver is not None:
+            driver.quit()
+        self.log_sink.close()
         event.accept()
 
     @pyqtSlot()
@@ -810,8 +864,9 @@ class App(QMainWindow):
         self.instrument_parts.clear()
         self.selected_instruments.clear()
         self.target_key_input.clear()  # Also clears the target key input
+        self.prefetch_cache.discard()
 
-        self.find_songs_thread = FindSongsThread(driver, user_song_choice)
+        self.find_songs_thread = FindSongsThread(driver, user_song_choice, self.search_cache)
         self.find_songs_thread.log_updated.connect(self.update_log)
         self.find_songs_thread.progress.connect(self.updateProgressBar)
         self.find_songs_thread.status.connect(self.updateStatusLabel)
@@ -827,7 +882,7 @@ class App(QMainWindow):
         self.find_songs_thread.finished.connect(self.enable_song_selection)
         self.find_songs_thread.finished.connect(self.disable_key_selection)
         self.find_songs_thread.finished.connect(self.check_search_results)
-        self.find_songs_thread.start()
+        self.start_when_driver_free(self.find_songs_thread)
 
         # Disable song selection UI until search completes
         self.disable_song_selection()
@@ -853,8 +908,12 @@ class App(QMainWindow):
     
         selected_song_title = selected_song.split('\n')[0]
         user_song_choice = self.song_search_box.text()
+        product_url = self.song_info[selected_song_index].get('product_url')
+        self.prefetch_cache.discard()
     
-        self.select_song_thread = SelectSongThread(self.driver, selected_song, selected_song_index, selected_song_title, user_song_choice)
+        self.select_song_thread = SelectSongThread(
+            self.driver, selected_song, selected_song_index, selected_song_title, user_song_choice,
+            product_url=product_url, catalog=self.catalog)
         self.select_song_thread.log_updated.connect(self.update_log)
         self.select_song_thread.progress.connect(self.updateProgressBar)
         self.select_song_thread.status.connect(self.updateStatusLabel)
@@ -868,7 +927,8 @@ class App(QMainWindow):
         self.select_song_thread.finished.connect(self.enable_search_section)
         self.select_song_thread.finished.connect(self.disable_song_selection)
         self.select_song_thread.finished.connect(self.enable_key_selection)
-        self.select_song_thread.start()
+        self.select_song_thread.finished.connect(self.start_prefetch)
+        self.start_when_driver_free(self.select_song_thread)
     
         # Set the flag that a song has been selected
         self.is_song_selected = True
@@ -898,7 +958,7 @@ class App(QMainWindow):
             self.append_log("No key selected.")
             return
 
-        self.select_key_thread = SelectKeyThread(self.driver, selected_key, self.button_elements)
+        self.select_key_thread = SelectKeyThread(self.driver, selected_key, self.button_elements, catalog=self.catalog)
         self.select_key_thread.log_updated.connect(self.update_log)
         self.select_key_thread.progress.connect(self.updateProgressBar)
         self.select_key_thread.status.connect(self.updateStatusLabel)
@@ -906,12 +966,122 @@ class App(QMainWindow):
         self.select_key_thread.started.connect(self.disable_search_section)
         self.select_key_thread.finished.connect(self.enable_search_section)
         self.select_key_thread.finished.connect(self.update_transposition_suggestions)  # Update suggestions after key selection
-        self.select_key_thread.start()
+        self.start_when_driver_free(self.select_key_thread)
 
         
         # Update transposition suggestions
         self.update_transposition_suggestions()
     
+    def start_prefetch(self):
+        """Fetch the most requested parts of the selected song's default key."""
+        thread = self.select_song_thread
+        if not self.prefetch_checkbox.isChecked() or self.driver is None:
+            return
+        # The next batch step would cancel it straight away
+        if self.batch_processor.running:
+            return
+        if not thread.song_url or not thread.current_key or not self.instrument_parts:
+            return
+        try:
+            parts = self.catalog.most_requested_parts(self.instrument_parts, PREFETCH_PART_COUNT)
+        except Exception as e:
+            self.append_log(f"[DEBUG] Could not rank parts for prefetching: {str(e)}")
+            parts = []
+        if not parts and self.default_instrument in self.instrument_parts:
+            parts = [self.default_instrument]
+        if not parts:
+            return
+        self.append_log(f"[DEBUG] Prefetching {', '.join(parts)} in {thread.current_key}")
+        self.prefetch_thread = PrefetchThread(
+            self.driver, thread.current_key, thread.song_url, parts, self.paths,
+            self.prefetch_cache, catalog=self.catalog)
+        self.prefetch_thread.log_updated.connect(self.update_log)
+        self.prefetch_thread.start()
+
+    def release_driver(self):
+        """Ask background jobs to free the browser; return those still running.
+
+        A running prefetch is cancelled, and a cancelled download stops at
+        its next page or tile.  Neither is waited for here, so the GUI does
+        not block on a Selenium step.
+        """
+        busy = []
+        if self.prefetch_thread is not None and self.prefetch_thread.isRunning():
+            self.prefetch_thread.cancel()
+            busy.append(self.prefetch_thread)
+        thread = self.download_and_process_images_thread
+        if thread is not None and thread.cancel_token.is_cancelled and thread.isRunning():
+            busy.append(thread)
+        return busy
+
+    def start_when_driver_free(self, thread):
+        """Start ``thread`` as soon as the background jobs have freed the browser.
+
+        Threads are queued rather than dropped, since a batch may be waiting
+        for one to finish; each starts once the previous one is done.
+        """
+        self.deferred_threads.append(thread)
+        for job in self.release_driver():
+            self.track_driver_job(job)
+        # Jobs that finished before their signal was connected
+        self.driver_jobs = {job for job in self.driver_jobs if not job.isFinished()}
+        self.start_deferred_thread()
+
+    def track_driver_job(self, job):
+        if job not in self.driver_jobs:
+            self.driver_jobs.add(job)
+            job.finished.connect(self.driver_job_finished)
+
+    @pyqtSlot()
+    def driver_job_finished(self):
+        self.driver_jobs.discard(self.sender())
+        self.start_deferred_thread()
+
+    def start_deferred_thread(self):
+        if self.driver_jobs or not self.deferred_threads:
+            return
+        thread = self.deferred_threads.pop(0)
+        # Later queued threads wait for this one
+        self.track_driver_job(thread)
+        thread.start()
+        # The job is about to navigate; refresh the live view quickly
+        self.live_view_thread.poke()
+
+    def create_watermark_detector(self):
+        """Return a detector for one job, or None if detection is off or unavailable."""
+        if not self.detect_watermark_checkbox.isChecked():
+            return None
+        try:
+            if self.watermark_mask is None:
+                self.watermark_mask = load_grayscale(self.paths['tensor_path'])
+            return WatermarkDetector(self.watermark_mask, self.watermark_threshold_spin.value())
+        except Exception as e:
+            self.append_log(f"Watermark detection unavailable: {str(e)}")
+            return None
+
+    @pyqtSlot(bool)
+    def set_page_reuse(self, enabled):
+        self.page_index.persist = enabled
+
+    @pyqtSlot()
+    def cancel_download(self):
+        thread = self.download_and_process_images_thread
+        # A job still waiting for the browser has not started running yet
+        if thread is None or thread.isFinished():
+            return
+        thread.cancel()
+        self.cancel_button.setEnabled(False)
+        self.append_log("Cancelling download...")
+        if not self.batch_processor.running:
+            # Let the user pick the next job while the old one winds down
+            self.enable_all_sections()
+
+    @pyqtSlot()
+    def stop_batch(self):
+        self.stop_batch_button.setEnabled(False)
+        self.append_log("Stopping batch...")
+        self.batch_processor.cancel()
+
     def clear_transposition_suggestions(self):
         self.direct_transpositions_display.clear()
         self.closest_matches_display.clear()
@@ -1037,7 +1207,7 @@ class App(QMainWindow):
 
 
     @pyqtSlot()
-    def download_and_process_images(self, open_after_download=True):
+    def download_and_process_images(self, open_after_download=True, job_options=None):
         print("[DEBUG] download_and_process_images called")
         if not self.key_choice_box.currentText():
             QMessageBox.warning(self, "No Key", "Please select a key before downloading.")
@@ -1057,11 +1227,30 @@ class App(QMainWindow):
         paths = self.paths
         download_horn_only = self.horn_checkbox.isChecked()
         selected_instruments = self.selected_instruments.copy()
+        use_network_log = self.network_log_checkbox.isChecked()
+        # Batch jobs plan their own downloads and do not use the prefetch
+        prefetch_cache = None
+        if self.prefetch_checkbox.isChecked() and not job_options:
+            prefetch_cache = self.prefetch_cache
+
+        watermark_detector = self.create_watermark_detector()
+
+        for instrument in selected_instruments:
+            try:
+                self.catalog.record_part_request(instrument)
+            except Exception as e:
+                self.append_log(f"[DEBUG] Could not record part request: {str(e)}")
 
+        # Batch jobs may override these, e.g. with the batch's quality tier
+        options = {'quality_tier': self.quality_combo.currentData()}
+        options.update(job_options or {})
         self.download_and_process_images_thread = DownloadAndProcessThread(
             driver, key_choice_text, selected_song_title, selected_song_artist,
             paths, selected_instruments, download_horn_only,
-            open_after_download=open_after_download)
+            open_after_download=open_after_download,
+            use_network_log=use_network_log, catalog=self.catalog,
+            prefetch_cache=prefetch_cache, page_index=self.page_index,
+            watermark_detector=watermark_detector, **options)
         self.download_and_process_images_thread.log_updated.connect(self.update_log)
         self.download_and_process_images_thread.progress.connect(self.updateProgressBar)
         self.download_and_process_images_thread.status.connect(self.updateStatusLabel)
@@ -1075,40 +1264,43 @@ class App(QMainWindow):
             # during unit tests), silently ignore.
             pass
         self.download_and_process_images_thread.started.connect(self.disable_all_sections)
-        self.download_and_process_images_thread.finished.connect(self.enable_all_sections)
         self.download_and_process_images_thread.finished.connect(self.download_completed)
-        self.download_and_process_images_thread.start()
+        self.start_when_driver_free(self.download_and_process_images_thread)
+        self.cancel_button.setEnabled(True)
 
     def download_completed(self):
+        if self.sender() is not self.download_and_process_images_thread:
+            # A cancelled job finished after the next one was started
+            return
+        self.cancel_button.setEnabled(False)
+        self.enable_all_sections()
         self.selected_instruments.clear()
+        if self.prefetch_checkbox.isChecked():
+            self.append_log(self.prefetch_cache.summary())
 
 
     @pyqtSlot(list)
     def update_button_elements(self, new_elements):
         self.button_elements = new_elements
 
-    @pyqtSlot(str, str)
-    def update_song_info(self, new_song_info, image_url):
-        self.song_info.append({'text': new_song_info, 'image_url': image_url})
+    @pyqtSlot(str, str, str)
+    def update_song_info(self, new_song_info, image_url, product_url):
+        self.song_info.append({'text': new_song_info, 'image_url': image_url, 'product_url': product_url})
 
     @pyqtSlot(str, str)
     def update_song_choice_box(self, new_choice, image_url):
-        # Fetch the image data
-        try:
-            response = requests.get(image_url)
-            image_data = response.content
-            pixmap = QPixmap()
-            pixmap.loadFromData(image_data)
-    
-            # # Resize the image to the desired dimensions (e.g., 64x64)
-            # pixmap = pixmap.scaled(1024, 1024, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-    
-            icon = QIcon(pixmap)
-        except Exception as e:
-            self.append_log(f"Failed to load image: {e}")
-            icon = QIcon()
-    
-        self.song_choice_box.addItem(icon, new_choice)
+        # The icon is filled in by update_song_choice_icon once the thumbnail
+        # loader has fetched it; cached thumbnails are available immediately.
+        pixmap = self.thumbnail_loader.request(image_url)
+        icon = QIcon(pixmap) if pixmap is not None else QIcon()
+        self.song_choice_box.addItem(icon, new_choice, image_url)
+
+    @pyqtSlot(str, QPixmap)
+    def update_song_choice_icon(self, image_url, pixmap):
+        icon = QIcon(pixmap)
+        for index in range(self.song_choice_box.count()):
+            if self.song_choice_box.itemData(index) == image_url:
+                self.song_choice_box.setItemIcon(index, icon)
 
     @pyqtSlot(str)
     def update_key_choice_box(self, new_choice):
@@ -1203,6 +1395,8 @@ class App(QMainWindow):
         self.horn_checkbox.setEnabled(False)
 
     def enable_all_sections(self):
+        if self.batch_processor.running:
+            return
         self.enable_search_section()
         
         # Enable song selection only if a song hasn't been selected yet
@@ -7,13 +7,17 @@ from PyQt5.QtWidgets import (
     QLineEdit,
     QComboBox,
     QDialogButtonBox,
+    QLabel,
 )
 
+from watermark_remover.download.batch_decisions import DECISION_POLICIES
+from watermark_remover.inference.quality_tiers import DEFAULT_TIER, QUALITY_TIERS
+
 
 class BatchGridDialog(QDialog):
     """Dialog for entering batch song information using a grid."""
 
-    def __init__(self, instruments, keys, parent=None):
+    def __init__(self, instruments, keys, parent=None, tier=DEFAULT_TIER):
         super().__init__(parent)
         self.instruments = instruments
         self.keys = keys
@@ -29,6 +33,18 @@ class BatchGridDialog(QDialog):
         remove_btn.clicked.connect(self.remove_row)
         btn_layout.addWidget(add_btn)
         btn_layout.addWidget(remove_btn)
+        btn_layout.addStretch()
+        btn_layout.addWidget(QLabel("When a choice is needed:"))
+        self.policy_combo = QComboBox()
+        for policy, description in DECISION_POLICIES.items():
+            self.policy_combo.addItem(description, policy)
+        btn_layout.addWidget(self.policy_combo)
+        btn_layout.addWidget(QLabel("Quality:"))
+        self.tier_combo = QComboBox()
+        for name, description in QUALITY_TIERS.items():
+            self.tier_combo.addItem(description, name)
+        self.tier_combo.setCurrentIndex(max(self.tier_combo.findData(tier), 0))
+        btn_layout.addWidget(self.tier_combo)
 
         self.button_box = QDialogButtonBox(
             QDialogButtonBox.Ok | QDialogButtonBox.Cancel
@@ -73,3 +89,9 @@ class BatchGridDialog(QDialog):
             if title:
                 entries.append((title, instrument, key))
         return entries
+
+    def get_policy(self):
+        return self.policy_combo.currentData()
+
+    def get_tier(self):
+        return self.tier_combo.currentData()
@@ -0,0 +1,65 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QLabel,
+    QTableWidget,
+    QComboBox,
+    QPushButton,
+    QDialogButtonBox,
+)
+
+from watermark_remover.gui.dialogs.pdf_selection_dialog import PdfSelectionDialog
+
+KEEP_ALL = "Keep all versions"
+
+
+class BatchReviewDialog(QDialog):
+    """Resolve every deferred batch choice in one place.
+
+    Each row is a song with more than one processed version; the user picks
+    the version to keep or opens the PDF previews for that song.
+    """
+
+    def __init__(self, reviews, parent=None):
+        super().__init__(parent)
+        self.reviews = reviews
+        self.setWindowTitle("Review Batch Results")
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Choose the version to keep for each song:"))
+
+        self.table = QTableWidget(len(reviews), 3)
+        self.table.setHorizontalHeaderLabels(["Song", "Version", ""])
+        self.combos = []
+        for row, review in enumerate(reviews):
+            self.table.setCellWidget(row, 0, QLabel(review.title))
+            combo = QComboBox()
+            for path, label in zip(review.pdf_paths, review.labels):
+                combo.addItem(label.replace("\n", " - "), path)
+                combo.setItemData(combo.count() - 1, path, Qt.ToolTipRole)
+            combo.addItem(KEEP_ALL, None)
+            self.table.setCellWidget(row, 1, combo)
+            preview = QPushButton("Preview")
+            preview.clicked.connect(lambda _, r=row: self.preview(r))
+            self.table.setCellWidget(row, 2, preview)
+            self.combos.append(combo)
+        self.table.resizeColumnsToContents()
+        layout.addWidget(self.table)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.resize(700, 400)
+
+    def preview(self, row):
+        review = self.reviews[row]
+        dialog = PdfSelectionDialog(review.pdf_paths, review.labels, self)
+        if dialog.exec_() == QDialog.Accepted and dialog.selected_path():
+            combo = self.combos[row]
+            combo.setCurrentIndex(combo.findData(dialog.selected_path()))
+
+    def selected_paths(self):
+        """Chosen PDF per review (``None`` keeps every version)."""
+        return [combo.currentData() for combo in self.combos]
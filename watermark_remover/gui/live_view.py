@@ -0,0 +1,134 @@
+"""Background capture of the Selenium browser for the live view."""
+
+import hashlib
+import threading
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QImageReader, QImage
+from PyQt5.QtWidgets import QLabel
+
+from watermark_remover.download.selenium_utils import selenium_lock
+from watermark_remover.utils.throttle import AdaptiveInterval
+
+# Seconds between captures while the browser is in use or the page changes
+LIVE_VIEW_FAST_INTERVAL = 0.5
+# Longest pause between captures of an idle browser
+LIVE_VIEW_IDLE_INTERVAL = 5.0
+# How long a capture waits for the driver before skipping a turn
+LIVE_VIEW_LOCK_TIMEOUT = 0.05
+
+
+class LiveViewThread(QThread):
+    """Capture browser screenshots off the GUI thread.
+
+    Captures run only while at least one view is registered with
+    :meth:`set_target`.  The driver is shared with the worker threads, so a
+    capture waits at most ``LIVE_VIEW_LOCK_TIMEOUT`` for ``selenium_lock``
+    and otherwise tries again later; contention means a Selenium step is
+    running and switches to the fast interval.  Plain ``driver.get``
+    navigations are not under the lock, so the app calls :meth:`poke`
+    whenever it starts a browser job.  Unchanged screenshots are
+    recognised by hash and not decoded again; changed ones are decoded
+    straight to each view's display size and delivered through
+    :attr:`frame_ready`.
+    """
+
+    # (target name, frame scaled to the target's size)
+    frame_ready = pyqtSignal(str, QImage)
+
+    def __init__(self, driver_getter, fast_interval=LIVE_VIEW_FAST_INTERVAL,
+                 idle_interval=LIVE_VIEW_IDLE_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.driver_getter = driver_getter
+        self.interval = AdaptiveInterval(fast_interval, idle_interval)
+        self.last_png = None
+        self._last_hash = None
+        self._targets = {}
+        # target name -> (hash, size) of the frame last sent to it
+        self._sent = {}
+        self._targets_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def set_target(self, name, size):
+        """Register or resize a view; it receives frames scaled to ``size``."""
+        with self._targets_lock:
+            self._targets[name] = QSize(size)
+        self.poke()
+
+    def remove_target(self, name):
+        with self._targets_lock:
+            self._targets.pop(name, None)
+            self._sent.pop(name, None)
+
+    def poke(self):
+        """Capture as soon as possible, e.g. when a browser job starts."""
+        self.interval.reset()
+        self._wake.set()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping:
+            changed, active = self.capture()
+            self._wake.wait(self.interval.next(changed, active))
+            self._wake.clear()
+
+    def capture(self):
+        """Take one screenshot; return (changed, driver busy)."""
+        with self._targets_lock:
+            targets = dict(self._targets)
+        driver = self.driver_getter()
+        if driver is None or not targets:
+            return False, False
+        busy = selenium_lock.locked()
+        if not selenium_lock.acquire(timeout=LIVE_VIEW_LOCK_TIMEOUT):
+            return False, True
+        try:
+            png = driver.get_screenshot_as_png()
+        except Exception:
+            # No page loaded yet or the browser is shutting down
+            return False, busy
+        finally:
+            selenium_lock.release()
+        digest = hashlib.blake2b(png, digest_size=16).digest()
+        changed = digest != self._last_hash
+        if changed:
+            self._last_hash = digest
+            self.last_png = png
+        for name, size in targets.items():
+            if self._sent.get(name) == (digest, size):
+                continue
+            image = decode_scaled(png, size)
+            if image.isNull():
+                continue
+            with self._targets_lock:
+                if name not in self._targets:
+                    continue
+                self._sent[name] = (digest, size)
+            self.frame_ready.emit(name, image)
+        return changed, busy
+
+
+def decode_scaled(data, size):
+    """Decode image bytes directly to fit within ``size``, keeping the aspect ratio."""
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    original = reader.size()
+    if original.isValid() and size.isValid() and not size.isEmpty():
+        reader.setScaledSize(original.scaled(size, Qt.KeepAspectRatio))
+    return reader.read()
+
+
+class LiveViewLabel(QLabel):
+    """Label that reports its size so frames can be decoded to fit it."""
+
+    resized = pyqtSignal(QSize)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resized.emit(event.size())
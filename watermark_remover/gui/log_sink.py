@@ -0,0 +1,74 @@
+"""Batched, bounded log display with a full-detail log file."""
+
+import os
+from collections import deque
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot
+from PyQt5.QtGui import QTextCursor
+
+from watermark_remover.utils.log_file import AsyncFileLog
+
+# Lines kept in the log pane; older ones are dropped
+LOG_MAX_LINES = 5000
+# Milliseconds between appends to the log pane
+LOG_FLUSH_INTERVAL = 200
+
+
+class LogSink(QObject):
+    """Collect log messages and append them to a ``QTextEdit`` in batches.
+
+    Every message goes to an :class:`AsyncFileLog` in ``log_dir``.  Messages
+    for the pane are queued in a ring of ``max_lines`` entries and appended
+    together every ``flush_interval`` ms, so a burst of messages costs one
+    document update instead of one per line.  The document itself is
+    capped at ``max_lines`` blocks.  ``[DEBUG]`` messages are dropped from
+    the pane before they are formatted unless :attr:`show_debug` is set.
+    """
+
+    def __init__(self, text_edit, log_dir, max_lines=LOG_MAX_LINES,
+                 flush_interval=LOG_FLUSH_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.text_edit.document().setMaximumBlockCount(max_lines)
+        self.show_debug = False
+        self.file_log = AsyncFileLog(os.path.join(log_dir, 'watermark_remover.log'))
+        self._pending = deque(maxlen=max_lines)
+        self.dropped = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self.flush)
+
+    @pyqtSlot(bool)
+    def set_show_debug(self, enabled):
+        self.show_debug = enabled
+
+    @pyqtSlot(str)
+    def write(self, message):
+        self.file_log.write(message)
+        if message.startswith("[DEBUG]") and not self.show_debug:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(f"{datetime.now().strftime('%H:%M:%S')}: {message}")
+        if not self._timer.isActive():
+            self._timer.start()
+
+    @pyqtSlot()
+    def flush(self):
+        if not self._pending:
+            return
+        lines = list(self._pending)
+        self._pending.clear()
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        if not self.text_edit.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertText("\n".join(lines))
+        self.text_edit.moveCursor(QTextCursor.End)
+
+    def close(self):
+        self._timer.stop()
+        self.flush()
+        self.file_log.close()
@@ -0,0 +1,142 @@
+"""Asynchronous, cached loading of search result thumbnails."""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from PyQt5.QtCore import QObject, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage, QPixmap
+
+from watermark_remover.utils.file_utils import atomic_path
+
+# Thumbnails stored beyond max_disk_items before the cache is pruned, so the
+# directory is scanned once per this many stores rather than on every one
+PRUNE_SLACK = 50
+
+
+class ThumbnailLoader(QObject):
+    """Fetch thumbnails concurrently off the GUI thread.
+
+    Images are downloaded through a pooled ``requests.Session`` on a small
+    thread pool, decoded and downscaled there, and stored as PNG files in
+    ``cache_dir``.  Pixmaps are kept in an in-memory LRU so repeated searches
+    (e.g. the batch processor re-running a query) are served instantly.
+    Listeners connect to :attr:`pixmap_ready` to fill in icons as they arrive.
+    """
+
+    # Emitted from worker threads; delivered to the GUI thread via a queued connection
+    image_loaded = pyqtSignal(str, QImage)
+    # Emitted on the GUI thread once a pixmap is available for a URL
+    pixmap_ready = pyqtSignal(str, QPixmap)
+
+    def __init__(self, cache_dir, size=80, max_memory_items=256, max_disk_items=1000,
+                 max_workers=8, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._memory = OrderedDict()
+        self._pending = set()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self.image_loaded.connect(self._on_image_loaded)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._disk_lock = threading.Lock()
+        self._disk_count = self._prune_disk()
+
+    def request(self, url):
+        """Return the cached pixmap for ``url`` or schedule it to be loaded.
+
+        Returns ``None`` when the image is not in memory yet; :attr:`pixmap_ready`
+        is emitted once it has been loaded.
+        """
+        if not url:
+            return None
+        pixmap = self._memory.get(url)
+        if pixmap is not None:
+            self._memory.move_to_end(url)
+            return pixmap
+        if url not in self._pending:
+            self._pending.add(url)
+            self._executor.submit(self._load, url)
+        return None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+
+    def _disk_path(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def _load(self, url):
+        path = self._disk_path(url)
+        image = QImage(path) if os.path.isfile(path) else QImage()
+        if not image.isNull():
+            # Pruning evicts by mtime, so a hit marks the file as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        else:
+            try:
+                response = self._session.get(url, timeout=10)
+                response.raise_for_status()
+            except Exception as e:
+                print(f"[DEBUG] Failed to fetch thumbnail {url}: {e}")
+                self.image_loaded.emit(url, QImage())
+                return
+            image = QImage.fromData(response.content)
+            if not image.isNull():
+                image = image.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                self._store_on_disk(path, image)
+        self.image_loaded.emit(url, image)
+
+    def _store_on_disk(self, path, image):
+        try:
+            with atomic_path(path) as tmp_path:
+                if not image.save(tmp_path, "PNG"):
+                    raise OSError("could not encode thumbnail")
+            with self._disk_lock:
+                self._disk_count += 1
+                if self._disk_count > self.max_disk_items + PRUNE_SLACK:
+                    self._disk_count = self._prune_disk()
+        except OSError as e:
+            print(f"[DEBUG] Failed to cache thumbnail {path}: {e}")
+
+    def _prune_disk(self):
+        """Remove the least recently used thumbnails beyond ``max_disk_items``; return how many remain."""
+        entries = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".png")
+        ]
+        if len(entries) <= self.max_disk_items:
+            return len(entries)
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_disk_items]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return self.max_disk_items
+
+    @pyqtSlot(str, QImage)
+    def _on_image_loaded(self, url, image):
+        self._pending.discard(url)
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._memory[url] = pixmap
+        self._memory.move_to_end(url)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+        self.pixmap_ready.emit(url, pixmap)
@@ -0,0 +1,89 @@
+"""Tensor to 8-bit image conversion into reusable buffers.
+
+``tensor_to_PIL`` allocates a float copy, a scaled copy and a uint8 copy of
+every page.  ``PageConverter`` instead keeps one float scratch array and one
+uint8 array per page size, scales and clamps in place, and hands out views
+of the uint8 array that PIL, Qt and reportlab read without copying.
+
+The views stay valid only until the next conversion of the same size; use
+them immediately (save, draw, scale) or copy them.  A converter is not
+thread-safe, so each worker thread keeps its own.
+"""
+
+import numpy as np
+from PIL import Image
+
+
+def _as_array(page):
+    """Return a 2-D float32 numpy view of a page tensor or array."""
+    if hasattr(page, 'detach'):
+        page = page.detach()
+        if page.device.type != 'cpu':
+            page = page.cpu()
+        page = page.numpy()
+    array = np.asarray(page, dtype=np.float32)
+    return array.reshape(array.shape[-2:])
+
+
+class PageConverter:
+    """Convert [0, 1] float pages to uint8 without per-page allocations."""
+
+    def __init__(self):
+        # (height, width) -> (float32 scratch, uint8 output)
+        self._buffers = {}
+
+    def _buffers_for(self, shape):
+        buffers = self._buffers.get(shape)
+        if buffers is None:
+            buffers = (np.empty(shape, dtype=np.float32), np.empty(shape, dtype=np.uint8))
+            self._buffers[shape] = buffers
+        return buffers
+
+    def to_uint8(self, page, out=None):
+        """Return the page as a reusable ``H x W`` uint8 array.
+
+        Values are scaled by 255, clamped and truncated, exactly as
+        ``tensor_to_PIL`` does.  Pages that already are uint8 arrays are
+        passed through; ``out`` writes the result into a caller's array.
+        """
+        if isinstance(page, np.ndarray) and page.dtype == np.uint8:
+            page = page.reshape(page.shape[-2:])
+            if out is None:
+                return page
+            np.copyto(out, page)
+            return out
+        array = _as_array(page)
+        scratch, buffer = self._buffers_for(array.shape)
+        if out is None:
+            out = buffer
+        np.multiply(array, 255, out=scratch)
+        np.clip(scratch, 0, 255, out=scratch)
+        np.copyto(out, scratch, casting='unsafe')
+        return out
+
+    def to_memoryview(self, page):
+        return memoryview(self.to_uint8(page))
+
+    def to_pil(self, page):
+        """Return an 'L' image sharing memory with the uint8 buffer."""
+        out = self.to_uint8(page)
+        height, width = out.shape
+        return Image.frombuffer('L', (width, height), out, 'raw', 'L', 0, 1)
+
+    def to_qimage(self, page):
+        """Return a Grayscale8 ``QImage`` sharing memory with the uint8 buffer."""
+        from PyQt5.QtGui import QImage
+
+        out = self.to_uint8(page)
+        height, width = out.shape
+        return QImage(out.data, width, height, width, QImage.Format_Grayscale8)
+
+    def to_image_reader(self, page):
+        """Return a reportlab ``ImageReader`` for ``canvas.drawImage``.
+
+        reportlab reads and compresses the pixels during ``drawImage``, so no
+        temporary PNG file is needed and the buffer can be reused afterwards.
+        """
+        from reportlab.lib.utils import ImageReader
+
+        return ImageReader(self.to_pil(page))
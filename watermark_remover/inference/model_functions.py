@@ -8,37 +8,50 @@ from torch.nn.functional import interpolate
 from torchvision import models
 from torchvision.models.vgg import VGG19_Weights
 import os
-import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from pytorch_msssim import SSIM
 
-# Lock to guard model loading and file I/O
-model_lock = threading.Lock()
+# Size the watermark model works at (height, width)
+PAGE_SIZE = (792, 612)
+
+# Shared by every decode; Resize and ToTensor keep no per-call state
+page_transform = transforms.Compose([
+    transforms.Resize(PAGE_SIZE),  # Resize to 612x792 pixels
+    transforms.ToTensor()
+])
 
 class VDSR(nn.Module):
-    def __init__(self):
+    # The defaults are the shipped model; slimmer students (see training)
+    # use fewer channels or blocks, and inner gives each block's middle width
+    def __init__(self, channels=64, blocks=9, inner=None):
         super(VDSR, self).__init__()
+        inner = list(inner) if inner is not None else [channels] * blocks
+        self.arch = {'channels': channels, 'blocks': blocks, 'inner': inner}
         layers = []
         
         # Initial Convolution
-        layers.append(nn.Conv2d(1, 64, kernel_size=3, padding=1))
+        layers.append(nn.Conv2d(1, channels, kernel_size=3, padding=1))
         layers.append(nn.ReLU(inplace=True))
-        layers.append(nn.BatchNorm2d(64))
+        layers.append(nn.BatchNorm2d(channels))
         
         # Middle layers with skip connections
-        for _ in range(9):  # 9 blocks of 2 layers each, making it 18 layers
-            layers.append(self.make_block(64, 64))
+        for mid_channels in inner:  # blocks of 2 layers each; 9 blocks make the shipped 18 layers
+            layers.append(self.make_block(channels, channels, mid_channels))
         
         # Final Convolution
-        layers.append(nn.Conv2d(64, 1, kernel_size=3, padding=1))
+        layers.append(nn.Conv2d(channels, 1, kernel_size=3, padding=1))
         
         self.layers = nn.Sequential(*layers)
         
-    def make_block(self, in_channels, out_channels):
+    def make_block(self, in_channels, out_channels, mid_channels=None):
+        mid_channels = mid_channels or out_channels
         return nn.Sequential(
-            nn.Conv2d(in_channels, out_channels, kernel_size=3, padding=1),
-            nn.BatchNorm2d(out_channels),
+            nn.Conv2d(in_channels, mid_channels, kernel_size=3, padding=1),
+            nn.BatchNorm2d(mid_channels),
             nn.ReLU(inplace=True),
-            nn.Conv2d(out_channels, out_channels, kernel_size=3, padding=1),
+            nn.Conv2d(mid_channels, out_channels, kernel_size=3, padding=1),
             nn.BatchNorm2d(out_channels)
         )
 
@@ -48,39 +61,49 @@ class VDSR(nn.Module):
         out += residual
         return out.clamp(0, 1)
     
+UNET_WIDTHS = (32, 64, 128, 256, 512, 1024)
+UNET_BLOCKS = ('enc1', 'enc2', 'enc3', 'enc4', 'enc5', 'middle', 'dec5', 'dec4', 'dec3', 'dec2', 'dec1')
+
 class UNet(nn.Module):
-    def __init__(self):
+    # widths are the outputs of enc1-enc5 and the middle block; the defaults
+    # are the shipped model.  inner maps a block name (UNET_BLOCKS) to the
+    # width between its two convolutions when that differs (pruned models).
+    def __init__(self, widths=UNET_WIDTHS, inner=None):
         super(UNet, self).__init__()
+        w1, w2, w3, w4, w5, w6 = widths
+        inner = dict(inner or {})
+        self.arch = {'widths': list(widths), 'inner': inner}
 
         # Encoder
-        self.enc1 = self.conv_block(1, 32)
-        self.enc2 = self.conv_block(32, 64)
-        self.enc3 = self.conv_block(64, 128)
-        self.enc4 = self.conv_block(128, 256)
-        self.enc5 = self.conv_block(256, 512)
+        self.enc1 = self.conv_block(1, w1, inner.get('enc1'))
+        self.enc2 = self.conv_block(w1, w2, inner.get('enc2'))
+        self.enc3 = self.conv_block(w2, w3, inner.get('enc3'))
+        self.enc4 = self.conv_block(w3, w4, inner.get('enc4'))
+        self.enc5 = self.conv_block(w4, w5, inner.get('enc5'))
 
         # Middle
         self.middle = nn.Sequential(
-            self.conv_block(512, 1024),
-            nn.ConvTranspose2d(1024, 512, kernel_size=2, stride=2)
+            self.conv_block(w5, w6, inner.get('middle')),
+            nn.ConvTranspose2d(w6, w5, kernel_size=2, stride=2)
         )
 
         # Decoder
-        self.dec5 = self.conv_block(512 + 512, 512)
-        self.dec4 = self.conv_block(512 + 256, 256)
-        self.dec3 = self.conv_block(256 + 128, 128)
-        self.dec2 = self.conv_block(128 + 64, 64)
-        self.dec1 = self.conv_block(64 + 32, 32)
+        self.dec5 = self.conv_block(w5 + w5, w5, inner.get('dec5'))
+        self.dec4 = self.conv_block(w5 + w4, w4, inner.get('dec4'))
+        self.dec3 = self.conv_block(w4 + w3, w3, inner.get('dec3'))
+        self.dec2 = self.conv_block(w3 + w2, w2, inner.get('dec2'))
+        self.dec1 = self.conv_block(w2 + w1, w1, inner.get('dec1'))
 
         # Final Layer
-        self.final_conv = nn.Conv2d(32, 1, kernel_size=1)
+        self.final_conv = nn.Conv2d(w1, 1, kernel_size=1)
 
-    def conv_block(self, in_channels, out_channels):
+    def conv_block(self, in_channels, out_channels, mid_channels=None):
+        mid_channels = mid_channels or out_channels
         return nn.Sequential(
-            nn.Conv2d(in_channels, out_channels, kernel_size=3, padding=1),
-            nn.BatchNorm2d(out_channels),
+            nn.Conv2d(in_channels, mid_channels, kernel_size=3, padding=1),
+            nn.BatchNorm2d(mid_channels),
             nn.ReLU(inplace=True),
-            nn.Conv2d(out_channels, out_channels, kernel_size=3, padding=1),
+            nn.Conv2d(mid_channels, out_channels, kernel_size=3, padding=1),
             nn.BatchNorm2d(out_channels),
             nn.ReLU(inplace=True),
         )
@@ -111,74 +134,168 @@ class UNet(nn.Module):
         return final_output.clamp(0, 1)
     
 def PIL_to_tensor(path):
-    with model_lock:
-        image = Image.open(path).convert('L')
-    # Define the transformation
-    transform = transforms.Compose([
-        transforms.Resize((792, 612)),  # Resize to 612x792 pixels
-        transforms.ToTensor()
-    ])
-    image_tensor = transform(image)
+    image = Image.open(path).convert('L')
+    image_tensor = page_transform(image)
     return image_tensor
 
+def decode_page_into(path, out):
+    """Decode and resize one page straight into ``out`` (a 1xHxW float tensor).
+
+    Produces the same values as ``PIL_to_tensor`` without allocating a new
+    tensor.  PIL releases the GIL while decoding and resizing, so several
+    pages can be prepared in parallel.
+    """
+    with Image.open(path) as image:
+        image = image.convert('L').resize((PAGE_SIZE[1], PAGE_SIZE[0]), Image.BILINEAR)
+    # Buffers allocated under the caller's inference_mode are inference
+    # tensors, which pool threads may only write to in inference mode too
+    with torch.inference_mode():
+        out[0].copy_(torch.from_numpy(np.array(image)))
+        out.div_(255)
+
+class PageDecoder:
+    """Decode pages on a thread pool ahead of the model.
+
+    Iterating yields ``(indices, batch)`` in page order, where ``batch`` is an
+    ``N x 1 x H x W`` view of a preallocated buffer.  Up to ``ahead`` further
+    batches are decoded into their own buffers while the caller runs the
+    model, so inference does not wait on image decoding.  A yielded batch is
+    only valid until the next one is requested.  Pages that fail to decode
+    are left out of their batch and listed in ``failed``.
+    """
+
+    def __init__(self, paths, batch_size=1, workers=4, ahead=2, pin_memory=False):
+        self.paths = list(paths)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.ahead = ahead
+        self.pin_memory = pin_memory
+        self.failed = []
+
+    def __iter__(self):
+        batches = [
+            list(range(start, min(start + self.batch_size, len(self.paths))))
+            for start in range(0, len(self.paths), self.batch_size)
+        ]
+        if not batches:
+            return
+        buffers = [
+            torch.empty((self.batch_size, 1) + PAGE_SIZE, pin_memory=self.pin_memory)
+            for _ in range(min(self.ahead + 1, len(batches)))
+        ]
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        pending = deque()
+
+        def submit(number):
+            buffer = buffers[number % len(buffers)]
+            futures = [
+                pool.submit(decode_page_into, self.paths[index], buffer[slot])
+                for slot, index in enumerate(batches[number])
+            ]
+            pending.append((number, futures))
+
+        try:
+            for number in range(len(buffers)):
+                submit(number)
+            while pending:
+                number, futures = pending.popleft()
+                ok_slots = []
+                for slot, future in enumerate(futures):
+                    try:
+                        future.result()
+                        ok_slots.append(slot)
+                    except Exception:
+                        self.failed.append(batches[number][slot])
+                buffer = buffers[number % len(buffers)]
+                if ok_slots:
+                    if len(ok_slots) == len(futures):
+                        batch = buffer[:len(futures)]
+                    else:
+                        batch = buffer[ok_slots]
+                    yield [batches[number][slot] for slot in ok_slots], batch
+                # The caller is done with this buffer; refill it
+                if number + len(buffers) < len(batches):
+                    submit(number + len(buffers))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
 def tensor_to_PIL(tensor):
     tensor = tensor.squeeze().squeeze().cpu().numpy()  # Remove batch size and move to CPU
     image = Image.fromarray((tensor * 255).astype('uint8'), 'L')  # 'L' for grayscale
     return image
 
-def load_best_model(model, directory):
-    with model_lock:
-        model_files = [f for f in os.listdir(directory) if f.endswith('.pth')]
-        model_files.sort(key=lambda f: int(f.split('_')[2].split('.')[0]))
+def best_checkpoint(directory):
+    """Return (path, epoch, validation loss) of the best ``model_epoch_N.pth``, or None."""
+    model_files = [f for f in os.listdir(directory) if f.endswith('.pth')]
+    model_files.sort(key=lambda f: int(f.split('_')[2].split('.')[0]))
 
     if not model_files:
         print(f"No model files found in {directory}")
-        return
+        return None
 
     recent_model_path = os.path.join(directory, model_files[-1])
-    with model_lock:
-        save_dict = torch.load(recent_model_path)
+    save_dict = torch.load(recent_model_path, map_location='cpu')
     val_losses = save_dict.get('val_loss', [])
 
     if not val_losses:
         print(f"No validation loss values found in {recent_model_path}")
-        return
+        return None
 
     lowest_val_loss_epoch = val_losses.index(min(val_losses)) + 1
     best_model_file = f"model_epoch_{lowest_val_loss_epoch}.pth"
-    best_model_path = os.path.join(directory, best_model_file)
+    return os.path.join(directory, best_model_file), lowest_val_loss_epoch, min(val_losses)
 
-    with model_lock:
-        save_dict = torch.load(best_model_path)
+def clean_state_dict(state_dict):
+    # Remove 'module.' (DDP) and '_orig_mod.' (torch.compile) prefixes if present
+    return {k.replace("module.", "").replace("_orig_mod.", ""): v for k, v in state_dict.items()}
 
-    # Remove 'module.' prefix if present
-    new_state_dict = {k.replace("module.", "").replace("_orig_mod.", ""): v for k, v in save_dict['state_dict'].items()}
+def load_best_model(model, directory):
+    best = best_checkpoint(directory)
+    if best is None:
+        return
+    best_model_path, lowest_val_loss_epoch, val_loss = best
 
-    model.load_state_dict(new_state_dict)
-    print(f'Model from epoch {lowest_val_loss_epoch} loaded from {best_model_path} with validation loss {min(val_losses)}')
+    save_dict = torch.load(best_model_path)
+    model.load_state_dict(clean_state_dict(save_dict['state_dict']))
+    print(f'Model from epoch {lowest_val_loss_epoch} loaded from {best_model_path} with validation loss {val_loss}')
+
+def build_best_model(model_class, directory):
+    """Create ``model_class`` with the architecture saved in the best checkpoint and load it.
+
+    Checkpoints of slimmed or pruned models store their constructor
+    arguments under ``'arch'``; the shipped models have none and are built
+    with the defaults.  Without a usable checkpoint the model is returned
+    untrained, as ``load_best_model`` leaves it.
+    """
+    best = best_checkpoint(directory)
+    if best is None:
+        return model_class()
+    best_model_path, lowest_val_loss_epoch, val_loss = best
+    save_dict = torch.load(best_model_path, map_location='cpu')
+    model = model_class(**save_dict.get('arch', {}))
+    model.load_state_dict(clean_state_dict(save_dict['state_dict']))
+    print(f'Model from epoch {lowest_val_loss_epoch} loaded from {best_model_path} with validation loss {val_loss}')
+    return model
 
 def load_model(model, model_path):
     if not os.path.isfile(model_path):
         print(f"No model file found at {model_path}")
         return
 
-    with model_lock:
-        save_dict = torch.load(model_path)
+    save_dict = torch.load(model_path)
 
     val_loss = save_dict.get('val_loss')
     if val_loss is None:
         print(f"No validation loss value found in {model_path}")
         return
     
-    # Remove 'module.' prefix if present
-    new_state_dict = {k.replace("module.", "").replace("_orig_mod.", ""): v for k, v in save_dict['state_dict'].items()}
-    model.load_state_dict(new_state_dict)
+    model.load_state_dict(clean_state_dict(save_dict['state_dict']))
     print(f'Model loaded from {model_path}')
     
 class PerceptualLoss(nn.Module):
-    def __init__(self):
+    def __init__(self, pretrained=True):
         super(PerceptualLoss, self).__init__()
-        self.vgg = vgg19(weights=VGG19_Weights.IMAGENET1K_V1).features
+        self.vgg = vgg19(weights=VGG19_Weights.IMAGENET1K_V1 if pretrained else None).features
         for param in self.vgg.parameters():
             param.requires_grad = False
 
@@ -188,25 +305,91 @@ class PerceptualLoss(nn.Module):
         loss = F.l1_loss(x_vgg, y_vgg)
         return loss    
     
+# Index of each ReLU in vgg19().features
+VGG19_LAYERS = {
+    'relu1_2': 3,
+    'relu2_2': 8,
+    'relu3_3': 15,
+    'relu3_4': 17,
+    'relu4_4': 26,
+    'relu5_4': 35,
+}
+
+class TruncatedPerceptualLoss(nn.Module):
+    """VGG19 feature loss up to ``layer`` on single-channel images.
+
+    Only the layers up to ``layer`` are kept.  The first convolution takes
+    one channel, with its weights summed over RGB, which gives the same
+    features as repeating a grayscale image three times.  Pass ``keys``
+    (one hashable id per sample, e.g. file name and crop) to reuse the
+    target features of samples seen before; up to ``cache_size`` samples
+    are kept, least recently used dropped first.
+    """
+
+    def __init__(self, layer='relu3_3', cache_size=256, pretrained=True):
+        super(TruncatedPerceptualLoss, self).__init__()
+        weights = VGG19_Weights.IMAGENET1K_V1 if pretrained else None
+        features = vgg19(weights=weights).features[:VGG19_LAYERS[layer] + 1]
+        rgb_conv = features[0]
+        gray_conv = nn.Conv2d(1, rgb_conv.out_channels, kernel_size=rgb_conv.kernel_size, padding=rgb_conv.padding)
+        with torch.no_grad():
+            gray_conv.weight.copy_(rgb_conv.weight.sum(dim=1, keepdim=True))
+            gray_conv.bias.copy_(rgb_conv.bias)
+        features[0] = gray_conv
+        for param in features.parameters():
+            param.requires_grad = False
+        self.features = features.eval()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def target_features(self, y, keys=None):
+        with torch.no_grad():
+            if keys is None or not self.cache_size:
+                return self.features(y)
+            missing = [i for i, key in enumerate(keys) if key not in self._cache]
+            if missing:
+                computed = self.features(y[missing])
+                for position, i in enumerate(missing):
+                    # A copy, so a cached sample does not keep its whole batch alive
+                    self._cache[keys[i]] = computed[position].clone()
+            self.cache_hits += len(keys) - len(missing)
+            self.cache_misses += len(missing)
+            for key in keys:
+                self._cache.move_to_end(key)
+            targets = torch.stack([self._cache[key] for key in keys])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return targets
+
+    def forward(self, x, y, keys=None):
+        return F.l1_loss(self.features(x), self.target_features(y, keys))
+
 class CombinedLoss(nn.Module):
-    def __init__(self, alpha=1.0, beta=0.5, gamma=0.5):
+    # perceptual_loss defaults to the full-depth PerceptualLoss; pass a
+    # TruncatedPerceptualLoss for faster training
+    def __init__(self, alpha=1.0, beta=0.5, gamma=0.5, perceptual_loss=None):
         super(CombinedLoss, self).__init__()
         self.ssim_module = SSIM(data_range=1.0, size_average=True, channel=1)
         self.l1_loss = nn.L1Loss()
-        self.perceptual_loss = PerceptualLoss()
+        self.perceptual_loss = perceptual_loss if perceptual_loss is not None else PerceptualLoss()
         self.alpha = alpha
         self.beta = beta
         self.gamma = gamma
 
-    def forward(self, outputs, original):
+    def forward(self, outputs, original, keys=None):
         ssim_loss = 1 - self.ssim_module(outputs, original)
         l1 = self.l1_loss(outputs, original)
         
-        # Convert grayscale to 3-channel image for VGG19
-        outputs_3ch = torch.cat([outputs]*3, dim=1)
-        original_3ch = torch.cat([original]*3, dim=1)
+        if isinstance(self.perceptual_loss, TruncatedPerceptualLoss):
+            perceptual = self.perceptual_loss(outputs, original, keys)
+        else:
+            # Convert grayscale to 3-channel image for VGG19
+            outputs_3ch = torch.cat([outputs]*3, dim=1)
+            original_3ch = torch.cat([original]*3, dim=1)
 
-        perceptual = self.perceptual_loss(outputs_3ch, original_3ch)
+            perceptual = self.perceptual_loss(outputs_3ch, original_3ch)
 
         loss = self.alpha * l1 + self.beta * perceptual + self.gamma * ssim_loss
 
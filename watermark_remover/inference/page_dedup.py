@@ -0,0 +1,194 @@
+"""Recognise repeated pages so their processed output can be reused.
+
+Orchestrations share many identical pages (blank tacet pages, repeated
+percussion parts, the same page in ``Trumpet 1,2`` and ``Trumpet 3``).
+Each decoded page gets a :class:`PageSignature`: a difference hash (dHash)
+used as a lookup key, and a small block-averaged thumbnail that a candidate
+must match within ``DUPLICATE_TOLERANCE`` grey levels.  The thumbnail check
+keeps pages that differ only in a few notes or the part name apart.
+
+:class:`PageIndex` keeps processed pages by signature for the session and,
+when ``persist`` is set, in ``cache_dir`` for later runs.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from watermark_remover.utils.file_utils import atomic_path
+
+# dHash grid is HASH_SIZE x (HASH_SIZE + 1) cells
+HASH_SIZE = 16
+# Brightness step (0-255) between neighbouring cells that sets a hash bit;
+# keeps blank areas from flipping bits on noise
+HASH_MARGIN = 2.0
+# Thumbnail cells are THUMB_BLOCK x THUMB_BLOCK pixels of the decoded page
+THUMB_BLOCK = 8
+# Largest per-cell difference (0-255) between thumbnails of duplicates
+DUPLICATE_TOLERANCE = 4
+# Processed pages kept in memory across songs
+DEFAULT_MEMORY_BUDGET = 64 * 2 ** 20
+# Processed pages kept on disk when persisting
+DEFAULT_DISK_ENTRIES = 2000
+
+
+class PageSignature(NamedTuple):
+    key: str
+    thumb: np.ndarray
+
+
+def _pool(array, rows, cols):
+    """Average ``array`` over a rows x cols grid of equal blocks."""
+    height, width = array.shape
+    block_h, block_w = height // rows, width // cols
+    cropped = array[:block_h * rows, :block_w * cols]
+    return cropped.reshape(rows, block_h, cols, block_w).mean(axis=(1, 3))
+
+
+def page_signature(page):
+    """Signature of a decoded ``H x W`` page with values in [0, 1]."""
+    array = np.asarray(page, dtype=np.float32)
+    array = array.reshape(array.shape[-2:]) * 255
+    grid = _pool(array, HASH_SIZE, HASH_SIZE + 1)
+    bits = grid[:, 1:] - grid[:, :-1] > HASH_MARGIN
+    key = np.packbits(bits).tobytes().hex()
+    height, width = array.shape
+    thumb = _pool(array, height // THUMB_BLOCK, width // THUMB_BLOCK)
+    return PageSignature(key, np.rint(thumb).astype(np.uint8))
+
+
+def same_page(thumb, other):
+    if thumb.shape != other.shape:
+        return False
+    difference = np.abs(thumb.astype(np.int16) - other.astype(np.int16))
+    return int(difference.max()) <= DUPLICATE_TOLERANCE
+
+
+class SignatureTable:
+    """Map page signatures to values, matching on key and thumbnail."""
+
+    def __init__(self):
+        self._entries = {}
+
+    def find(self, signature):
+        for thumb, value in self._entries.get(signature.key, ()):
+            if same_page(thumb, signature.thumb):
+                return value
+        return None
+
+    def add(self, signature, value):
+        self._entries.setdefault(signature.key, []).append((signature.thumb, value))
+
+
+class PageIndex:
+    """Processed pages by signature, shared by every job of a session.
+
+    Outputs are uint8 arrays kept in an LRU of at most ``memory_budget``
+    bytes.  With ``persist`` set they are also stored as compressed ``.npz``
+    files in ``cache_dir`` (at most ``max_disk_entries``, oldest removed
+    first) and found again in later runs.  Safe to use from several threads.
+    """
+
+    def __init__(self, cache_dir=None, persist=False, memory_budget=DEFAULT_MEMORY_BUDGET,
+                 max_disk_entries=DEFAULT_DISK_ENTRIES):
+        self.cache_dir = cache_dir
+        self.persist = persist
+        self.memory_budget = memory_budget
+        self.max_disk_entries = max_disk_entries
+        # key -> list of (thumb, output)
+        self._memory = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    @staticmethod
+    def _variant(signature, variant):
+        # Outputs of different quality tiers are kept apart
+        if not variant:
+            return signature
+        return signature._replace(key=f"{variant}-{signature.key}")
+
+    def lookup(self, signature, variant=''):
+        """Return the processed output of a matching page, or ``None``."""
+        signature = self._variant(signature, variant)
+        with self._lock:
+            for thumb, output in self._memory.get(signature.key, ()):
+                if same_page(thumb, signature.thumb):
+                    self._memory.move_to_end(signature.key)
+                    self.hits += 1
+                    return output
+            output = self._load(signature)
+            if output is not None:
+                self._remember(signature, output)
+                self.hits += 1
+                return output
+            self.misses += 1
+            return None
+
+    def store(self, signature, output, variant='', log_func=None):
+        """Record the processed uint8 ``output`` of a page.
+
+        Failures to persist it are reported through ``log_func``.
+        """
+        signature = self._variant(signature, variant)
+        output = np.array(output, dtype=np.uint8)
+        with self._lock:
+            self._remember(signature, output)
+        if self.persist and self.cache_dir:
+            try:
+                self._save(signature, output)
+            except Exception as e:
+                if log_func:
+                    log_func(f"[DEBUG] Could not persist processed page: {str(e)}")
+
+    def _remember(self, signature, output):
+        self._memory.setdefault(signature.key, []).append((signature.thumb, output))
+        self._memory.move_to_end(signature.key)
+        self.memory_bytes += output.nbytes
+        while self.memory_bytes > self.memory_budget and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_bytes -= sum(page.nbytes for _, page in evicted)
+
+    def _load(self, signature):
+        if not (self.persist and self.cache_dir):
+            return None
+        path = self._disk_path(signature.key)
+        try:
+            with np.load(path) as data:
+                if not same_page(data['thumb'], signature.thumb):
+                    return None
+                output = data['output']
+            # Keep recently used entries from being pruned
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return output
+
+    def _save(self, signature, output):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with atomic_path(self._disk_path(signature.key)) as tmp:
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, thumb=signature.thumb, output=output)
+        self._prune()
+
+    def _prune(self):
+        entries = [
+            entry for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith('.npz') and not entry.name.startswith('.')
+        ]
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
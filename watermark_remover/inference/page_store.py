@@ -0,0 +1,107 @@
+"""Compact storage for intermediate pages between pipeline stages.
+
+Pages are kept as 8-bit arrays (a quarter of a float32 tensor) and, once
+the configured RAM budget is used up, written to memory-mapped files in a
+spill directory instead.  Each stored page gets an id; instruments hold
+lists of ids, so a page shared by several instruments is stored once.
+Pages are read back lazily, one instrument at a time.
+"""
+
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from watermark_remover.inference.image_buffers import PageConverter
+
+# RAM a store may use before further pages are spilled to disk
+DEFAULT_RAM_BUDGET = 512 * 2 ** 20
+
+
+class PageStore:
+    """uint8 page storage with a RAM budget and memory-mapped spill."""
+
+    def __init__(self, spill_root=None, ram_budget=DEFAULT_RAM_BUDGET):
+        self.spill_root = spill_root
+        self.ram_budget = ram_budget
+        self.spill_dir = None
+        self._converter = PageConverter()
+        # page_id -> in-memory array or (path, shape) of a spilled page
+        self._pages = {}
+        self._links = OrderedDict()
+        self.ram_bytes = 0
+        self.peak_ram_bytes = 0
+        self.spilled_bytes = 0
+
+    def add(self, page):
+        """Store a [0, 1] float page (tensor or array) or a uint8 array; return its id."""
+        page_id = len(self._pages)
+        shape = tuple(page.shape[-2:])
+        size = shape[0] * shape[1]
+        if self.ram_bytes + size <= self.ram_budget:
+            array = np.empty(shape, dtype=np.uint8)
+            self._converter.to_uint8(page, out=array)
+            self._pages[page_id] = array
+            self.ram_bytes += size
+            self.peak_ram_bytes = max(self.peak_ram_bytes, self.ram_bytes)
+        else:
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix='.pages_', dir=self.spill_root)
+            path = os.path.join(self.spill_dir, f"page_{page_id:05d}.u8")
+            array = np.memmap(path, dtype=np.uint8, mode='w+', shape=shape)
+            self._converter.to_uint8(page, out=array)
+            array.flush()
+            del array
+            self._pages[page_id] = (path, shape)
+            self.spilled_bytes += size
+        return page_id
+
+    def link(self, instrument, page_id):
+        """Append a stored page to an instrument's pages."""
+        self._links.setdefault(instrument, []).append(page_id)
+
+    def put(self, instrument, page):
+        page_id = self.add(page)
+        self.link(instrument, page_id)
+        return page_id
+
+    def get(self, page_id):
+        """Return a page as an ``H x W`` uint8 array (read-only map if spilled)."""
+        page = self._pages[page_id]
+        if isinstance(page, tuple):
+            path, shape = page
+            return np.memmap(path, dtype=np.uint8, mode='r', shape=shape)
+        return page
+
+    def instruments(self):
+        return list(self._links)
+
+    def page_ids(self, instrument):
+        return list(self._links.get(instrument, []))
+
+    def iter_pages(self, instrument):
+        for page_id in self.page_ids(instrument):
+            yield self.get(page_id)
+
+    def page_count(self):
+        """Number of linked pages over all instruments."""
+        return sum(len(ids) for ids in self._links.values())
+
+    def memory_report(self):
+        return {
+            'pages': len(self._pages),
+            'ram_bytes': self.ram_bytes,
+            'peak_ram_bytes': self.peak_ram_bytes,
+            'spilled_bytes': self.spilled_bytes,
+        }
+
+    def close(self):
+        """Drop every page and delete spill files."""
+        self._pages = {}
+        self._links = OrderedDict()
+        self.ram_bytes = 0
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
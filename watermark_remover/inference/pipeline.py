@@ -0,0 +1,153 @@
+"""Headless page processing: watermark removal, upscaling and PDF output.
+
+The GUI worker threads and this module share :func:`upscale_page`, so every
+quality tier (see ``quality_tiers``) behaves the same in both.  Run on a
+folder of downloaded pages with::
+
+    python -m watermark_remover.inference.pipeline pages/ -o part.pdf --tier draft
+"""
+
+import argparse
+import os
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from reportlab.pdfgen import canvas
+
+from watermark_remover.inference.image_buffers import PageConverter
+from watermark_remover.inference.model_functions import UNet, VDSR, PageDecoder, build_best_model
+from watermark_remover.inference.quality_tiers import (
+    DEFAULT_TIER,
+    MAX_TIER_OVERLAP,
+    QUALITY_TIERS,
+    TIER_DRAFT,
+    TIER_MAX,
+    TILE_PADDING,
+    TILE_SIZE,
+    UPSCALED_SIZE,
+    blend_ramp,
+    tile_origins,
+    uses_vdsr,
+)
+from watermark_remover.utils.file_utils import atomic_path
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# Blend weights by tile shape, shared by every page of the max tier
+_blend_weights = {}
+
+
+def _tile_weights(height, width):
+    weights = _blend_weights.get((height, width))
+    if weights is None:
+        rows = torch.tensor(blend_ramp(height, MAX_TIER_OVERLAP)).view(-1, 1)
+        cols = torch.tensor(blend_ramp(width, MAX_TIER_OVERLAP)).view(1, -1)
+        weights = _blend_weights[(height, width)] = rows * cols
+    return weights
+
+
+def upscale_page(page, tier, us_model, device, cancel_token=None):
+    """Upscale an ``H x W`` uint8 watermark-removed page to ``UPSCALED_SIZE``.
+
+    Returns a ``1 x 1 x H x W`` float tensor on the CPU.  ``us_model`` is not
+    used (and may be ``None``) for the draft tier.
+    """
+    wm_output = torch.from_numpy(np.array(page, dtype=np.float32)).div_(255)
+    wm_output = wm_output.view(1, 1, *page.shape)
+    if tier == TIER_DRAFT:
+        upscaled = F.interpolate(wm_output, size=UPSCALED_SIZE, mode='bicubic', align_corners=False)
+        return upscaled.clamp_(0, 1)
+    upscaled = F.interpolate(wm_output, size=UPSCALED_SIZE, mode='nearest')
+    padding_size = TILE_PADDING
+    padding = (padding_size, padding_size, padding_size, padding_size)
+    upscaled_padded = F.pad(upscaled, padding, value=1.0)
+    patch_height, patch_width = TILE_SIZE
+    overlap = MAX_TIER_OVERLAP if tier == TIER_MAX else 0
+    us_output = torch.zeros_like(upscaled)
+    weight_sum = torch.zeros(upscaled.shape[-2:]) if overlap else None
+    for i in tile_origins(upscaled.shape[-2], patch_height, overlap):
+        for j in tile_origins(upscaled.shape[-1], patch_width, overlap):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            patch = upscaled_padded[:, :, i:i + patch_height + padding_size * 2, j:j + patch_width + padding_size * 2]
+            us_patch = us_model(patch.to(device))
+            us_patch = us_patch[:, :, padding_size:-padding_size, padding_size:-padding_size].cpu()
+            if overlap:
+                height, width = us_patch.shape[-2:]
+                weights = _tile_weights(height, width)
+                us_output[:, :, i:i + height, j:j + width] += us_patch * weights
+                weight_sum[i:i + height, j:j + width] += weights
+            else:
+                us_output[:, :, i:i + patch_height, j:j + patch_width] = us_patch
+    if overlap:
+        us_output /= weight_sum
+    return us_output
+
+
+def load_models(wm_model_path, us_model_path, tier, device):
+    """Return (UNet, VDSR or None for the draft tier) in eval mode on ``device``."""
+    wm_model = build_best_model(UNet, wm_model_path).to(device)
+    wm_model.eval()
+    us_model = None
+    if uses_vdsr(tier):
+        us_model = build_best_model(VDSR, us_model_path).to(device)
+        us_model.eval()
+    return wm_model, us_model
+
+
+def process_pages(page_paths, wm_model, us_model, tier, device, cancel_token=None):
+    """Yield ``(path, upscaled page)`` for each page that could be decoded."""
+    converter = PageConverter()
+    decoder = PageDecoder(page_paths, pin_memory=device.type == 'cuda')
+    with torch.inference_mode():
+        for indices, batch in decoder:
+            wm_batch = wm_model(batch.to(device)).cpu()
+            for offset, index in enumerate(indices):
+                wm_page = converter.to_uint8(wm_batch[offset:offset + 1])
+                yield page_paths[index], upscale_page(wm_page, tier, us_model, device, cancel_token)
+    for index in decoder.failed:
+        print(f"Could not decode {page_paths[index]}")
+
+
+def collect_pages(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(
+                os.path.join(item, name) for name in sorted(os.listdir(item))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            paths.append(item)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='page images or directories of pages, in order')
+    parser.add_argument('-o', '--output', default='output.pdf')
+    parser.add_argument('--tier', choices=list(QUALITY_TIERS), default=DEFAULT_TIER)
+    parser.add_argument('--wm-model', default='models/Watermark_Removal')
+    parser.add_argument('--us-model', default='models/VDSR')
+    args = parser.parse_args(argv)
+
+    page_paths = collect_pages(args.inputs)
+    if not page_paths:
+        parser.error("no page images found")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    wm_model, us_model = load_models(args.wm_model, args.us_model, args.tier, device)
+    img_height, img_width = UPSCALED_SIZE
+    converter = PageConverter()
+    with atomic_path(args.output) as tmp_pdf_path:
+        c = canvas.Canvas(tmp_pdf_path, pagesize=(img_width, img_height))
+        for path, page in process_pages(page_paths, wm_model, us_model, args.tier, device):
+            c.drawImage(converter.to_image_reader(page), 0, 0, width=img_width, height=img_height)
+            c.showPage()
+            print(f"Processed {path}")
+        c.save()
+    print(f"Wrote {args.output} ({args.tier} tier)")
+
+
+if __name__ == '__main__':
+    main()
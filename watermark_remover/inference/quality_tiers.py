@@ -0,0 +1,63 @@
+"""Named quality/speed tiers for upscaling and the tile layout they use.
+
+``draft``
+    Bicubic upscaling of the watermark-removed page, no VDSR.  For quick
+    rehearsal copies.
+``standard``
+    Nearest-neighbour upscaling refined by VDSR in non-overlapping tiles
+    (the original pipeline).
+``max``
+    Like ``standard`` but the tiles overlap and are blended with linear
+    ramps, which hides seams at tile borders at the cost of more VDSR work.
+"""
+
+from typing import List
+
+TIER_DRAFT = 'draft'
+TIER_STANDARD = 'standard'
+TIER_MAX = 'max'
+
+QUALITY_TIERS = {
+    TIER_DRAFT: 'Draft (fast, no VDSR)',
+    TIER_STANDARD: 'Standard',
+    TIER_MAX: 'Maximum (blended VDSR tiles)',
+}
+
+DEFAULT_TIER = TIER_STANDARD
+
+# Size of the upscaled page (height, width)
+UPSCALED_SIZE = (2200, 1700)
+# VDSR tile (height, width) and the context added around each tile
+TILE_SIZE = (550, 850)
+TILE_PADDING = 16
+# Overlap between neighbouring tiles in the max tier
+MAX_TIER_OVERLAP = 64
+
+
+def uses_vdsr(tier: str) -> bool:
+    return tier != TIER_DRAFT
+
+
+def tile_origins(length: int, tile: int, overlap: int = 0) -> List[int]:
+    """Start offsets of tiles covering ``length`` pixels.
+
+    Without overlap the tiles are laid end to end and the last one may be
+    shorter.  With overlap, neighbours share ``overlap`` pixels and the
+    last tile is moved back so that every tile is full size.
+    """
+    if overlap <= 0:
+        return list(range(0, length, tile))
+    if length <= tile:
+        return [0]
+    stride = tile - overlap
+    if stride <= 0:
+        raise ValueError("overlap must be smaller than the tile")
+    origins = list(range(0, length - tile, stride))
+    origins.append(length - tile)
+    return origins
+
+
+def blend_ramp(length: int, overlap: int) -> List[float]:
+    """Blend weights across a tile: rising over ``overlap`` pixels at each edge."""
+    steps = overlap + 1
+    return [min(i + 1, length - i, steps) / steps for i in range(length)]
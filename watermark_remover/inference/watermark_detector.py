@@ -0,0 +1,100 @@
+"""Decide cheaply whether a page carries the watermark at all.
+
+The watermark is always drawn in the same place, so the stored mask
+(``paths['tensor_path']``) is a template for it.  A page's score is the
+correlation between its darkness and the mask's watermark pixels: pages
+with the watermark score well above zero, clean pages (and pages with only
+a faint trace) score near zero because the notes are not aligned with the
+mask.  Pages scoring below ``threshold`` can skip the UNet.
+
+Validate a threshold with ``python -m watermark_remover.benchmarks.watermark_detection``.
+"""
+
+import numpy as np
+from PIL import Image
+
+from watermark_remover.inference.model_functions import PAGE_SIZE
+
+# Minimum score for a page to be sent through the watermark model.  On the
+# benchmark's synthetic pages (watermark strength 0.15-0.5) clean pages
+# score below 0.02 and watermarked ones from 0.056, so this keeps a margin on
+# both sides.  No labeled real pages are available to check it against, so
+# the GUI marks detection as experimental; see the benchmark's docstring for
+# how to check it on real pages.
+DEFAULT_THRESHOLD = 0.04
+
+
+def load_grayscale(path, size=PAGE_SIZE):
+    """Load an image (the mask or a page) as an ``H x W`` float array in [0, 1]."""
+    with Image.open(path) as image:
+        image = image.convert('L').resize((size[1], size[0]), Image.BILINEAR)
+        return np.asarray(image, dtype=np.float32) / 255
+
+
+def watermark_weights(mask):
+    """The mask's watermark as an ``H x W`` float array in [0, 1] (1 = strongest).
+
+    The watermark is whatever differs from the mask's background, so the
+    mask may be drawn dark on light or light on dark.
+    """
+    mask = np.asarray(mask, dtype=np.float32)
+    weights = np.abs(mask - np.median(mask))
+    return weights / max(float(weights.max()), 1e-6)
+
+
+class WatermarkDetector:
+    """Score pages against the watermark mask and keep routing counts."""
+
+    def __init__(self, mask, threshold=DEFAULT_THRESHOLD):
+        mask = np.asarray(mask, dtype=np.float32)
+        mask = mask.reshape(mask.shape[-2:])
+        weights = watermark_weights(mask)
+        weights -= weights.mean()
+        norm = np.linalg.norm(weights)
+        if norm == 0:
+            raise ValueError("watermark mask is blank")
+        self.template = (weights / norm).ravel()
+        self.shape = mask.shape
+        self.threshold = threshold
+        self.watermarked = 0
+        self.clean = 0
+        self.scores = []
+
+    @classmethod
+    def from_file(cls, path, threshold=DEFAULT_THRESHOLD):
+        return cls(load_grayscale(path), threshold)
+
+    def score(self, page):
+        """Correlation in [-1, 1] between a [0, 1] page and the watermark."""
+        page = np.asarray(page, dtype=np.float32)
+        page = page.reshape(page.shape[-2:])
+        if page.shape != self.shape:
+            raise ValueError(f"page shape {page.shape} does not match mask shape {self.shape}")
+        # Page brightness against the template; the sign is flipped below so
+        # that darker pixels under the watermark give a positive score
+        flat = page.ravel()
+        centred_norm = np.sqrt(max(float(flat @ flat) - flat.size * float(flat.mean()) ** 2, 0.0))
+        if centred_norm == 0:
+            return 0.0
+        # template has zero mean, so the page's mean cancels out of the dot product
+        return -float(self.template @ flat) / centred_norm
+
+    def is_watermarked(self, page):
+        """Route a page and count the decision."""
+        score = self.score(page)
+        self.scores.append(score)
+        if score >= self.threshold:
+            self.watermarked += 1
+            return True
+        self.clean += 1
+        return False
+
+    def report(self):
+        total = self.watermarked + self.clean
+        if not total:
+            return "Watermark detector: no pages checked"
+        return (
+            f"Watermark detector: {self.watermarked} of {total} pages sent to watermark removal, "
+            f"{self.clean} clean pages bypassed (threshold {self.threshold:.2f}, "
+            f"scores {min(self.scores):.2f} to {max(self.scores):.2f})"
+        )
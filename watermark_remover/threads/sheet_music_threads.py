@@ -1,17 +1,18 @@
 """Thread classes used by the sheet music downloader GUI."""
 
+import hashlib
 import os
 import re
 import platform
 import subprocess
 import time
 from collections import defaultdict
-import threading
 
 import requests
 import torch
 import torch.nn as nn
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QThread, Qt, pyqtSignal
+from PyQt5.QtGui import QImage
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 from reportlab.pdfgen import canvas
@@ -19,20 +20,81 @@ from reportlab.pdfgen import canvas
 from watermark_remover.inference.model_functions import (
     UNet,
     VDSR,
-    PIL_to_tensor,
-    tensor_to_PIL,
-    load_best_model,
+    PageDecoder,
+    build_best_model,
 )
+from watermark_remover.inference.image_buffers import PageConverter
+from watermark_remover.inference.page_store import DEFAULT_RAM_BUDGET, PageStore
+from watermark_remover.inference.page_dedup import SignatureTable, page_signature
+from watermark_remover.inference.pipeline import upscale_page
+from watermark_remover.inference.quality_tiers import DEFAULT_TIER, uses_vdsr
 from watermark_remover.download.selenium_utils import SeleniumHelper, xpaths
+from watermark_remover.download.driver_setup import create_driver
+from watermark_remover.download.job_journal import file_sha256
+from watermark_remover.utils.cancellation import CancellationToken, CancelledError
+from watermark_remover.utils.file_utils import atomic_path, atomic_write_bytes
+from watermark_remover.utils.throttle import Throttle
+from watermark_remover.download.network_capture import (
+    NetworkImageHarvester,
+    discard_performance_log,
+    page_image_pattern,
+    page_prefix,
+)
+
+# Previews are thumbnails no larger than the GUI's preview labels (w, h)
+PREVIEW_SIZE = (300, 400)
+# At most this many previews per second, using at most PREVIEW_MAX_SHARE of
+# the job's wall time
+PREVIEW_MAX_RATE = 2.0
+PREVIEW_MAX_SHARE = 0.03
+# Seconds a page image download may take before the page is skipped
+PAGE_REQUEST_TIMEOUT = 30
+
+
+def record_in_catalog(catalog, method, *args, log_func=None):
+    """Store scraped data in the catalog index; failures never stop scraping."""
+    if catalog is None:
+        return
+    try:
+        getattr(catalog, method)(*args)
+    except Exception as e:
+        if log_func:
+            log_func(f"[DEBUG] Failed to update catalog ({method}): {str(e)}")
+
+
+class DriverInitThread(QThread):
+    """Provision and start the Chrome WebDriver without blocking the GUI."""
 
-# Global lock to ensure file operations are thread-safe
-file_lock = threading.Lock()
+    log_updated = pyqtSignal(str)
+    driver_ready = pyqtSignal(object)
+    driver_failed = pyqtSignal(str)
+
+    def __init__(self, cache_path):
+        super().__init__()
+        self.cache_path = cache_path
+        # Kept here as well as emitted, so the window can quit the browser
+        # even when it closes before driver_ready is delivered
+        self.driver = None
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            driver, timings = create_driver(self.cache_path, log_func=self.log_updated.emit)
+        except Exception as e:
+            self.log_updated.emit(f"Failed to start the browser: {str(e)}")
+            self.driver_failed.emit(str(e))
+            return
+        total = time.perf_counter() - start
+        phases = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in timings.items())
+        self.log_updated.emit(f"Browser ready in {total:.1f}s ({phases})")
+        self.driver = driver
+        self.driver_ready.emit(driver)
 
 
 class FindSongsThread(QThread):
     progress = pyqtSignal(int)
     status = pyqtSignal(str)
-    song_info_updated = pyqtSignal(str, str)
+    song_info_updated = pyqtSignal(str, str, str)
     song_choice_box_updated = pyqtSignal(str, str)
     log_updated = pyqtSignal(str)
     clear_song_info = pyqtSignal()
@@ -42,10 +104,11 @@ class FindSongsThread(QThread):
     receive_song_choice_box_count = pyqtSignal(int)
     insert_separator_in_song_choice_box = pyqtSignal(int)
 
-    def __init__(self, driver, user_song_choice):
+    def __init__(self, driver, user_song_choice, search_cache=None):
         super().__init__()
         self.driver = driver
         self.user_song_choice = user_song_choice
+        self.search_cache = search_cache
         self.song_choice_box_count = 0
         self.receive_song_choice_box_count.connect(self.set_song_choice_box_count)
 
@@ -53,12 +116,20 @@ class FindSongsThread(QThread):
         self.song_choice_box_count = count
 
     def run(self):
+        discard_performance_log(self.driver)
         self.status.emit("")
         self.progress.emit(0)
         self.clear_song_info.emit()
         self.clear_song_choice_box.emit()
         self.clear_key_choice_box.emit()
 
+        if self.search_cache is not None:
+            cached_results = self.search_cache.get(self.user_song_choice)
+            if cached_results is not None:
+                self.emit_results(cached_results)
+                self.log_updated.emit(f"[DEBUG] Using cached search results for: {self.user_song_choice}")
+                return
+
         url = "https://www.praisecharts.com/search"
         self.driver.get(url)
 
@@ -67,7 +138,6 @@ class FindSongsThread(QThread):
             self.log_updated.emit("Error interacting with the search bar.")
             return
 
-        songs_counter = 0
         songs_parent_xpath = xpaths['songs_parent']
         songs_parent = SeleniumHelper.find_element(self.driver, songs_parent_xpath, timeout=10, log_func=self.log_updated.emit)
         if not songs_parent:
@@ -77,11 +147,13 @@ class FindSongsThread(QThread):
         time.sleep(2)
         songs_children = songs_parent.find_elements("xpath", './app-product-list-item')
 
+        results = []
         for idx, child in enumerate(songs_children, 1):
             title = ''
             text2 = ''
             text3 = ''
             image_url = ''
+            product_url = ''
 
             try:
                 title = child.find_element("xpath", xpaths['song_title']).text
@@ -113,13 +185,30 @@ class FindSongsThread(QThread):
             except NoSuchElementException:
                 image_url = ''
 
-            if text3:
-                self.song_info_updated.emit(element_text, image_url)
-                self.song_choice_box_updated.emit(element_text, image_url)
+            try:
+                product_url = child.find_element("xpath", xpaths['song_link']).get_attribute('href') or ''
+            except NoSuchElementException:
+                product_url = ''
+
+            results.append({
+                'text': element_text if text3 else title,
+                'image_url': image_url,
+                'product_url': product_url,
+                'is_song': bool(text3),
+            })
+
+        if self.search_cache is not None:
+            self.search_cache.put(self.user_song_choice, results)
+        self.emit_results(results)
+
+    def emit_results(self, results):
+        songs_counter = 0
+        for result in results:
+            self.song_info_updated.emit(result['text'], result['image_url'], result['product_url'])
+            if result['is_song']:
+                self.song_choice_box_updated.emit(result['text'], result['image_url'])
                 songs_counter += 1
                 self.request_song_choice_box_count.emit()
-            else:
-                self.song_info_updated.emit(title, image_url)
 
         self.log_updated.emit(f"Found {songs_counter} songs for search: {self.user_song_choice}")
 
@@ -135,21 +224,38 @@ class SelectSongThread(QThread):
     instrument_parts_signal = pyqtSignal(list)
     song_selection_failed = pyqtSignal()
 
-    def __init__(self, driver, selected_song, selected_song_index, selected_song_title, user_song_choice):
+    def __init__(self, driver, selected_song, selected_song_index, selected_song_title, user_song_choice,
+                 product_url=None, catalog=None):
         super().__init__()
         self.driver = driver
+        self.catalog = catalog
+        self.song_url = None
+        self.current_key = None
         self.selected_song = selected_song
+        # Known product page URL; when set the song page is opened directly
+        # instead of clicking the result on the search page.
+        self.product_url = product_url
         self.user_song_choice = user_song_choice
         self.selected_song_index = selected_song_index
         self.selected_song_title = selected_song_title
 
     def run(self):
+        discard_performance_log(self.driver)
         try:
             self.log_updated.emit(f"Selected song: {self.selected_song_title}")
-            click_xpath_template = xpaths['click_song']
-            if not SeleniumHelper.click_dynamic_element(self.driver, click_xpath_template, self.selected_song_index + 1, log_func=self.log_updated.emit):
-                self.log_updated.emit("Error clicking the song.")
-                raise Exception("Error clicking the song.")
+            if self.product_url:
+                self.log_updated.emit(f"[DEBUG] Opening product page: {self.product_url}")
+                self.driver.get(self.product_url)
+            else:
+                click_xpath_template = xpaths['click_song']
+                if not SeleniumHelper.click_dynamic_element(self.driver, click_xpath_template, self.selected_song_index + 1, log_func=self.log_updated.emit):
+                    self.log_updated.emit("Error clicking the song.")
+                    raise Exception("Error clicking the song.")
+            self.song_url = self.product_url or self.driver.current_url
+            song_lines = self.selected_song.split('\n')
+            artist = song_lines[1] if len(song_lines) > 1 else ''
+            record_in_catalog(self.catalog, 'record_song', self.song_url, self.selected_song_title, artist,
+                              log_func=self.log_updated.emit)
 
             chords_click_xpath = xpaths['chords_button']
             if not SeleniumHelper.click_element(
@@ -195,6 +301,12 @@ class SelectSongThread(QThread):
                         "[DEBUG] Orchestration header element not present on page."
                     )
                 self.log_updated.emit("Orchestration not found for this song.")
+                if orch_element is None:
+                    # Only a page without the header shows there is no
+                    # orchestration; a header that could not be clicked
+                    # may just be slow, so nothing is recorded then
+                    record_in_catalog(self.catalog, 'record_keys', self.song_url, [],
+                                      log_func=self.log_updated.emit)
                 self.song_selection_failed.emit()
                 return
 
@@ -220,6 +332,9 @@ class SelectSongThread(QThread):
                 keys.append(button.text)
                 self.key_choice_box_updated.emit(button.text)
 
+            record_in_catalog(self.catalog, 'record_keys', self.song_url, keys, log_func=self.log_updated.emit)
+            self.current_key = keys[0]
+
             first_button = button_elements[0]
             first_button.click()
             formatted_keys = ', '.join(keys)
@@ -270,6 +385,8 @@ class SelectSongThread(QThread):
             self.log_updated.emit("Error closing parts menu.")
             return
 
+        record_in_catalog(self.catalog, 'record_parts', self.song_url, self.current_key, instrument_parts,
+                          log_func=self.log_updated.emit)
         self.instrument_parts_signal.emit(instrument_parts)
 
 
@@ -279,13 +396,15 @@ class SelectKeyThread(QThread):
     log_updated = pyqtSignal(str)
     instrument_parts_signal = pyqtSignal(list)
 
-    def __init__(self, driver, selected_key, button_elements):
+    def __init__(self, driver, selected_key, button_elements, catalog=None):
         super().__init__()
         self.driver = driver
+        self.catalog = catalog
         self.selected_key = selected_key
         self.button_elements = button_elements.copy()
 
     def run(self):
+        discard_performance_log(self.driver)
         key_click_xpath = xpaths['key_button']
         if not SeleniumHelper.click_element(self.driver, key_click_xpath, log_func=self.log_updated.emit):
             pass
@@ -333,6 +452,9 @@ class SelectKeyThread(QThread):
             self.log_updated.emit("Error closing parts menu.")
             return
 
+        if self.catalog is not None:
+            record_in_catalog(self.catalog, 'record_parts', self.driver.current_url, self.selected_key,
+                              instrument_parts, log_func=self.log_updated.emit)
         self.instrument_parts_signal.emit(instrument_parts)
 
 
@@ -340,11 +462,10 @@ class DownloadAndProcessThread(QThread):
     """
     Thread responsible for downloading images for the selected parts, running
     watermark removal and upscaling, and assembling PDFs.  In addition to
-    reporting progress and status back to the GUI, this class now emits
-    preview signals whenever an image is downloaded, after the watermark has
-    been removed, and after it has been upscaled.  These previews can be
-    connected to slots in the GUI to display intermediate results to the
-    user.
+    reporting progress and status back to the GUI, this class emits small
+    preview thumbnails of downloaded, watermark-removed and upscaled pages.
+    Previews are throttled (see PREVIEW_MAX_RATE) so they never cost more
+    than a few percent of the job's time.
     """
 
     # Progress of the overall operation (0–100)
@@ -353,16 +474,50 @@ class DownloadAndProcessThread(QThread):
     status = pyqtSignal(str)
     # Log messages for the log area
     log_updated = pyqtSignal(str)
-    # Paths of downloaded images emitted as soon as they are saved
-    download_preview = pyqtSignal(str)
-    # Paths of images after watermark removal emitted when available
-    watermark_preview = pyqtSignal(str)
-    # Paths of images after upscaling emitted when available
-    upscale_preview = pyqtSignal(str)
+    # Thumbnails (owning QImages, at most PREVIEW_SIZE) of downloaded pages,
+    # pages after watermark removal and pages after upscaling
+    download_preview = pyqtSignal(QImage)
+    watermark_preview = pyqtSignal(QImage)
+    upscale_preview = pyqtSignal(QImage)
+    # Emitted instead of finishing normally when the job was cancelled
+    cancelled = pyqtSignal()
 
     def __init__(self, driver, key_choice_text, selected_song_title, selected_song_artist,
-                 paths, selected_instruments, download_horn_only=False, open_after_download=True):
+                 paths, selected_instruments, download_horn_only=False, open_after_download=True,
+                 use_network_log=False, catalog=None, temp_dir=None, journal=None, journal_key=None,
+                 prefetch_cache=None, cancel_token=None, page_memory_budget=DEFAULT_RAM_BUDGET,
+                 preview_rate=PREVIEW_MAX_RATE, page_index=None, watermark_detector=None,
+                 quality_tier=DEFAULT_TIER):
         super().__init__()
+        self.catalog = catalog
+        # Pages fetched ahead of time by a PrefetchThread are taken from here
+        self.prefetch_cache = prefetch_cache
+        # Checked between pages, tiles and PDF pages; see cancel()
+        self.cancel_token = cancel_token or CancellationToken()
+        # Watermark-removed and upscaled pages as uint8; each store spills
+        # to memory-mapped files beyond page_memory_budget bytes
+        self.page_memory_budget = page_memory_budget
+        self.wm_pages = PageStore(ram_budget=page_memory_budget)
+        self.us_pages = PageStore(ram_budget=page_memory_budget)
+        # Per instrument, the pages in order as ('wm', watermark-removed page
+        # id) or ('us', upscaled page id); repeated pages repeat an entry
+        self.page_plan = defaultdict(list)
+        self.wm_signatures = {}
+        # Optional session-wide PageIndex of processed pages; pages found
+        # there skip both models
+        self.page_index = page_index
+        # Optional WatermarkDetector; pages it finds clean skip the UNet
+        self.watermark_detector = watermark_detector
+        # Upscaling quality/speed tier; see quality_tiers
+        self.quality_tier = quality_tier
+        # Reusable uint8 buffers for previews and PDF pages
+        self.converter = PageConverter()
+        self.preview_throttle = Throttle(preview_rate, PREVIEW_MAX_SHARE)
+        # Optional batch journal; journal_key is the (song, option) pair the
+        # downloaded pages are recorded under so a rerun can reuse them.
+        self.journal = journal
+        self.journal_key = journal_key
+        self.page_records = defaultdict(list)
         self.driver = driver
         self.key_choice_text = key_choice_text
         self.selected_song_title = selected_song_title
@@ -374,18 +529,24 @@ class DownloadAndProcessThread(QThread):
         self.full_paths = []
         self.images_by_instrument = defaultdict(list)
         self.open_after_download = open_after_download
+        # When enabled, page URLs are harvested from Chrome's network log
+        # instead of reading the preview image after every carousel click.
+        self.use_network_log = use_network_log
         print(f"[DEBUG] DownloadAndProcessThread initialized for '{self.selected_song_title}'")
 
         # Placeholder for temporary directory used during this run.  This is
         # populated in run() after initialize_directories() has been called.
+        # Callers may provide their own location (e.g. a resumable batch).
         self.temp_dir = None
+        self.temp_dir_override = temp_dir
 
     def run(self):
+        temp_dir = None
         try:
             print("[DEBUG] Starting download and processing thread")
             song_dir, temp_dir = self.initialize_directories()
             # Store the temp_dir on the instance so that other methods (e.g.
-            # remove_watermarks and upscale_images) can save preview images
+            # remove_watermarks and upscale_images) can spill pages there
             self.temp_dir = temp_dir
             print(f"[DEBUG] Directories initialized: {song_dir}, {temp_dir}")
             self.find_parts()
@@ -396,6 +557,7 @@ class DownloadAndProcessThread(QThread):
             print("[DEBUG] Watermarks removed")
             self.upscale_images()
             print("[DEBUG] Images upscaled")
+            self.record_journal('inferred')
             torch.cuda.empty_cache()
             self.create_pdfs(song_dir, temp_dir)
             print("[DEBUG] PDFs created")
@@ -406,21 +568,36 @@ class DownloadAndProcessThread(QThread):
                 self.open_directory(song_dir)
             else:
                 print(f"[DEBUG] Skipping opening directory {song_dir}")
+        except CancelledError:
+            self.log_updated.emit(f"Cancelled processing of '{self.selected_song_title}'")
+            self.release_resources(temp_dir)
+            self.cancelled.emit()
         except Exception as e:
             self.log_updated.emit(f"Exception in run: {str(e)}")
             print(f"[DEBUG] Exception in run: {str(e)}")
 
+    def cancel(self):
+        """Ask the job to stop at its next page, tile or PDF page."""
+        self.cancel_token.cancel()
+
+    def release_resources(self, temp_dir):
+        """Drop intermediate tensors and temporary files of a cancelled job."""
+        self.wm_pages.close()
+        self.us_pages.close()
+        if temp_dir:
+            self.cleanup(temp_dir)
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
     def initialize_directories(self):
         key_dir = self.key_choice_text
         title_dir = re.sub(r'[<>:"\\|?* ]', '_', self.selected_song_title.replace("/", "-"))
         artist_dir = re.sub(r'[<>:"\\|?* ]', '_', self.selected_song_artist.replace("/", "-"))
         main_dir = self.paths['download_dir']
         song_dir = os.path.join(main_dir, title_dir, artist_dir, key_dir)
-        with file_lock:
-            os.makedirs(song_dir, exist_ok=True)
-        temp_dir = os.path.join(main_dir, title_dir, artist_dir, self.paths['temp_sub_dir'])
-        with file_lock:
-            os.makedirs(temp_dir, exist_ok=True)
+        os.makedirs(song_dir, exist_ok=True)
+        temp_dir = self.temp_dir_override or os.path.join(main_dir, title_dir, artist_dir, self.paths['temp_sub_dir'])
+        os.makedirs(temp_dir, exist_ok=True)
         print(f"[DEBUG] Created song directory {song_dir}")
         print(f"[DEBUG] Created temp directory {temp_dir}")
         return song_dir, temp_dir
@@ -463,7 +640,11 @@ class DownloadAndProcessThread(QThread):
     def download_images(self, temp_dir):
         print("[DEBUG] Downloading images")
         self.images_by_instrument = defaultdict(list)
+        self.page_records = defaultdict(list)
         downloaded_urls = set()
+        reusable_pages = {}
+        if self.journal is not None:
+            reusable_pages = self.journal.verified_pages(*self.journal_key)
         try:
             image_xpath = xpaths['image_element']
             next_button_xpath = xpaths['next_button']
@@ -486,8 +667,39 @@ class DownloadAndProcessThread(QThread):
             else:
                 instruments_to_process = self.instrument_parts
 
+            product_url = None
+            if self.catalog is not None or self.prefetch_cache is not None:
+                product_url = self.driver.current_url
+
+            harvester = None
+            if self.use_network_log:
+                harvester = NetworkImageHarvester(self.driver, log_func=self.log_updated.emit)
+                if not harvester.enable():
+                    self.log_updated.emit("Network log capture unavailable, reading pages from the page instead.")
+                    harvester = None
+
             for instrument in instruments_to_process:
+                self.cancel_token.raise_if_cancelled()
                 self.log_updated.emit(f"[DEBUG] Processing instrument: {instrument}")
+                if self.prefetch_cache is not None:
+                    prefetched = self.prefetch_cache.take(product_url, self.key_choice_text, instrument)
+                    if prefetched:
+                        self.log_updated.emit(f"Using {len(prefetched)} prefetched pages of {instrument}")
+                        for path in prefetched:
+                            self.images_by_instrument[instrument].append(path)
+                            self.page_records[instrument].append({'path': path, 'sha256': file_sha256(path)})
+                        continue
+                if instrument in reusable_pages:
+                    self.log_updated.emit(f"Reusing {len(reusable_pages[instrument])} pages of {instrument} from the previous run")
+                    for path in reusable_pages[instrument]:
+                        self.images_by_instrument[instrument].append(path)
+                        self.page_records[instrument].append({'path': path, 'sha256': file_sha256(path)})
+                    continue
+                if harvester:
+                    # Forget requests made for the previously selected part
+                    harvester.reset()
+                else:
+                    discard_performance_log(self.driver)
                 if not SeleniumHelper.click_element(self.driver, parts_button_xpath, log_func=self.log_updated.emit):
                     self.log_updated.emit('Error clicking "Parts" button')
                     continue
@@ -514,8 +726,14 @@ class DownloadAndProcessThread(QThread):
                     self.log_updated.emit(f"Could not find instrument: {instrument} in the dropdown list.")
                     continue
 
+                if harvester:
+                    self.harvest_instrument_pages(harvester, instrument, temp_dir, downloaded_urls)
+                    self.record_page_count(product_url, instrument)
+                    continue
+
                 previous_page_number = None
                 while True:
+                    self.cancel_token.raise_if_cancelled()
                     image_element = SeleniumHelper.find_element(self.driver, image_xpath, log_func=self.log_updated.emit)
                     if not image_element:
                         break
@@ -540,28 +758,123 @@ class DownloadAndProcessThread(QThread):
                     downloaded_urls.add(image_url)
 
                     try:
-                        response = requests.get(image_url)
+                        response = requests.get(image_url, timeout=PAGE_REQUEST_TIMEOUT)
                         if response.status_code == 200:
-                            with file_lock:
-                                with open(full_path, 'wb') as f:
-                                    f.write(response.content)
-                            self.images_by_instrument[instrument].append(full_path)
-                            # Emit a preview signal so the GUI can display the
-                            # downloaded image immediately.  The full_path
-                            # points to the file saved on disk.
-                            try:
-                                self.download_preview.emit(full_path)
-                            except Exception:
-                                # In case no slot is connected or emission fails we silently ignore
-                                pass
+                            self.save_page(full_path, response.content, instrument)
                         if not self.click_next_button(next_button_xpath):
                             break
                     except Exception:
                         break
 
                     previous_page_number = current_page_number
+
+                self.record_page_count(product_url, instrument)
         except Exception as e:
             self.log_updated.emit(f"Exception in download_images: {str(e)}")
+        self.record_journal('pages_fetched', pages=dict(self.page_records))
+
+    def save_page(self, full_path, content, instrument):
+        # Written atomically so the preview and a resumed run never read a half-written page
+        atomic_write_bytes(full_path, content)
+        self.images_by_instrument[instrument].append(full_path)
+        self.page_records[instrument].append({'path': full_path, 'sha256': hashlib.sha256(content).hexdigest()})
+        if self.preview_throttle.ready():
+            start = time.perf_counter()
+            try:
+                image = QImage.fromData(content)
+                if not image.isNull():
+                    self.download_preview.emit(
+                        image.scaled(*PREVIEW_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                    )
+            except Exception:
+                pass
+            self.preview_throttle.spent(time.perf_counter() - start)
+
+    def emit_preview(self, signal, page, force=False):
+        """Emit a thumbnail of a [0, 1] page tensor if the preview budget allows."""
+        if not self.preview_throttle.ready(force):
+            return
+        start = time.perf_counter()
+        try:
+            height, width = page.shape[-2:]
+            scale = min(PREVIEW_SIZE[0] / width, PREVIEW_SIZE[1] / height, 1.0)
+            size = (max(1, int(height * scale)), max(1, int(width * scale)))
+            # Downscaled once from the tensor; area averaging keeps thin staff lines visible
+            small = nn.functional.interpolate(page.reshape(1, 1, height, width), size=size, mode='area')
+            # copy() so the image owns its pixels once it leaves this thread
+            signal.emit(self.converter.to_qimage(small).copy())
+        except Exception:
+            pass
+        self.preview_throttle.spent(time.perf_counter() - start)
+
+    def record_journal(self, step, **data):
+        if self.journal is None:
+            return
+        song, option = self.journal_key
+        try:
+            self.journal.record(song, step, option=option, **data)
+        except Exception as e:
+            self.log_updated.emit(f"[DEBUG] Failed to write job journal: {str(e)}")
+
+    def record_page_count(self, product_url, instrument):
+        if product_url and self.images_by_instrument.get(instrument):
+            record_in_catalog(self.catalog, 'record_page_count', product_url, self.key_choice_text,
+                              instrument, len(self.images_by_instrument[instrument]),
+                              log_func=self.log_updated.emit)
+
+    def harvest_instrument_pages(self, harvester, instrument, temp_dir, downloaded_urls):
+        """Download the pages of the selected part using the network log.
+
+        The preview image is read once to learn which part is displayed; after
+        that the carousel is advanced without inspecting the DOM and every page
+        request Chrome makes for the part is collected from the log.  Response
+        bodies are taken from the browser when still buffered, otherwise the
+        page is fetched over HTTP.
+        """
+        image_element = SeleniumHelper.find_element(self.driver, xpaths['image_element'], log_func=self.log_updated.emit)
+        if not image_element:
+            return
+        first_url = image_element.get_attribute('src') or ''
+        if not page_image_pattern.search(first_url):
+            return
+        prefix = page_prefix(first_url)
+
+        harvester.poll()
+        seen = len(harvester.page_urls(prefix))
+        idle_clicks = 0
+        # Advance until the carousel stops producing new pages for this part
+        while idle_clicks < 2:
+            self.cancel_token.raise_if_cancelled()
+            if not self.click_next_button(xpaths['next_button']):
+                break
+            time.sleep(0.2)
+            harvester.poll()
+            count = len(harvester.page_urls(prefix))
+            idle_clicks = idle_clicks + 1 if count == seen else 0
+            seen = count
+
+        urls = harvester.page_urls(prefix)
+        if first_url not in urls:
+            urls.insert(0, first_url)
+        self.log_updated.emit(f"[DEBUG] Harvested {len(urls)} pages for {instrument} from the network log")
+
+        for image_url in urls:
+            self.cancel_token.raise_if_cancelled()
+            if image_url in downloaded_urls:
+                continue
+            downloaded_urls.add(image_url)
+            self.status.emit(f"Downloading {os.path.basename(image_url)}")
+            full_path = os.path.join(temp_dir, os.path.basename(image_url))
+            content = harvester.fetch_body(image_url)
+            if content is None:
+                try:
+                    response = requests.get(image_url, timeout=PAGE_REQUEST_TIMEOUT)
+                except Exception:
+                    continue
+                if response.status_code != 200:
+                    continue
+                content = response.content
+            self.save_page(full_path, content, instrument)
 
     def click_next_button(self, next_button_xpath):
         return SeleniumHelper.click_element(self.driver, next_button_xpath, log_func=self.log_updated.emit)
@@ -570,118 +883,165 @@ class DownloadAndProcessThread(QThread):
         print("[DEBUG] Removing watermarks")
         try:
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            wm_model = UNet().to(self.device)
-            load_best_model(wm_model, self.paths['wm_model_path'])
+            # The architecture comes from the checkpoint, so slimmed or
+            # pruned models can be used by pointing the path at them
+            wm_model = build_best_model(UNet, self.paths['wm_model_path']).to(self.device)
             wm_model.eval()
-            self.wm_outputs = defaultdict(list)
-            total_images = sum(len(paths) for paths in self.images_by_instrument.values())
+            self.wm_pages = PageStore(self.temp_dir, self.page_memory_budget)
+            self.us_pages = PageStore(self.temp_dir, self.page_memory_budget)
+            pages = [
+                (instrument, path)
+                for instrument, paths in self.images_by_instrument.items()
+                for path in paths
+            ]
+            total_images = len(pages)
             processed_images = 0
+            # Pages of this song by signature, for repeats across its parts
+            seen = SignatureTable()
+            repeated = reused = 0
+            # Page index -> plan entry; pages skipping the model are known
+            # before the rest of their batch, so the plan is built in page
+            # order at the end
+            slots = {}
             self.status.emit("Removing watermarks")
             self.progress.emit(0)
+            # Pages are decoded and resized on a thread pool ahead of the model
+            decoder = PageDecoder([path for _, path in pages], pin_memory=self.device.type == 'cuda')
             with torch.inference_mode():
-                for instrument, paths in self.images_by_instrument.items():
-                    for path in paths:
+                for indices, batch in decoder:
+                    self.cancel_token.raise_if_cancelled()
+                    # Repeated and already processed pages skip the models
+                    todo = []
+                    for offset, index in enumerate(indices):
+                        page = batch[offset, 0].numpy()
+                        signature = page_signature(page)
+                        entry = seen.find(signature)
+                        if entry is not None:
+                            repeated += 1
+                        elif self.page_index is not None:
+                            output = self.page_index.lookup(signature, self.quality_tier)
+                            if output is not None:
+                                entry = ('us', self.us_pages.add(output))
+                                seen.add(signature, entry)
+                                reused += 1
+                        if entry is None and self.watermark_detector is not None \
+                                and not self.watermark_detector.is_watermarked(page):
+                            # Clean pages go to upscaling as decoded
+                            page_id = self.wm_pages.add(page)
+                            self.wm_signatures[page_id] = signature
+                            entry = ('wm', page_id)
+                            seen.add(signature, entry)
+                        if entry is None:
+                            todo.append((offset, index, signature))
+                            continue
+                        slots[index] = entry
+                        processed_images += 1
+                        self.progress.emit(int((processed_images / total_images) * 100))
+                    if not todo:
+                        continue
+                    inputs = batch if len(todo) == len(indices) else batch[[offset for offset, _, _ in todo]]
+                    try:
+                        wm_batch = wm_model(inputs.to(self.device)).cpu()
+                    except Exception as e:
+                        self.log_updated.emit(f"[DEBUG] Watermark removal failed: {str(e)}")
+                        continue
+                    for position, (_, index, signature) in enumerate(todo):
                         try:
-                            image_tensor = PIL_to_tensor(path).unsqueeze(0).to(self.device)
-                            wm_output = wm_model(image_tensor)
-                            # Store the raw tensor output in memory
-                            self.wm_outputs[instrument].append(wm_output.cpu())
-
-                            # Save a preview of the watermark‑removed image.  Convert the
-                            # tensor to a PIL image and write it into the temporary
-                            # directory.  Use the original filename as the base for the
-                            # preview so that previews can be matched to their source.
-                            if self.temp_dir:
-                                try:
-                                    from .inference.model_functions import tensor_to_PIL  # type: ignore
-                                except Exception:
-                                    # Fallback import if relative import fails (e.g. when running module directly)
-                                    from watermark_remover.inference.model_functions import tensor_to_PIL
-                                pil_img = tensor_to_PIL(wm_output.squeeze(0))
-                                base_name = os.path.basename(path)
-                                preview_name = os.path.splitext(base_name)[0] + "_wm_preview.png"
-                                preview_path = os.path.join(self.temp_dir, preview_name)
-                                with file_lock:
-                                    pil_img.save(preview_path)
-                                try:
-                                    self.watermark_preview.emit(preview_path)
-                                except Exception:
-                                    pass
-
+                            wm_output = wm_batch[position:position + 1]
+                            page_id = self.wm_pages.add(wm_output)
+                            self.wm_signatures[page_id] = signature
+                            seen.add(signature, ('wm', page_id))
+                            slots[index] = ('wm', page_id)
                             processed_images += 1
+                            self.emit_preview(self.watermark_preview, wm_output,
+                                              force=processed_images == total_images)
                             progress_value = int((processed_images / total_images) * 100)
                             self.progress.emit(progress_value)
                         except Exception:
                             continue
+            # pages is grouped by instrument, so this keeps each part in order
+            for index in sorted(slots):
+                self.page_plan[pages[index][0]].append(slots[index])
+            for index in decoder.failed:
+                self.log_updated.emit(f"[DEBUG] Could not decode {pages[index][1]}")
+            if self.watermark_detector is not None:
+                self.log_updated.emit(self.watermark_detector.report())
+            if repeated or reused:
+                self.log_updated.emit(
+                    f"Skipped inference for {repeated + reused} of {total_images} pages "
+                    f"({repeated} repeated in this song, {reused} processed before)"
+                )
         except Exception as e:
             self.log_updated.emit(f"Exception in remove_watermarks: {str(e)}")
 
     def upscale_images(self):
         print("[DEBUG] Upscaling images")
         try:
-            image_base_width, image_base_height = 1700, 2200
-            us_model = VDSR().to(self.device)
-            load_best_model(us_model, self.paths['us_model_path'])
-            us_model.eval()
-            upsample = nn.Upsample(size=(image_base_height, image_base_width), mode='nearest')
-            self.us_outputs = defaultdict(list)
-            total_images = sum(len(outputs) for outputs in self.wm_outputs.values())
+            us_model = None
+            if uses_vdsr(self.quality_tier):
+                us_model = build_best_model(VDSR, self.paths['us_model_path']).to(self.device)
+                us_model.eval()
+            total_images = sum(len(entries) for entries in self.page_plan.values())
             processed_images = 0
-            self.status.emit("Upscaling images")
+            # Watermark-removed page id -> upscaled page id
+            upscaled = {}
+            # Watermark-removed pages whose upscaling failed; every link to
+            # them (repeated pages share one) is left out
+            failed = set()
+            skipped = 0
+            self.status.emit(f"Upscaling images ({self.quality_tier})")
             self.progress.emit(0)
             with torch.inference_mode():
-                 for instrument, wm_outputs in self.wm_outputs.items():
-                     for idx, wm_output in enumerate(wm_outputs):
-                         try:
-                             wm_output_upscaled = upsample(wm_output)
-                             padding_size = 16
-                             patch_height = 550
-                             patch_width = 850
-                             padding = (padding_size, padding_size, padding_size, padding_size)
-                             wm_output_upscaled_padded = nn.functional.pad(wm_output_upscaled, padding, value=1.0)
-                             us_output = torch.zeros_like(wm_output_upscaled).cpu()
-                             for i in range(0, wm_output_upscaled.shape[-2], patch_height):
-                                 for j in range(0, wm_output_upscaled.shape[-1], patch_width):
-                                     patch = wm_output_upscaled_padded[:, :, i:i + patch_height + padding_size * 2, j:j + patch_width + padding_size * 2].cpu()
-                                     us_patch = us_model(patch.to(self.device))
-                                     us_patch = us_patch[:, :, padding_size:-padding_size, padding_size:-padding_size]
-                                     us_output[:, :, i:i + patch_height, j:j + patch_width] = us_patch.cpu()
-                             self.us_outputs[instrument].append(us_output)
-
-                             # Save a preview of the upscaled image.  Use tensor_to_PIL
-                             # to convert and write to the temporary directory.
-                             if self.temp_dir:
-                                 try:
-                                     from .inference.model_functions import tensor_to_PIL  # type: ignore
-                                 except Exception:
-                                     from watermark_remover.inference.model_functions import tensor_to_PIL
-                                 pil_img = tensor_to_PIL(us_output.squeeze(0))
-                                 # create a unique filename using instrument name and index
-                                 safe_instrument = re.sub(r"[^a-zA-Z0-9]", "_", instrument)
-                                 preview_name = f"{safe_instrument}_us_preview_{idx:03d}.png"
-                                 preview_path = os.path.join(self.temp_dir, preview_name)
-                                 with file_lock:
-                                     pil_img.save(preview_path)
-                                 try:
-                                     self.upscale_preview.emit(preview_path)
-                                 except Exception:
-                                     pass
-
-                             processed_images += 1
-                             progress_value = int((processed_images / total_images) * 100)
-                             self.progress.emit(progress_value)
-                         except Exception:
-                             continue
+                for instrument, entries in self.page_plan.items():
+                    for kind, page_id in entries:
+                        processed_images += 1
+                        self.progress.emit(int((processed_images / total_images) * 100))
+                        if kind == 'wm' and page_id not in upscaled and page_id not in failed:
+                            try:
+                                us_output = upscale_page(self.wm_pages.get(page_id), self.quality_tier,
+                                                         us_model, self.device, self.cancel_token)
+                                upscaled[page_id] = self.us_pages.add(us_output)
+                            except Exception as e:
+                                failed.add(page_id)
+                                self.log_updated.emit(f"Upscaling a page of {instrument} failed: {str(e)}")
+                            else:
+                                if self.page_index is not None:
+                                    self.page_index.store(self.wm_signatures[page_id],
+                                                          self.converter.to_uint8(us_output),
+                                                          self.quality_tier, log_func=self.log_updated.emit)
+                                self.emit_preview(self.upscale_preview, us_output,
+                                                  force=processed_images == total_images)
+                        if kind == 'wm' and page_id in failed:
+                            skipped += 1
+                            self.log_updated.emit(f"[DEBUG] Leaving a page out of {instrument}: it could not be upscaled")
+                            continue
+                        self.us_pages.link(instrument, upscaled[page_id] if kind == 'wm' else page_id)
+            if skipped:
+                self.log_updated.emit(f"{skipped} pages are missing from the PDFs because upscaling failed")
+            self.log_page_memory()
+            # The upscaled pages are all that is needed from here on
+            self.wm_pages.close()
         except Exception as e:
             self.log_updated.emit(f"Exception in upscale_images: {str(e)}")
 
+    def log_page_memory(self):
+        mib = 2 ** 20
+        for name, store in (('watermark-removed', self.wm_pages), ('upscaled', self.us_pages)):
+            report = store.memory_report()
+            if report['pages']:
+                self.log_updated.emit(
+                    f"[DEBUG] {report['pages']} {name} pages: peak {report['peak_ram_bytes'] / mib:.1f} MiB "
+                    f"in memory, {report['spilled_bytes'] / mib:.1f} MiB spilled to disk"
+                )
+
     def create_pdfs(self, song_dir, temp_dir):
         print("[DEBUG] Creating PDFs")
         try:
             img_width, img_height = 1700, 2200
-            total_instruments = len(self.us_outputs)
+            instruments = self.us_pages.instruments()
+            total_instruments = len(instruments)
             processed_instruments = 0
-            for instrument, us_outputs in self.us_outputs.items():
+            for instrument in instruments:
                 image_paths = self.images_by_instrument[instrument]
                 first_image_path = image_paths[0]
                 first_image_filename = os.path.basename(first_image_path)
@@ -689,22 +1049,21 @@ class DownloadAndProcessThread(QThread):
                 base_filename = os.path.splitext(base_filename)[0]
                 pdf_filename = f"{base_filename}.pdf"
                 pdf_path = os.path.join(song_dir, pdf_filename)
-                with file_lock:
-                    c = canvas.Canvas(pdf_path, pagesize=(img_width, img_height))
                 self.status.emit(f"Creating {pdf_filename}")
-                for idx, image_tensor in enumerate(us_outputs):
-                    try:
-                        image_pil = tensor_to_PIL(image_tensor.squeeze(0))
-                        temp_image_name = f"temp_image_{base_filename}_{idx}.png"
-                        temp_image_path = os.path.join(temp_dir, temp_image_name)
-                        with file_lock:
-                            image_pil.save(temp_image_path)
-                            c.drawImage(temp_image_path, 0, 0, width=img_width, height=img_height)
+                # The PDF only appears under its name once it is complete; a
+                # cancelled or failed job leaves nothing behind.
+                with atomic_path(pdf_path) as tmp_pdf_path:
+                    c = canvas.Canvas(tmp_pdf_path, pagesize=(img_width, img_height))
+                    # Pages are read back one at a time, from memory or disk
+                    for page in self.us_pages.iter_pages(instrument):
+                        self.cancel_token.raise_if_cancelled()
+                        try:
+                            # Drawn straight from the stored uint8 page; no temporary PNG
+                            c.drawImage(self.converter.to_image_reader(page), 0, 0,
+                                        width=img_width, height=img_height)
                             c.showPage()
-                            os.remove(temp_image_path)
-                    except Exception:
-                        continue
-                with file_lock:
+                        except Exception:
+                            continue
                     c.save()
                 processed_instruments += 1
                 progress_value = int((processed_instruments / total_instruments) * 100)
@@ -715,12 +1074,14 @@ class DownloadAndProcessThread(QThread):
     def cleanup(self, temp_dir):
         print("[DEBUG] Cleaning up temporary files")
         try:
+            # Also removes any spill files kept inside temp_dir
+            self.wm_pages.close()
+            self.us_pages.close()
             for paths in self.images_by_instrument.values():
                 for path in paths:
-                    with file_lock:
+                    if os.path.exists(path):
                         os.remove(path)
-            with file_lock:
-                os.rmdir(temp_dir)
+            os.rmdir(temp_dir)
         except Exception as e:
             self.log_updated.emit(f"Exception in cleanup: {str(e)}")
 
@@ -730,13 +1091,55 @@ class DownloadAndProcessThread(QThread):
             if not os.environ.get('DISPLAY') and platform.system() == 'Linux':
                 return
             if platform.system() == "Windows":
-                with file_lock:
-                    subprocess.run(['explorer', path.replace('/', '\\')], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                subprocess.run(['explorer', path.replace('/', '\\')], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             elif platform.system() == "Darwin":
-                with file_lock:
-                    subprocess.run(['open', path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                subprocess.run(['open', path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             elif platform.system() == "Linux":
-                with file_lock:
-                    subprocess.run(['xdg-open', path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                subprocess.run(['xdg-open', path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         except Exception as e:
             self.log_updated.emit(f"Exception in open_directory: {str(e)}")
+
+
+class PrefetchThread(DownloadAndProcessThread):
+    """
+    Download the pages of the most likely parts in the song's default key
+    while the user is still choosing.  Only page downloading is done ahead of
+    time; completed parts are stored in the prefetch cache for the real
+    download to pick up.  Call cancel() and wait() before the browser is used
+    for anything else.
+    """
+
+    def __init__(self, driver, key, product_url, parts, paths, prefetch_cache, catalog=None):
+        super().__init__(driver, key, '', '', paths, [], open_after_download=False, catalog=catalog,
+                         preview_rate=0)
+        self.product_url = product_url
+        self.parts = parts
+        self.cache = prefetch_cache
+
+    def run(self):
+        temp_dir = os.path.join(self.paths['cache_dir'], 'prefetch')
+        try:
+            os.makedirs(temp_dir, exist_ok=True)
+            for part in self.parts:
+                if self.cache.contains(self.product_url, self.key_choice_text, part):
+                    continue
+                start = time.perf_counter()
+                self.selected_instruments = [part]
+                self.download_images(temp_dir)
+                pages = self.images_by_instrument.get(part, [])
+                if pages:
+                    self.cache.put(self.product_url, self.key_choice_text, part, pages)
+                    self.log_updated.emit(
+                        f"[DEBUG] Prefetched {len(pages)} pages of {part} in {time.perf_counter() - start:.1f}s"
+                    )
+        except CancelledError:
+            # Drop the partially downloaded part
+            for pages in self.images_by_instrument.values():
+                for path in pages:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self.log_updated.emit("[DEBUG] Prefetch stopped")
+        except Exception as e:
+            self.log_updated.emit(f"Exception in prefetch: {str(e)}")
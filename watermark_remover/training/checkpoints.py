@@ -0,0 +1,66 @@
+# Saving checkpoints in the format load_best_model and build_best_model read
+
+import os
+
+import torch
+
+from watermark_remover.inference.model_functions import best_checkpoint, build_best_model
+from watermark_remover.utils.file_utils import atomic_path
+
+
+def unwrap(model):
+    """Return the plain model inside DDP or torch.compile wrappers."""
+    model = getattr(model, 'module', model)
+    return getattr(model, '_orig_mod', model)
+
+
+def save_checkpoint(model, directory, epoch, results, optimizer=None):
+    """Write ``model_epoch_{epoch}.pth`` to ``directory``.
+
+    Same keys as the training notebooks' ``save_model_fn`` plus the model's
+    ``arch``, so models of any width can be rebuilt by ``build_best_model``.
+    ``results`` holds the per-epoch ``train_loss``, ``val_loss`` and
+    ``train_time`` lists and any further per-epoch records (e.g.
+    ``throughput``), which are saved alongside.  With ``optimizer`` its
+    state is saved too, so training can resume where it stopped.
+    """
+    model = unwrap(model)
+    save_dict = {
+        'state_dict': model.state_dict(),
+        'arch': model.arch,
+        **results,
+        'last_epoch': epoch,
+    }
+    if optimizer is not None:
+        save_dict['optimizer'] = optimizer.state_dict()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"model_epoch_{epoch}.pth")
+    with atomic_path(path) as tmp_path:
+        torch.save(save_dict, tmp_path)
+    return path
+
+
+def build_trained_model(model_class, directory):
+    """``build_best_model`` for models that must be trained, e.g. teachers.
+
+    ``build_best_model`` falls back to untrained weights; this raises
+    ``FileNotFoundError`` instead when ``directory`` has no checkpoint.
+    """
+    if not os.path.isdir(directory) or best_checkpoint(directory) is None:
+        raise FileNotFoundError(f"no model_epoch_N.pth checkpoint in {directory}")
+    return build_best_model(model_class, directory)
+
+
+def latest_checkpoint(directory):
+    """Return (epoch, checkpoint dict) of the newest ``model_epoch_N.pth``, or None."""
+    if not os.path.isdir(directory):
+        return None
+    epochs = [
+        int(name[len('model_epoch_'):-len('.pth')]) for name in os.listdir(directory)
+        if name.startswith('model_epoch_') and name.endswith('.pth')
+    ]
+    if not epochs:
+        return None
+    epoch = max(epochs)
+    path = os.path.join(directory, f"model_epoch_{epoch}.pth")
+    return epoch, torch.load(path, map_location='cpu')
@@ -0,0 +1,172 @@
+# Datasets of local page images for training tools
+
+import os
+import random
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from PIL import Image, ImageDraw
+from torch.utils.data import Dataset
+
+from watermark_remover.inference.model_functions import PAGE_SIZE, PIL_to_tensor
+from watermark_remover.inference.quality_tiers import UPSCALED_SIZE
+from watermark_remover.inference.watermark_detector import load_grayscale, watermark_weights
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def list_images(directory):
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+def remove_watermark(page, wm_model):
+    """Run the UNet on a 1 x H x W page; return its output as uint8, as the pipeline keeps it."""
+    with torch.inference_mode():
+        output = wm_model(page.unsqueeze(0))[0]
+    return output.mul(255).clamp_(0, 255).to(torch.uint8)
+
+
+def vdsr_input(removed):
+    """Upscale a watermark-removed uint8 page to ``UPSCALED_SIZE`` (nearest) in [0, 1]."""
+    page = removed.float().div_(255)
+    return F.interpolate(page.unsqueeze(0), size=UPSCALED_SIZE, mode='nearest')[0]
+
+
+def model_input(path, kind, wm_model=None):
+    """Load a page as the given model sees it: 1 x H x W in [0, 1].
+
+    The UNet works on pages at ``PAGE_SIZE``; VDSR on the UNet's
+    (``wm_model``) output upscaled to ``UPSCALED_SIZE`` with
+    nearest-neighbour interpolation, as in the pipeline.
+    """
+    page = PIL_to_tensor(path)
+    if kind == 'vdsr':
+        page = vdsr_input(remove_watermark(page, wm_model))
+    return page
+
+
+class PageCrops(Dataset):
+    """Square crops of local pages, prepared as model inputs.
+
+    ``crops_per_page`` random crops are drawn from every page.  With
+    ``seed`` set the crops are the same every epoch (for validation).
+    Pages are decoded on every access, so keep the set small or use
+    several DataLoader workers.  VDSR crops need the UNet (``wm_model``),
+    which is run once per page up front.
+    """
+
+    def __init__(self, paths, kind, crop=128, crops_per_page=8, seed=None, wm_model=None):
+        self.paths = list(paths)
+        self.kind = kind
+        self.crop = crop
+        self.crops_per_page = crops_per_page
+        self.seed = seed
+        self.removed = None
+        if kind == 'vdsr':
+            if wm_model is None:
+                raise ValueError("VDSR crops need the watermark removal model")
+            wm_model.eval()
+            self.removed = [remove_watermark(PIL_to_tensor(path), wm_model) for path in self.paths]
+
+    def __len__(self):
+        return len(self.paths) * self.crops_per_page
+
+    def __getitem__(self, index):
+        page_number = index // self.crops_per_page
+        if self.removed is not None:
+            page = vdsr_input(self.removed[page_number])
+        else:
+            page = model_input(self.paths[page_number], self.kind)
+        rng = random.Random(self.seed * 100003 + index) if self.seed is not None else random
+        height, width = page.shape[-2:]
+        top = rng.randint(0, max(height - self.crop, 0))
+        left = rng.randint(0, max(width - self.crop, 0))
+        return page[:, top:top + self.crop, left:left + self.crop].contiguous()
+
+
+def split_paths(paths, val_fraction=0.2, seed=42):
+    """Deterministic train/validation split with at least one page in each."""
+    paths = list(paths)
+    random.Random(seed).shuffle(paths)
+    count = max(1, int(len(paths) * val_fraction)) if len(paths) > 1 else 0
+    return paths[count:], paths[:count] or paths
+
+
+def procedural_watermark(size=PAGE_SIZE, text="WATERMARK"):
+    """A tiled, diagonal text watermark as an ``H x W`` tensor in [0, 1] (1 = ink)."""
+    height, width = size
+    tile = Image.new('L', (96, 24), 0)
+    ImageDraw.Draw(tile).text((4, 6), text, fill=255)
+    tile = tile.resize((384, 96)).rotate(30, expand=True)
+    canvas = Image.new('L', (width, height), 0)
+    for top in range(-tile.height // 2, height, tile.height):
+        for left in range(-tile.width // 2, width, tile.width):
+            canvas.paste(tile, (left, top), tile)
+    return torch.from_numpy(np.asarray(canvas, dtype=np.float32) / 255)
+
+
+def mask_watermark(path, size=PAGE_SIZE):
+    """The stored watermark mask as an ``H x W`` tensor in [0, 1] (1 = ink)."""
+    return torch.from_numpy(watermark_weights(load_grayscale(path, size)))
+
+
+class SyntheticWatermarkPairs(Dataset):
+    """(input, target, index) training pairs made on the fly from clean pages.
+
+    For the UNet the input is a clean page (at ``PAGE_SIZE``) darkened by
+    ``watermark`` at a random strength and offset, and the target is the
+    clean page.  For VDSR the input is the clean page (at ``UPSCALED_SIZE``)
+    reduced to ``PAGE_SIZE`` and upscaled again with nearest-neighbour
+    interpolation, and the target is the clean page.  Both are cropped to
+    the same random ``crop`` x ``crop`` region.  With ``seed`` set every
+    epoch sees the same pairs (for validation); otherwise they come from
+    torch's global generator, which DataLoader seeds per worker.  With
+    ``crop_seed`` set only the crop region is fixed per index, so targets
+    repeat every epoch (and their perceptual features can be cached) while
+    the watermark still varies.
+    """
+
+    def __init__(self, paths, kind, watermark=None, crop=128, crops_per_page=8, seed=None,
+                 strength=(0.2, 0.6), max_shift=24, crop_seed=None):
+        self.paths = list(paths)
+        self.kind = kind
+        self.watermark = watermark if watermark is not None else procedural_watermark()
+        self.crop = crop
+        self.crops_per_page = crops_per_page
+        self.seed = seed
+        self.strength = strength
+        self.max_shift = max_shift
+        self.crop_seed = crop_seed
+
+    def __len__(self):
+        return len(self.paths) * self.crops_per_page
+
+    def _random(self, generator, low, high):
+        return low + (high - low) * torch.rand((), generator=generator).item()
+
+    def __getitem__(self, index):
+        generator = None
+        if self.seed is not None:
+            generator = torch.Generator().manual_seed(self.seed * 100003 + index)
+        path = self.paths[index // self.crops_per_page]
+        if self.kind == 'vdsr':
+            clean = torch.from_numpy(load_grayscale(path, UPSCALED_SIZE)).unsqueeze(0)
+            low = F.interpolate(clean.unsqueeze(0), size=PAGE_SIZE, mode='area')
+            inputs = F.interpolate(low, size=UPSCALED_SIZE, mode='nearest')[0]
+        else:
+            clean = torch.from_numpy(load_grayscale(path)).unsqueeze(0)
+            shifts = [int(self._random(generator, -self.max_shift, self.max_shift + 1)) for _ in range(2)]
+            watermark = torch.roll(self.watermark, shifts=shifts, dims=(0, 1))
+            strength = self._random(generator, *self.strength)
+            inputs = clean * (1 - strength * watermark)
+        height, width = clean.shape[-2:]
+        if generator is None and self.crop_seed is not None:
+            generator = torch.Generator().manual_seed(self.crop_seed * 100003 + index)
+        top = int(self._random(generator, 0, max(height - self.crop, 0)))
+        left = int(self._random(generator, 0, max(width - self.crop, 0)))
+        window = (slice(None), slice(top, top + self.crop), slice(left, left + self.crop))
+        return inputs[window].contiguous(), clean[window].contiguous(), index
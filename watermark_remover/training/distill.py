@@ -0,0 +1,154 @@
+"""Distil slimmer UNet or VDSR students from the shipped teacher models.
+
+The student is trained to reproduce the teacher's output (L1 loss) on
+random crops of a small folder of local pages, so no clean/watermarked
+pairs are needed.  VDSR students see what VDSR sees in the pipeline: the
+watermark removal model's (``--wm-model``) output, upscaled.  Both must
+have a checkpoint.  Every epoch is saved as ``model_epoch_N.pth`` with the
+validation loss history and the student's architecture, so pointing
+``paths['wm_model_path']`` or ``paths['us_model_path']`` at the output
+directory uses the student.  At the end the teacher and the best student
+are compared on full pages (UNet) or full VDSR tiles: parameters, FLOPs,
+latency and PSNR/SSIM against the teacher's output.
+
+Runs on CPU::
+
+    python -m watermark_remover.training.distill unet --data pages/ --epochs 5
+"""
+
+import argparse
+import time
+
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+
+from watermark_remover.inference.model_functions import UNet, VDSR, build_best_model
+from watermark_remover.inference.quality_tiers import TILE_PADDING, TILE_SIZE
+from watermark_remover.training.checkpoints import build_trained_model, save_checkpoint
+from watermark_remover.training.data import PageCrops, list_images, model_input, split_paths
+from watermark_remover.training.metrics import conv_flops, latency, parameter_count, psnr, ssim
+
+# model kind -> (class, student constructor arguments, teacher directory)
+STUDENTS = {
+    'unet': (UNet, {'widths': [16, 32, 64, 128, 256, 256]}, 'models/Watermark_Removal'),
+    'vdsr': (VDSR, {'channels': 32, 'blocks': 5}, 'models/VDSR'),
+}
+
+
+def evaluation_input(path, kind, wm_model=None):
+    """A full-size input: a whole page for the UNet, one padded tile of the UNet's output for VDSR."""
+    page = model_input(path, kind, wm_model).unsqueeze(0)
+    if kind == 'vdsr':
+        height, width = TILE_SIZE
+        page = page[:, :, :height + 2 * TILE_PADDING, :width + 2 * TILE_PADDING]
+    return page
+
+
+def distill(teacher, student, train_loader, val_batches, epochs, output_dir, lr=1e-3, log=print):
+    """Train ``student`` towards ``teacher`` and save a checkpoint per epoch."""
+    teacher.eval()
+    with torch.inference_mode():
+        val_targets = [teacher(batch) for batch in val_batches]
+    optimizer = torch.optim.Adam(student.parameters(), lr=lr)
+    results = {'train_loss': [], 'val_loss': [], 'train_time': []}
+    for epoch in range(1, epochs + 1):
+        student.train()
+        start = time.perf_counter()
+        total, steps = 0.0, 0
+        for inputs in train_loader:
+            with torch.no_grad():
+                targets = teacher(inputs)
+            loss = F.l1_loss(student(inputs), targets)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item()
+            steps += 1
+        results['train_time'].append(time.perf_counter() - start)
+        results['train_loss'].append(total / max(steps, 1))
+        student.eval()
+        with torch.inference_mode():
+            val_loss = sum(
+                F.l1_loss(student(batch), target).item()
+                for batch, target in zip(val_batches, val_targets)
+            ) / len(val_batches)
+        results['val_loss'].append(val_loss)
+        save_checkpoint(student, output_dir, epoch, results)
+        log(f"Epoch {epoch}: train L1 {results['train_loss'][-1]:.4f}, "
+            f"val L1 {val_loss:.4f} ({results['train_time'][-1]:.1f}s)")
+    return results
+
+
+def compare(models, inputs, reference):
+    """Rows of (name, parameters, FLOPs, seconds per input, PSNR, SSIM) against ``reference``."""
+    with torch.inference_mode():
+        targets = [reference(batch) for batch in inputs]
+    rows = []
+    for name, model in models.items():
+        model.eval()
+        with torch.inference_mode():
+            outputs = [model(batch) for batch in inputs]
+        rows.append((
+            name,
+            parameter_count(model),
+            conv_flops(model, inputs[0]),
+            sum(latency(model, batch) for batch in inputs) / len(inputs),
+            sum(psnr(out, target) for out, target in zip(outputs, targets)) / len(inputs),
+            sum(ssim(out, target) for out, target in zip(outputs, targets)) / len(inputs),
+        ))
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'model':<12} {'params':>10} {'GFLOPs':>8} {'s/input':>8} {'PSNR dB':>8} {'SSIM':>6}")
+    for name, params, flops, seconds, quality, similarity in rows:
+        print(f"{name:<12} {params:>10,} {flops / 1e9:8.1f} {seconds:8.3f} {quality:8.2f} {similarity:6.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=list(STUDENTS))
+    parser.add_argument('--data', required=True, help='directory of local page images')
+    parser.add_argument('--teacher', help='teacher checkpoint directory')
+    parser.add_argument('--output', help='student checkpoint directory (default: <teacher>_student)')
+    parser.add_argument('--wm-model', default='models/Watermark_Removal',
+                        help='watermark removal model whose output VDSR inputs are made from')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--crop', type=int, default=128, help='crop size; a multiple of 32 for the UNet')
+    parser.add_argument('--crops-per-page', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--lr', type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    model_class, student_arch, default_teacher = STUDENTS[args.kind]
+    teacher_dir = args.teacher or default_teacher
+    output_dir = args.output or f"{teacher_dir.rstrip('/')}_student"
+    train_paths, val_paths = split_paths(list_images(args.data))
+    if not train_paths:
+        parser.error("need at least two page images")
+
+    try:
+        teacher = build_trained_model(model_class, teacher_dir)
+        wm_model = build_trained_model(UNet, args.wm_model) if args.kind == 'vdsr' else None
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    student = model_class(**student_arch)
+    train_loader = DataLoader(
+        PageCrops(train_paths, args.kind, args.crop, args.crops_per_page, wm_model=wm_model),
+        batch_size=args.batch_size, shuffle=True, num_workers=args.workers,
+    )
+    val_loader = DataLoader(
+        PageCrops(val_paths, args.kind, args.crop, args.crops_per_page, seed=0, wm_model=wm_model),
+        batch_size=args.batch_size, num_workers=args.workers,
+    )
+    distill(teacher, student, train_loader, list(val_loader), args.epochs, output_dir, args.lr)
+
+    best_student = build_best_model(model_class, output_dir)
+    inputs = [evaluation_input(path, args.kind, wm_model) for path in val_paths]
+    print_comparison(compare({'teacher': teacher, 'student': best_student}, inputs, teacher))
+
+
+if __name__ == '__main__':
+    main()
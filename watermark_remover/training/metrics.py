@@ -0,0 +1,61 @@
+# Quality and speed measurements shared by training tools and benchmarks
+
+import math
+import time
+
+import torch
+import torch.nn.functional as F
+from pytorch_msssim import ssim as _ssim
+
+
+def psnr(output, target):
+    """Peak signal-to-noise ratio in dB of [0, 1] images."""
+    mse = F.mse_loss(output.float(), target.float()).item()
+    return float('inf') if mse == 0 else 10 * math.log10(1.0 / mse)
+
+
+def ssim(output, target):
+    return _ssim(output.float(), target.float(), data_range=1.0, size_average=True).item()
+
+
+def parameter_count(model):
+    return sum(parameter.numel() for parameter in model.parameters())
+
+
+def latency(model, inputs, repeats=3):
+    """Median seconds of a forward pass, after one warm-up pass."""
+    times = []
+    with torch.inference_mode():
+        model(inputs)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(inputs)
+            times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def conv_flops(model, inputs):
+    """Floating-point operations (2 x multiply-accumulates) of the convolutions in one pass."""
+    total = 0
+
+    def count(module, args, output):
+        nonlocal total
+        kernel = module.kernel_size[0] * module.kernel_size[1]
+        if isinstance(module, torch.nn.ConvTranspose2d):
+            macs = args[0].numel() * module.out_channels // module.groups * kernel
+        else:
+            macs = output.numel() * module.in_channels // module.groups * kernel
+        total += 2 * macs
+
+    handles = [
+        module.register_forward_hook(count)
+        for module in model.modules()
+        if isinstance(module, (torch.nn.Conv2d, torch.nn.ConvTranspose2d))
+    ]
+    try:
+        with torch.inference_mode():
+            model(inputs)
+    finally:
+        for handle in handles:
+            handle.remove()
+    return total
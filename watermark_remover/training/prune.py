@@ -0,0 +1,133 @@
+"""Structured channel pruning of UNet and VDSR with a short fine-tune.
+
+Inside every ``UNet.conv_block`` and ``VDSR.make_block`` the channels
+between the two convolutions are ranked by the BatchNorm scale that
+follows the first convolution (``--criterion bn``) or by the L1 norm of its
+filters (``--criterion l1``).  The weakest ``--ratio`` of them are removed
+physically: the first convolution and BatchNorm lose output channels and
+the second convolution loses the matching input channels, so the result is
+a smaller dense model.  Block outputs and skip connections are unchanged.
+
+The pruned model is then fine-tuned for a few epochs to reproduce the
+original model's output (see ``distill``) and saved per epoch as
+``model_epoch_N.pth`` with its architecture, which the inference path
+rebuilds through ``build_best_model``.  FLOPs, latency and PSNR against the
+original are reported for the original, the pruned and the fine-tuned
+model::
+
+    python -m watermark_remover.training.prune vdsr --data pages/ --ratio 0.5
+"""
+
+import argparse
+import copy
+
+import torch
+from torch.utils.data import DataLoader
+
+from watermark_remover.inference.model_functions import UNET_BLOCKS, UNet, VDSR, build_best_model
+from watermark_remover.training.checkpoints import build_trained_model
+from watermark_remover.training.data import PageCrops, list_images, split_paths
+from watermark_remover.training.distill import STUDENTS, compare, distill, evaluation_input, print_comparison
+
+CRITERIA = ('bn', 'l1')
+# Channels every block keeps, however high the ratio
+MIN_CHANNELS = 4
+
+
+def prunable_blocks(model):
+    """Yield (arch key, block) for every block with an inner channel dimension.
+
+    Each block is an ``nn.Sequential`` of conv, BatchNorm, ReLU, conv, ...
+    """
+    if isinstance(model, UNet):
+        for name in UNET_BLOCKS:
+            block = getattr(model, name)
+            yield name, block[0] if name == 'middle' else block
+    elif isinstance(model, VDSR):
+        for index, block in enumerate(model.layers[3:-1]):
+            yield index, block
+    else:
+        raise TypeError(f"cannot prune {type(model).__name__}")
+
+
+def channel_scores(block, criterion):
+    if criterion == 'bn':
+        return block[1].weight.detach().abs()
+    return block[0].weight.detach().abs().sum(dim=(1, 2, 3))
+
+
+def prune_model(model, ratio, criterion='bn', min_channels=MIN_CHANNELS):
+    """Return a new, smaller model with ``ratio`` of each block's inner channels removed."""
+    arch = copy.deepcopy(model.arch)
+    names = {module: name for name, module in model.named_modules()}
+    state = dict(model.state_dict())
+    for key, block in prunable_blocks(model):
+        scores = channel_scores(block, criterion)
+        count = max(min_channels, round(len(scores) * (1 - ratio)))
+        keep = torch.topk(scores, min(count, len(scores))).indices.sort().values
+        first, norm, second = (names[block[i]] for i in (0, 1, 3))
+        for suffix in ('weight', 'bias'):
+            state[f"{first}.{suffix}"] = state[f"{first}.{suffix}"][keep]
+        for suffix in ('weight', 'bias', 'running_mean', 'running_var'):
+            state[f"{norm}.{suffix}"] = state[f"{norm}.{suffix}"][keep]
+        state[f"{second}.weight"] = state[f"{second}.weight"][:, keep]
+        arch['inner'][key] = len(keep)
+    pruned = type(model)(**arch)
+    pruned.load_state_dict(state)
+    return pruned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=list(STUDENTS))
+    parser.add_argument('--data', required=True, help='directory of local page images')
+    parser.add_argument('--model-dir', help='checkpoint directory of the model to prune')
+    parser.add_argument('--output', help='pruned checkpoint directory (default: <model-dir>_pruned)')
+    parser.add_argument('--wm-model', default='models/Watermark_Removal',
+                        help='watermark removal model whose output VDSR inputs are made from')
+    parser.add_argument('--ratio', type=float, default=0.5, help='fraction of inner channels to remove')
+    parser.add_argument('--criterion', choices=CRITERIA, default='bn')
+    parser.add_argument('--epochs', type=int, default=2, help='fine-tuning epochs')
+    parser.add_argument('--crop', type=int, default=128, help='crop size; a multiple of 32 for the UNet')
+    parser.add_argument('--crops-per-page', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--lr', type=float, default=1e-4)
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.ratio < 1:
+        parser.error("--ratio must be in [0, 1)")
+    model_class, _, default_dir = STUDENTS[args.kind]
+    model_dir = args.model_dir or default_dir
+    output_dir = args.output or f"{model_dir.rstrip('/')}_pruned"
+    train_paths, val_paths = split_paths(list_images(args.data))
+    if not train_paths:
+        parser.error("need at least two page images")
+
+    try:
+        original = build_trained_model(model_class, model_dir).eval()
+        wm_model = build_trained_model(UNet, args.wm_model) if args.kind == 'vdsr' else None
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    pruned = prune_model(original, args.ratio, args.criterion).eval()
+    before = copy.deepcopy(pruned)
+    print(f"Inner channels after pruning: {pruned.arch['inner']}")
+
+    train_loader = DataLoader(
+        PageCrops(train_paths, args.kind, args.crop, args.crops_per_page, wm_model=wm_model),
+        batch_size=args.batch_size, shuffle=True, num_workers=args.workers,
+    )
+    val_loader = DataLoader(
+        PageCrops(val_paths, args.kind, args.crop, args.crops_per_page, seed=0, wm_model=wm_model),
+        batch_size=args.batch_size, num_workers=args.workers,
+    )
+    distill(original, pruned, train_loader, list(val_loader), args.epochs, output_dir, args.lr)
+
+    fine_tuned = build_best_model(model_class, output_dir)
+    inputs = [evaluation_input(path, args.kind, wm_model) for path in val_paths]
+    models = {'original': original, 'pruned': before, 'fine-tuned': fine_tuned}
+    print_comparison(compare(models, inputs, original))
+
+
+if __name__ == '__main__':
+    main()
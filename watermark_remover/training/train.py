@@ -0,0 +1,204 @@
+"""Train the UNet or VDSR from clean pages, on one or several CPU processes.
+
+Training pairs are synthesised on the fly from a folder of clean local
+pages (see ``SyntheticWatermarkPairs``): the UNet learns to remove a
+watermark drawn over them at random strengths and offsets (the stored mask
+with ``--mask``, a procedural text watermark otherwise); VDSR learns to
+undo the nearest-neighbour upscale used at inference.  With
+``--processes N`` the model is trained with DistributedDataParallel over
+the gloo backend, each process taking a shard of every epoch and using
+``--threads`` intra-op threads and ``--workers`` DataLoader workers.
+Every training sample keeps its crop region across epochs, so with the
+combined loss the perceptual features of its target are computed once and
+cached (up to ``--feature-cache`` samples per process); ``--random-crops``
+draws new regions every epoch instead, without the cache.
+
+Each epoch is saved as ``model_epoch_N.pth`` with the loss and time
+histories, the architecture, the optimizer state and the throughput in
+samples per second, so the output directory can be used as
+``paths['wm_model_path']`` or ``paths['us_model_path']``.  Training
+resumes, weights and optimizer alike, from the newest checkpoint in the
+output directory, and each epoch is also appended to ``train_log.jsonl``
+there::
+
+    python -m watermark_remover.training.train unet --data pages/ --processes 4
+"""
+
+import argparse
+import json
+import os
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn.functional as F
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
+
+from watermark_remover.inference.model_functions import CombinedLoss, TruncatedPerceptualLoss, UNet, VDSR
+from watermark_remover.training.checkpoints import latest_checkpoint, save_checkpoint, unwrap
+from watermark_remover.training.data import (
+    SyntheticWatermarkPairs,
+    list_images,
+    mask_watermark,
+    procedural_watermark,
+    split_paths,
+)
+
+MODELS = {
+    'unet': (UNet, 'models/Watermark_Removal_trained'),
+    'vdsr': (VDSR, 'models/VDSR_trained'),
+}
+LOSSES = ('combined', 'l1')
+LOG_NAME = 'train_log.jsonl'
+
+
+def build_model(kind, output_dir):
+    """Return (model, results, optimizer state, start epoch).
+
+    Resumes from the newest checkpoint in ``output_dir`` if it has one; the
+    optimizer state is ``None`` otherwise.
+    """
+    model_class = MODELS[kind][0]
+    checkpoint = latest_checkpoint(output_dir)
+    if checkpoint is None:
+        return model_class(), {}, None, 1
+    epoch, saved = checkpoint
+    model = model_class(**saved.get('arch', {}))
+    model.load_state_dict(saved['state_dict'])
+    results = {key: value for key, value in saved.items() if isinstance(value, list)}
+    return model, results, saved.get('optimizer'), epoch + 1
+
+
+def build_loss(name, cache_size):
+    if name == 'l1':
+        return lambda outputs, targets, keys=None: F.l1_loss(outputs, targets)
+    return CombinedLoss(perceptual_loss=TruncatedPerceptualLoss(cache_size=cache_size))
+
+
+def run_worker(rank, world_size, args):
+    distributed = world_size > 1
+    if distributed:
+        os.environ.setdefault('MASTER_ADDR', '127.0.0.1')
+        os.environ.setdefault('MASTER_PORT', str(args.port))
+        dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed + rank)
+
+    train_paths, val_paths = split_paths(list_images(args.data))
+    watermark = mask_watermark(args.mask) if args.mask else procedural_watermark()
+    crop_seed = None if args.random_crops else args.seed
+    train_set = SyntheticWatermarkPairs(train_paths, args.kind, watermark, args.crop, args.crops_per_page,
+                                        crop_seed=crop_seed)
+    sampler = DistributedSampler(train_set, world_size, rank, seed=args.seed) if distributed else None
+    train_loader = DataLoader(
+        train_set, batch_size=args.batch_size, shuffle=sampler is None, sampler=sampler,
+        num_workers=args.workers, persistent_workers=args.workers > 0, drop_last=True,
+    )
+
+    model, results, optimizer_state, start_epoch = build_model(args.kind, args.output)
+    for key in ('train_loss', 'val_loss', 'train_time', 'throughput'):
+        results.setdefault(key, [])
+    if distributed:
+        model = DistributedDataParallel(model)
+    cached_samples = len(val_paths) if args.random_crops else len(train_paths) + len(val_paths)
+    loss_fn = build_loss(args.loss, cache_size=min(cached_samples * args.crops_per_page, args.feature_cache))
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    if optimizer_state is not None:
+        optimizer.load_state_dict(optimizer_state)
+
+    val_batches = []
+    if rank == 0:
+        val_set = SyntheticWatermarkPairs(val_paths, args.kind, watermark, args.crop, args.crops_per_page, seed=0)
+        val_batches = list(DataLoader(val_set, batch_size=args.batch_size, num_workers=args.workers))
+        if start_epoch > 1:
+            print(f"Resuming from epoch {start_epoch - 1} in {args.output}")
+
+    for epoch in range(start_epoch, start_epoch + args.epochs):
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+        model.train()
+        start = time.perf_counter()
+        # Loss sum, batches and samples of this process, summed over all below
+        totals = torch.zeros(3, dtype=torch.float64)
+        for inputs, targets, indices in train_loader:
+            keys = None if args.random_crops else [('train', int(i)) for i in indices]
+            loss = loss_fn(model(inputs), targets, keys)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            totals += torch.tensor([loss.item(), 1, len(inputs)], dtype=torch.float64)
+        if distributed:
+            dist.all_reduce(totals)
+        elapsed = time.perf_counter() - start
+        if rank != 0:
+            continue
+
+        loss_sum, steps, samples = totals.tolist()
+        results['train_time'].append(elapsed)
+        results['train_loss'].append(loss_sum / max(steps, 1))
+        results['throughput'].append(samples / elapsed)
+        # Validate on the plain model so DDP does not wait for the other processes
+        plain = unwrap(model).eval()
+        with torch.inference_mode():
+            val_loss = sum(
+                loss_fn(plain(inputs), targets, [('val', int(i)) for i in indices]).item()
+                for inputs, targets, indices in val_batches
+            ) / max(len(val_batches), 1)
+        results['val_loss'].append(val_loss)
+        save_checkpoint(model, args.output, epoch, results, optimizer)
+        with open(os.path.join(args.output, LOG_NAME), 'a') as log:
+            log.write(json.dumps({
+                'epoch': epoch,
+                'train_loss': results['train_loss'][-1],
+                'val_loss': val_loss,
+                'train_time': elapsed,
+                'samples_per_second': results['throughput'][-1],
+                'processes': world_size,
+                'threads': args.threads,
+                'workers': args.workers,
+            }) + '\n')
+        print(f"Epoch {epoch}: train loss {results['train_loss'][-1]:.4f}, val loss {val_loss:.4f}, "
+              f"{results['throughput'][-1]:.1f} samples/s ({elapsed:.1f}s)")
+
+    if distributed:
+        dist.destroy_process_group()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=list(MODELS))
+    parser.add_argument('--data', required=True, help='directory of clean local page images')
+    parser.add_argument('--output', help='checkpoint directory (default: models/<model>_trained)')
+    parser.add_argument('--mask', help='watermark mask image to synthesise UNet inputs with')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--loss', choices=LOSSES, default='combined')
+    parser.add_argument('--crop', type=int, default=128, help='crop size; a multiple of 32 for the UNet')
+    parser.add_argument('--crops-per-page', type=int, default=8)
+    parser.add_argument('--random-crops', action='store_true',
+                        help='new crop regions every epoch; disables the target feature cache')
+    parser.add_argument('--feature-cache', type=int, default=1024,
+                        help='target feature cache size in samples per process (about 1 MB each at crop 128)')
+    parser.add_argument('--batch-size', type=int, default=4, help='per process')
+    parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--processes', type=int, default=1, help='DDP processes (gloo backend)')
+    parser.add_argument('--threads', type=int, help='torch threads per process (default: cores / processes)')
+    parser.add_argument('--workers', type=int, default=2, help='DataLoader workers per process')
+    parser.add_argument('--port', type=int, default=29500, help='rendezvous port for --processes > 1')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    args.output = args.output or MODELS[args.kind][1]
+    args.threads = args.threads or max(1, (os.cpu_count() or 1) // args.processes)
+    if len(list_images(args.data)) < 2:
+        parser.error("need at least two page images")
+    if args.processes > 1:
+        mp.spawn(run_worker, args=(args.processes, args), nprocs=args.processes)
+    else:
+        run_worker(0, 1, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# Cooperative cancellation for long running jobs
+
+import threading
+from typing import Optional
+
+
+class CancelledError(BaseException):
+    """Raised at a cancellation point once the job's token is cancelled.
+
+    Like ``asyncio.CancelledError`` this derives from ``BaseException`` so the
+    broad ``except Exception`` handlers around individual pages and tiles do
+    not swallow it; only the job's top level catches it.
+    """
+
+
+class CancellationToken:
+    """Flag shared between a job and whoever may cancel it.
+
+    A token created with a ``parent`` is also cancelled when the parent is,
+    so a batch can cancel every job it started while each job can still be
+    cancelled on its own.
+    """
+
+    def __init__(self, parent: Optional['CancellationToken'] = None):
+        self._event = threading.Event()
+        self._parent = parent
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        return self._parent is not None and self._parent.is_cancelled
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_cancelled:
+            raise CancelledError()
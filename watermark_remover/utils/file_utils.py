@@ -0,0 +1,107 @@
+# Fine-grained file locking and atomic writes
+
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+# Guards the table below, never held while a path lock is
+_registry_lock = threading.Lock()
+# Normalized path -> [lock, number of threads using or waiting for it]
+_path_locks: Dict[str, List] = {}
+
+
+@lru_cache(maxsize=None)
+def _new_file_mode() -> int:
+    """Mode open() gives a new file: 0o666 minus the umask.
+
+    os.umask can only be read by changing it for the whole process, which
+    races with other threads creating files, so the umask is read from
+    /proc where available and otherwise from a probe file.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    directory = tempfile.mkdtemp()
+    try:
+        probe = os.path.join(directory, 'probe')
+        os.close(os.open(probe, os.O_CREAT | os.O_WRONLY, 0o666))
+        return os.stat(probe).st_mode & 0o777
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+@contextmanager
+def path_lock(path: str) -> Iterator[None]:
+    """Hold a lock for one path only.
+
+    Threads working on different files never wait for each other.  Entries
+    are dropped once no thread uses them, so the table does not grow with
+    every file a session touches.
+    """
+    key = _normalize(path)
+    with _registry_lock:
+        entry = _path_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _registry_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _path_locks[key]
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """Yield a temporary path that replaces ``path`` when the block succeeds.
+
+    The temporary file lives next to the target (same file system) and keeps
+    its extension, so writers that infer the format from the name still
+    work.  Readers see either the old file or the complete new one; if the
+    block raises, the temporary file is removed and ``path`` is untouched.
+    The result keeps the mode of the file it replaces, or follows the umask
+    for a new file (``mkstemp`` alone would make it owner-only).
+    """
+    directory, name = os.path.split(path)
+    root, ext = os.path.splitext(name)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{root}.', suffix=ext, dir=directory or '.')
+    os.close(fd)
+    try:
+        yield tmp_path
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except OSError:
+            mode = _new_file_mode()
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+
+
+def atomic_save_image(image, path: str, **params) -> None:
+    """Save a PIL image to ``path`` through a temporary file."""
+    with atomic_path(path) as tmp_path:
+        image.save(tmp_path, **params)
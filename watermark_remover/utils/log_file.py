@@ -0,0 +1,57 @@
+# Rotating log file written by a background thread
+
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(threadName)s: %(message)s'
+
+
+def message_level(message: str) -> int:
+    """Level of a ``log_updated`` message, from its ``[DEBUG]`` prefix."""
+    return logging.DEBUG if message.startswith("[DEBUG]") else logging.INFO
+
+
+class _RecordQueueHandler(QueueHandler):
+    # Queue the record as-is; the listener thread does all formatting
+    def prepare(self, record):
+        return record
+
+
+class AsyncFileLog:
+    """Append messages to a rotating log file without blocking the caller.
+
+    ``write`` only checks the level and puts a record on a queue; a
+    ``QueueListener`` thread formats and writes it, rolling the file over
+    at ``max_bytes`` and keeping ``backup_count`` old files.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 5 * 2 ** 20, backup_count: int = 3,
+                 level: int = logging.DEBUG):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True
+        )
+        self._handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        # A private logger, so records never reach the root logger's handlers
+        self._logger = logging.Logger(f"watermark_remover.log_file.{id(self)}", level)
+        self._logger.propagate = False
+        self._logger.addHandler(_RecordQueueHandler(queue.SimpleQueue()))
+        self._listener = QueueListener(self._logger.handlers[0].queue, self._handler)
+        self._listener.start()
+        self._closed = False
+
+    def write(self, message: str) -> None:
+        level = message_level(message)
+        if not self._closed and self._logger.isEnabledFor(level):
+            self._logger.log(level, message)
+
+    def close(self) -> None:
+        """Write out queued records and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._listener.stop()
+        self._handler.close()
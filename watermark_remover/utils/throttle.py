@@ -0,0 +1,68 @@
+# Rate limits and polling intervals for optional side work such as previews
+
+import time
+from typing import Callable
+
+
+class Throttle:
+    """Decide whether an optional, repeated side task may run now.
+
+    At most ``max_rate`` runs per second are allowed, and while the time
+    reported through ``spent`` exceeds ``max_share`` of the wall time since
+    the throttle was created, further runs are refused.  A ``max_rate`` of 0
+    disables the task entirely; ``force`` bypasses both limits (e.g. for the
+    last page of a stage) unless disabled.
+    """
+
+    def __init__(self, max_rate: float, max_share: float = 0.03,
+                 clock: Callable[[], float] = time.monotonic):
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else None
+        self.max_share = max_share
+        self._clock = clock
+        self._start = clock()
+        self._last = None
+        self.spent_seconds = 0.0
+        self.allowed = 0
+        self.refused = 0
+
+    def ready(self, force: bool = False) -> bool:
+        if self.min_interval is None:
+            return False
+        now = self._clock()
+        if not force:
+            too_soon = self._last is not None and now - self._last < self.min_interval
+            over_budget = self.spent_seconds > self.max_share * (now - self._start)
+            if too_soon or over_budget:
+                self.refused += 1
+                return False
+        self._last = now
+        self.allowed += 1
+        return True
+
+    def spent(self, seconds: float) -> None:
+        self.spent_seconds += seconds
+
+
+class AdaptiveInterval:
+    """Polling interval that is short while things change and backs off when idle.
+
+    ``next(changed, active)`` returns the delay before the next poll: ``fast``
+    after a change or while ``active``, otherwise the previous delay times
+    ``factor``, capped at ``idle``.
+    """
+
+    def __init__(self, fast: float, idle: float, factor: float = 2.0):
+        self.fast = fast
+        self.idle = idle
+        self.factor = factor
+        self.current = fast
+
+    def next(self, changed: bool = False, active: bool = False) -> float:
+        if changed or active:
+            self.current = self.fast
+        else:
+            self.current = min(self.current * self.factor, self.idle)
+        return self.current
+
+    def reset(self) -> None:
+        self.current = self.fast
@@ -1,6 +1,6 @@
 # Utility functions for musical key transposition
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 KEY_TO_SEMITONE: Dict[str, int] = {
     'C': 0, 'C#': 1, 'Db': 1,
@@ -149,3 +149,140 @@ def get_transposition_suggestions(available_keys: List[str], selected_instrument
 
     matches_closest.sort(key=lambda s: s['difference'])
     return {'direct': matches_direct, 'closest': matches_closest}
+
+
+# Precomputed 12-semitone x instrument table: entry [t][i] is the written key
+# (as a semitone) a part for instrument i must be in to sound in concert key t.
+PLANNER_INSTRUMENTS: List[str] = list(INSTRUMENT_TRANSPOSITIONS)
+WRITTEN_SEMITONE_TABLE: List[List[int]] = [
+    [(target - INSTRUMENT_TRANSPOSITIONS[instrument]) % 12 for instrument in PLANNER_INSTRUMENTS]
+    for target in range(12)
+]
+
+
+def _key_labels(keys: List[str]) -> Dict[int, str]:
+    """Map each available semitone to the key label used by the song."""
+    labels = {}
+    for key in keys:
+        semitone = KEY_TO_SEMITONE.get(normalize_key(key))
+        if semitone is not None and semitone not in labels:
+            labels[semitone] = key
+    return labels
+
+
+def _request_candidates(instrument: str, target_key: str, keys: List[str], parts) -> List[Tuple[str, str]]:
+    """Return the (key, part) downloads that satisfy one request, best first."""
+    target = KEY_TO_SEMITONE.get(normalize_key(target_key))
+    if target is None:
+        return []
+    candidates = []
+    for key in keys:
+        if KEY_TO_SEMITONE.get(normalize_key(key)) == target and instrument in _parts_for(parts, key):
+            candidates.append((key, instrument))
+            break
+    if instrument not in INSTRUMENT_TRANSPOSITIONS:
+        return candidates
+
+    labels = _key_labels(keys)
+    available = 0
+    for semitone in labels:
+        available |= 1 << semitone
+    row = WRITTEN_SEMITONE_TABLE[target]
+    for index, other in enumerate(PLANNER_INSTRUMENTS):
+        if other == instrument:
+            continue
+        written = row[index]
+        if not available & (1 << written):
+            continue
+        key = labels[written]
+        if other in _parts_for(parts, key):
+            candidates.append((key, other))
+    return candidates
+
+
+def _parts_for(parts, key: str) -> List[str]:
+    if isinstance(parts, dict):
+        return parts.get(key, [])
+    return parts
+
+
+def _minimal_cover(candidates_by_request: Dict[int, List[Tuple[str, str]]]) -> List[Tuple[str, str]]:
+    """Smallest set of downloads covering every request (branch and bound).
+
+    Batches are small, so an exact search is cheap.  Candidates are tried in
+    the order given, so among covers of equal size the one using the
+    requested parts is kept.
+    """
+    covers: Dict[Tuple[str, str], set] = {}
+    for request, candidates in candidates_by_request.items():
+        for candidate in candidates:
+            covers.setdefault(candidate, set()).add(request)
+
+    best: List[List[Tuple[str, str]]] = [None]
+
+    def search(uncovered: set, chosen: List[Tuple[str, str]]):
+        if best[0] is not None and len(chosen) >= len(best[0]):
+            return
+        if not uncovered:
+            best[0] = list(chosen)
+            return
+        request = min(uncovered, key=lambda r: (len(candidates_by_request[r]), r))
+        for candidate in candidates_by_request[request]:
+            chosen.append(candidate)
+            search(uncovered - covers[candidate], chosen)
+            chosen.pop()
+
+    search(set(candidates_by_request), [])
+    return best[0] or []
+
+
+def plan_downloads(requests: List[Tuple[str, str, str]], songs: Dict[str, dict]) -> dict:
+    """Plan the fewest (song, key, part) downloads satisfying a set list.
+
+    ``requests`` holds ``(title, instrument, key)`` tuples and ``songs`` maps
+    each title to ``{'keys': [...], 'parts': [...]}`` where ``parts`` is either
+    a list shared by all keys or a dict of parts per key.  A request is
+    satisfied by its own part in the requested key whenever the song has it;
+    only otherwise is it served by another part that transposes to it (see
+    :func:`get_transposition_suggestions`), preferably one downloaded anyway.
+
+    Returns a dict with ``downloads`` (``title``, ``key``, ``part`` and the
+    indices of the ``requests`` it serves), ``assignments`` (per request the
+    chosen download or ``None``) and ``unsatisfied`` request indices.
+    """
+    by_title: Dict[str, Dict[int, List[Tuple[str, str]]]] = {}
+    unsatisfied = []
+    for index, (title, instrument, key) in enumerate(requests):
+        song = songs.get(title)
+        candidates = []
+        if song:
+            candidates = _request_candidates(instrument, key, song.get('keys', []), song.get('parts', []))
+        if candidates and candidates[0][1] == instrument:
+            # Players get their own part; it is never traded for a shared one
+            candidates = candidates[:1]
+        if candidates:
+            by_title.setdefault(title, {})[index] = candidates
+        else:
+            unsatisfied.append(index)
+
+    downloads = []
+    assignments: List[Optional[dict]] = [None] * len(requests)
+    for title, candidates_by_request in by_title.items():
+        chosen = _minimal_cover(candidates_by_request)
+        for key, part in chosen:
+            downloads.append({'title': title, 'key': key, 'part': part, 'requests': []})
+        song_downloads = downloads[len(downloads) - len(chosen):]
+        for index, candidates in candidates_by_request.items():
+            # Serve each request from its best ranked chosen download
+            download = next(d for c in candidates for d in song_downloads if (d['key'], d['part']) == c)
+            download['requests'].append(index)
+            _, instrument, key = requests[index]
+            assignments[index] = {
+                'title': title,
+                'key': download['key'],
+                'part': download['part'],
+                'direct': download['part'] == instrument
+                and normalize_key(download['key']) == normalize_key(key),
+            }
+
+    return {'downloads': downloads, 'assignments': assignments, 'unsatisfied': unsatisfied}